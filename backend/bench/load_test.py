@@ -0,0 +1,253 @@
+"""Load benchmark for the comparison API
+
+Drives /api/compare, /api/compare/stream or /api/assess at increasing
+concurrency levels and reports p50/p95/p99 latency and requests per second.
+Without --url it starts the mock providers and the Flask app in-process, so
+no API credits are spent:
+
+    python bench/load_test.py --endpoint compare --concurrency 1,8,32 --requests 200
+
+Save a run with --output and compare later runs against it with --baseline;
+the script exits non-zero when p95 latency or throughput regress by more than
+--max-regression.
+"""
+import argparse
+import itertools
+import json
+import math
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_providers import MockProviderServer, add_mock_arguments, mock_config_from_args
+
+ENDPOINTS = {
+    'compare': '/api/compare',
+    'compare-stream': '/api/compare/stream',
+    'assess': '/api/assess'
+}
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(round(fraction * len(sorted_values), 9)) - 1))
+    return sorted_values[rank]
+
+
+def start_local_app(args: argparse.Namespace) -> Tuple[str, MockProviderServer, Any]:
+    """Start the mock providers and the Flask app on free local ports, returning the app's URL"""
+    mock = MockProviderServer(mock_config_from_args(args)).start()
+
+    # Must be set before the app is imported: AIService reads them at startup.
+    # Dummy keys so no real credential is ever sent, even to the mock.
+    os.environ.update(mock.base_urls())
+    for name in ('OPENAI_API_KEY', 'ANTHROPIC_API_KEY', 'TOGETHER_API_KEY'):
+        os.environ[name] = 'mock-key'
+    os.environ.setdefault('AI_CACHE_ENABLED', 'false')
+    os.environ.setdefault('PROVIDER_PROBE_INTERVAL', '0')
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+    import logging
+    from werkzeug.serving import make_server
+    from src.main import app
+
+    # Werkzeug logs every request at INFO regardless of LOG_LEVEL
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, name='bench-app', daemon=True).start()
+    return f'http://127.0.0.1:{server.server_port}', mock, server
+
+
+def pick_agents(base_url: str, requested: Optional[str]) -> Tuple[str, str]:
+    """The two agent ids to compare: as requested, or the first two enabled agents"""
+    if requested:
+        agent1, agent2 = requested.split(',')
+        return agent1, agent2
+    agents = requests.get(f'{base_url}/api/agents', timeout=10).json()['agents']
+    ids = [agent['id'] for agent in agents if agent['enabled']]
+    if len(ids) < 2:
+        raise SystemExit("Need at least two enabled agents to benchmark")
+    return ids[0], ids[1]
+
+
+def build_payload(endpoint: str, agents: Tuple[str, str], index: int) -> Dict[str, Any]:
+    # A distinct question per request so no response cache can answer it
+    question = f"Benchmark question #{index}: how do connection pools improve API latency?"
+    payload = {'agent1_id': agents[0], 'agent2_id': agents[1], 'question': question, 'bypass_cache': True}
+    if endpoint == 'assess':
+        payload['agent1_response'] = 'Connection pools reuse TCP and TLS sessions across requests. ' * 8
+        payload['agent2_response'] = 'Reusing connections skips handshakes, cutting tail latency. ' * 8
+    return payload
+
+
+def send(session: requests.Session, url: str, endpoint: str, payload: Dict[str, Any], timeout: float) -> Tuple[float, bool]:
+    """Send one request, returning its latency and whether it succeeded"""
+    started = time.perf_counter()
+    try:
+        if endpoint == 'compare-stream':
+            with session.post(url, json=payload, timeout=timeout, stream=True) as response:
+                ok = response.status_code == 200
+                for line in response.iter_lines():
+                    if line.startswith(b'event: error'):
+                        ok = False
+        else:
+            response = session.post(url, json=payload, timeout=timeout)
+            ok = response.status_code == 200
+    except requests.RequestException:
+        ok = False
+    return time.perf_counter() - started, ok
+
+
+def run_level(base_url: str, endpoint: str, agents: Tuple[str, str], concurrency: int,
+              total: int, timeout: float) -> Dict[str, Any]:
+    """Closed-loop run: ``concurrency`` clients send ``total`` requests between them"""
+    url = base_url + ENDPOINTS[endpoint]
+    counter = itertools.count()
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+
+    def client():
+        nonlocal errors
+        with requests.Session() as session:
+            while True:
+                index = next(counter)
+                if index >= total:
+                    return
+                elapsed, ok = send(session, url, endpoint, build_payload(endpoint, agents, index), timeout)
+                with lock:
+                    latencies.append(elapsed)
+                    errors += 0 if ok else 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(client)
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'endpoint': endpoint,
+        'concurrency': concurrency,
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': round(len(latencies) / wall, 2) if wall else 0.0,
+        'p50': round(percentile(latencies, 0.50), 4),
+        'p95': round(percentile(latencies, 0.95), 4),
+        'p99': round(percentile(latencies, 0.99), 4),
+        'max': round(latencies[-1], 4) if latencies else 0.0
+    }
+
+
+def print_table(results: List[Dict[str, Any]]):
+    columns = ('endpoint', 'concurrency', 'requests', 'errors', 'rps', 'p50', 'p95', 'p99', 'max')
+    print(' '.join(f'{column:>14}' for column in columns))
+    for result in results:
+        print(' '.join(f'{result[column]:>14}' for column in columns))
+
+
+def print_prompt_cache(stats: Dict[str, Dict[str, int]]):
+    """Share of the prompt tokens each mock provider served from its simulated prompt cache"""
+    for provider, counts in sorted(stats.items()):
+        if counts.get('input_tokens'):
+            print(f"{provider}: {counts.get('cached_input_tokens', 0)} of {counts['input_tokens']} prompt tokens "
+                  f"read from cache, {counts.get('cache_write_tokens', 0)} written")
+
+
+def compare_to_baseline(results: List[Dict[str, Any]], baseline: List[Dict[str, Any]], max_regression: float) -> List[str]:
+    """Regressions beyond ``max_regression`` (a fraction) in p95 latency or requests per second"""
+    previous = {(entry['endpoint'], entry['concurrency']): entry for entry in baseline}
+    regressions = []
+    for result in results:
+        before = previous.get((result['endpoint'], result['concurrency']))
+        if before is None:
+            continue
+        label = f"{result['endpoint']} @ {result['concurrency']}"
+        if before['p95'] and result['p95'] > before['p95'] * (1 + max_regression):
+            regressions.append(f"{label}: p95 {before['p95']}s -> {result['p95']}s")
+        if before['rps'] and result['rps'] < before['rps'] * (1 - max_regression):
+            regressions.append(f"{label}: rps {before['rps']} -> {result['rps']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help='Benchmark an already running backend instead of starting one in-process')
+    parser.add_argument('--endpoint', default='compare',
+                        help=f"Comma-separated endpoints to drive: {', '.join(ENDPOINTS)}")
+    parser.add_argument('--concurrency', default='1,4,16', help='Comma-separated concurrency levels')
+    parser.add_argument('--requests', type=int, default=100, help='Requests per concurrency level')
+    parser.add_argument('--warmup', type=int, default=5, help='Unmeasured requests sent before each endpoint')
+    parser.add_argument('--timeout', type=float, default=60, help='Client timeout per request in seconds')
+    parser.add_argument('--agents', help='Two comma-separated agent ids (default: first two enabled agents)')
+    parser.add_argument('--output', help='Write the results as JSON to this file')
+    parser.add_argument('--baseline', help='JSON results of an earlier run to check for regressions')
+    parser.add_argument('--max-regression', type=float, default=0.2,
+                        help='Allowed fractional regression of p95 latency and throughput against the baseline')
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    endpoints = [endpoint.strip() for endpoint in args.endpoint.split(',')]
+    for endpoint in endpoints:
+        if endpoint not in ENDPOINTS:
+            parser.error(f"Unknown endpoint: {endpoint}")
+    levels = [int(level) for level in args.concurrency.split(',')]
+
+    mock = app_server = None
+    base_url = args.url.rstrip('/') if args.url else None
+    if base_url is None:
+        base_url, mock, app_server = start_local_app(args)
+        print(f"Started app at {base_url} against mock providers at {mock.url}")
+
+    try:
+        agents = pick_agents(base_url, args.agents)
+        print(f"Comparing {agents[0]} and {agents[1]}")
+        results = []
+        for endpoint in endpoints:
+            if args.warmup:
+                run_level(base_url, endpoint, agents, min(args.warmup, max(levels)), args.warmup, args.timeout)
+            for level in levels:
+                result = run_level(base_url, endpoint, agents, level, args.requests, args.timeout)
+                results.append(result)
+                print(f"{endpoint} x{level}: {result['rps']} req/s, p95 {result['p95']}s, {result['errors']} errors")
+    finally:
+        if app_server is not None:
+            app_server.shutdown()
+        if mock is not None:
+            mock.stop()
+
+    print()
+    print_table(results)
+    if mock is not None:
+        print()
+        print_prompt_cache(mock.config.snapshot())
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare_to_baseline(results, json.load(f), args.max_regression)
+        if regressions:
+            print("\nRegressions against baseline:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print("\nNo regressions against baseline")
+
+
+if __name__ == '__main__':
+    main()
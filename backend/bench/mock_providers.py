@@ -0,0 +1,417 @@
+"""Local stand-in for the OpenAI, Anthropic and Together.ai completion APIs
+
+Serves the endpoints AIService calls, with configurable latency, error and
+429 rates, so throughput can be measured without spending API credits.
+Point the backend at it with the base-URL overrides, e.g.
+
+    python bench/mock_providers.py --port 8900 --latency lognormal --latency-mean 0.8
+
+    OPENAI_BASE_URL=http://127.0.0.1:8900/openai/v1
+    ANTHROPIC_BASE_URL=http://127.0.0.1:8900/anthropic/v1
+    TOGETHER_BASE_URL=http://127.0.0.1:8900/together/v1
+
+Any API key is accepted. GET /stats returns the request and token counts per
+provider, including prompt tokens served from the simulated prompt cache.
+"""
+import argparse
+import json
+import math
+from collections import OrderedDict
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+WORDS = ('the', 'model', 'answer', 'response', 'data', 'step', 'first', 'then', 'result', 'because',
+         'example', 'which', 'value', 'should', 'using', 'simple', 'process', 'each', 'case', 'more')
+
+ROUTES = {
+    '/openai/v1/chat/completions': 'openai',
+    '/anthropic/v1/messages': 'anthropic',
+    '/together/v1/chat/completions': 'together'
+}
+
+
+class LatencyModel:
+    """Time to first byte of a mock response
+
+    ``fixed`` always waits ``mean`` seconds, ``uniform`` waits between
+    ``mean - spread`` and ``mean + spread``, and ``lognormal`` draws from a
+    log-normal distribution with the given mean and shape ``sigma``, which
+    produces the long tail real providers show.
+    """
+
+    def __init__(self, kind: str = 'fixed', mean: float = 0.5, spread: float = 0.0, sigma: float = 0.5):
+        if kind not in ('fixed', 'uniform', 'lognormal'):
+            raise ValueError(f"Unknown latency distribution: {kind}")
+        self.kind = kind
+        self.mean = mean
+        self.spread = spread
+        self.sigma = sigma
+
+    def sample(self) -> float:
+        if self.kind == 'uniform':
+            return max(0.0, random.uniform(self.mean - self.spread, self.mean + self.spread))
+        if self.kind == 'lognormal' and self.mean > 0:
+            mu = math.log(self.mean) - self.sigma ** 2 / 2
+            return random.lognormvariate(mu, self.sigma)
+        return self.mean
+
+
+class MockPromptCache:
+    """Prompt-prefix caching as the real providers report it
+
+    Anthropic caches the prompt up to each text block marked with
+    ``cache_control`` and reads it back at any block boundary up to the last
+    marker; OpenAI caches every prompt automatically in 128-token steps. Either way only prefixes of at least ``min_tokens`` are cached,
+    and tokens are counted as characters / 4 like everywhere in the mock.
+    """
+
+    STEP_TOKENS = 128
+
+    def __init__(self, min_tokens: int = 1024, maxsize: int = 10000):
+        self.min_tokens = min_tokens
+        self.maxsize = maxsize
+        self._prefixes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _lookup_and_store(self, model: str, lookups: List[str], stores: List[str]) -> Tuple[int, int]:
+        """Tokens of the longest cached prefix in ``lookups``, and of the longest of ``stores``, which get cached"""
+        lookups = [prefix for prefix in lookups if _tokens(prefix) >= self.min_tokens]
+        stores = [prefix for prefix in stores if _tokens(prefix) >= self.min_tokens]
+        with self._lock:
+            cached = 0
+            for prefix in lookups:
+                if (model, prefix) in self._prefixes:
+                    self._prefixes.move_to_end((model, prefix))
+                    cached = max(cached, _tokens(prefix))
+            for prefix in stores:
+                self._prefixes[(model, prefix)] = True
+                self._prefixes.move_to_end((model, prefix))
+            while len(self._prefixes) > self.maxsize:
+                self._prefixes.popitem(last=False)
+        return cached, max((_tokens(prefix) for prefix in stores), default=0)
+
+    def anthropic(self, model: str, content: Any) -> Tuple[int, int]:
+        """(cache read, cache write) tokens for an Anthropic message content"""
+        if not isinstance(content, list):
+            return 0, 0
+        boundaries, breakpoints, text = [], [], ''
+        for block in content:
+            text += block.get('text', '')
+            boundaries.append(text)
+            if block.get('cache_control'):
+                breakpoints.append(text)
+        lookups = [prefix for prefix in boundaries if breakpoints and len(prefix) <= len(breakpoints[-1])]
+        cached, longest = self._lookup_and_store(model, lookups, breakpoints)
+        return cached, max(longest - cached, 0)
+
+    def openai(self, model: str, text: str) -> int:
+        """Cached tokens for an OpenAI prompt"""
+        step = self.STEP_TOKENS * 4
+        prefixes = [text[:end] for end in range(step, len(text) + 1, step)]
+        cached, _ = self._lookup_and_store(model, prefixes, prefixes)
+        return cached
+
+
+class MockConfig:
+    """Behaviour of the mock providers, shared by all request handlers"""
+
+    def __init__(self, latency: Optional[LatencyModel] = None, error_rate: float = 0.0,
+                 rate_limit_rate: float = 0.0, retry_after: float = 1.0,
+                 response_tokens: int = 150, token_delay: float = 0.01,
+                 prompt_cache: Optional[MockPromptCache] = None):
+        self.latency = latency or LatencyModel()
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.response_tokens = response_tokens
+        self.token_delay = token_delay
+        self.prompt_cache = prompt_cache or MockPromptCache()
+        self.stats = {}
+        self._lock = threading.Lock()
+
+    def count(self, provider: str, outcome: str, amount: int = 1):
+        with self._lock:
+            provider_stats = self.stats.setdefault(provider, {})
+            provider_stats[outcome] = provider_stats.get(outcome, 0) + amount
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {provider: dict(counts) for provider, counts in self.stats.items()}
+
+
+def _tokens(text: str) -> int:
+    return len(text) // 4
+
+
+def _message_text(message: Dict[str, Any]) -> str:
+    content = message.get('content', '')
+    if isinstance(content, list):
+        return ''.join(block.get('text', '') for block in content)
+    return str(content)
+
+
+def _prompt_tokens(body: Dict[str, Any]) -> int:
+    return max(1, _tokens(' '.join(_message_text(message) for message in body.get('messages', []))))
+
+
+def _words(count: int) -> Iterator[str]:
+    for index in range(count):
+        yield (' ' if index else '') + random.choice(WORDS)
+
+
+class MockProviderHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'MockProviders/1.0'
+
+    config: MockConfig = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path == '/stats':
+            self._send_json(200, self.config.snapshot())
+        else:
+            self._send_json(404, {'error': {'message': 'Not found'}})
+
+    def do_POST(self):
+        provider = ROUTES.get(self.path)
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length) if length else b''
+        if provider is None:
+            self._send_json(404, {'error': {'message': f'Unknown endpoint {self.path}'}})
+            return
+        if not (self.headers.get('Authorization') or self.headers.get('x-api-key')):
+            self.config.count(provider, 'unauthorized')
+            self._send_json(401, self._error_body(provider, 'authentication_error', 'Missing API key'))
+            return
+        try:
+            body = json.loads(raw or b'{}')
+        except ValueError:
+            self._send_json(400, self._error_body(provider, 'invalid_request_error', 'Invalid JSON body'))
+            return
+
+        time.sleep(self.config.latency.sample())
+
+        roll = random.random()
+        if roll < self.config.rate_limit_rate:
+            self.config.count(provider, 'rate_limited')
+            self._send_json(429, self._error_body(provider, 'rate_limit_error', 'Rate limit exceeded (mock)'),
+                            {'Retry-After': f'{self.config.retry_after:g}'})
+            return
+        if roll < self.config.rate_limit_rate + self.config.error_rate:
+            self.config.count(provider, 'error')
+            self._send_json(500, self._error_body(provider, 'api_error', 'Internal server error (mock)'))
+            return
+
+        self.config.count(provider, 'ok')
+        model = body.get('model', 'mock-model')
+        input_tokens = _prompt_tokens(body)
+        output_tokens = min(self.config.response_tokens, int(body.get('max_tokens') or self.config.response_tokens))
+        usage = self._usage(provider, model, body, input_tokens, output_tokens)
+        if body.get('stream'):
+            self._stream(provider, model, usage, body)
+        else:
+            text = ''.join(_words(output_tokens))
+            self._send_json(200, self._completion_body(provider, model, text, usage))
+
+    def _usage(self, provider: str, model: str, body: Dict[str, Any], input_tokens: int,
+               output_tokens: int) -> Dict[str, Any]:
+        """The usage object of the response, in the provider's format, counting tokens in the stats"""
+        messages = body.get('messages') or [{}]
+        cached = written = 0
+        if provider == 'anthropic':
+            cached, written = self.config.prompt_cache.anthropic(model, messages[-1].get('content'))
+        elif provider == 'openai':
+            cached = self.config.prompt_cache.openai(model, ''.join(_message_text(message) for message in messages))
+        self.config.count(provider, 'input_tokens', input_tokens)
+        self.config.count(provider, 'cached_input_tokens', cached)
+        self.config.count(provider, 'cache_write_tokens', written)
+        if provider == 'anthropic':
+            # Anthropic's input_tokens leaves out the tokens read from or written to the cache
+            return {
+                'input_tokens': input_tokens - cached - written,
+                'cache_read_input_tokens': cached,
+                'cache_creation_input_tokens': written,
+                'output_tokens': output_tokens
+            }
+        usage = {
+            'prompt_tokens': input_tokens,
+            'completion_tokens': output_tokens,
+            'total_tokens': input_tokens + output_tokens
+        }
+        if provider == 'openai':
+            usage['prompt_tokens_details'] = {'cached_tokens': cached}
+        return usage
+
+    @staticmethod
+    def _error_body(provider: str, error_type: str, message: str) -> Dict[str, Any]:
+        if provider == 'anthropic':
+            return {'type': 'error', 'error': {'type': error_type, 'message': message}}
+        return {'error': {'type': error_type, 'message': message}}
+
+    @staticmethod
+    def _completion_body(provider: str, model: str, text: str, usage: Dict[str, Any]) -> Dict[str, Any]:
+        if provider == 'anthropic':
+            return {
+                'id': f'msg_mock_{random.getrandbits(32):08x}',
+                'type': 'message',
+                'role': 'assistant',
+                'model': model,
+                'content': [{'type': 'text', 'text': text}],
+                'stop_reason': 'end_turn',
+                'usage': usage
+            }
+        return {
+            'id': f'chatcmpl-mock{random.getrandbits(32):08x}',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': model,
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': text}, 'finish_reason': 'stop'}],
+            'usage': usage
+        }
+
+    def _stream(self, provider: str, model: str, usage: Dict[str, Any], body: Dict[str, Any]):
+        """Send the completion as Server-Sent Events in the provider's streaming format"""
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        if provider == 'anthropic':
+            output_tokens = usage['output_tokens']
+            self._event({'type': 'message_start', 'message': {
+                'id': 'msg_mock', 'model': model, 'usage': {**usage, 'output_tokens': 0}
+            }}, 'message_start')
+            self._event({'type': 'content_block_start', 'index': 0, 'content_block': {'type': 'text', 'text': ''}},
+                        'content_block_start')
+            for word in _words(output_tokens):
+                self._event({'type': 'content_block_delta', 'index': 0, 'delta': {'type': 'text_delta', 'text': word}},
+                            'content_block_delta')
+                time.sleep(self.config.token_delay)
+            self._event({'type': 'content_block_stop', 'index': 0}, 'content_block_stop')
+            self._event({'type': 'message_delta', 'delta': {'stop_reason': 'end_turn'},
+                         'usage': {'output_tokens': output_tokens}}, 'message_delta')
+            self._event({'type': 'message_stop'}, 'message_stop')
+        else:
+            for word in _words(usage['completion_tokens']):
+                self._event({'object': 'chat.completion.chunk', 'model': model,
+                             'choices': [{'index': 0, 'delta': {'content': word}, 'finish_reason': None}]})
+                time.sleep(self.config.token_delay)
+            self._event({'object': 'chat.completion.chunk', 'model': model,
+                         'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}]})
+            if (body.get('stream_options') or {}).get('include_usage'):
+                self._event({'object': 'chat.completion.chunk', 'model': model, 'choices': [], 'usage': usage})
+            self._chunk(b'data: [DONE]\n\n')
+        self._chunk(b'')
+
+    def _event(self, data: Dict[str, Any], event: Optional[str] = None):
+        prefix = f'event: {event}\n' if event else ''
+        self._chunk(f'{prefix}data: {json.dumps(data)}\n\n'.encode())
+
+    def _chunk(self, data: bytes):
+        self.wfile.write(f'{len(data):x}\r\n'.encode() + data + b'\r\n')
+        self.wfile.flush()
+
+    def _send_json(self, status: int, body: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class QuietHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients dropping keep-alive connections is normal under load
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class MockProviderServer:
+    """Mock provider API server running on a background thread"""
+
+    def __init__(self, config: Optional[MockConfig] = None, host: str = '127.0.0.1', port: int = 0):
+        self.config = config or MockConfig()
+        handler = type('ConfiguredMockProviderHandler', (MockProviderHandler,), {'config': self.config})
+        self.httpd = QuietHTTPServer((host, port), handler)
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def base_urls(self) -> Dict[str, str]:
+        """Environment variables pointing AIService at this server"""
+        return {f'{provider.upper()}_BASE_URL': f'{self.url}/{provider}/v1' for provider in ROUTES.values()}
+
+    def start(self) -> 'MockProviderServer':
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name='mock-providers', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def add_mock_arguments(parser: argparse.ArgumentParser):
+    """Command line options describing the mock providers' behaviour"""
+    parser.add_argument('--latency', choices=('fixed', 'uniform', 'lognormal'), default='lognormal',
+                        help='Distribution of the time to first byte')
+    parser.add_argument('--latency-mean', type=float, default=0.5, help='Mean time to first byte in seconds')
+    parser.add_argument('--latency-spread', type=float, default=0.2, help='Half-width of the uniform distribution')
+    parser.add_argument('--latency-sigma', type=float, default=0.5, help='Shape of the lognormal distribution')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of calls answered with HTTP 500')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='Fraction of calls answered with HTTP 429')
+    parser.add_argument('--retry-after', type=float, default=1.0, help='Retry-After seconds sent with 429s')
+    parser.add_argument('--response-tokens', type=int, default=150, help='Words per completion')
+    parser.add_argument('--token-delay', type=float, default=0.01, help='Seconds between streamed tokens')
+    parser.add_argument('--cache-min-tokens', type=int, default=1024,
+                        help='Shortest prompt prefix (in tokens) the simulated prompt cache keeps')
+
+
+def mock_config_from_args(args: argparse.Namespace) -> MockConfig:
+    return MockConfig(
+        latency=LatencyModel(args.latency, args.latency_mean, args.latency_spread, args.latency_sigma),
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after,
+        response_tokens=args.response_tokens,
+        token_delay=args.token_delay,
+        prompt_cache=MockPromptCache(args.cache_min_tokens)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8900)
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    server = MockProviderServer(mock_config_from_args(args), args.host, args.port)
+    print(f"Mock providers listening on {server.url}")
+    for name, value in server.base_urls().items():
+        print(f"  {name}={value}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+import threading
+import time
+
+import pytest
+from flask import Flask
+
+from bench.mock_providers import LatencyModel, MockConfig, MockProviderServer
+from src.routes.api import api_bp
+from src.services.ai_service import AIService
+from src.services.errors import ProviderError
+from src.services.pricing import build_usage
+
+
+@pytest.fixture
+def app(monkeypatch, tmp_path):
+    """The API blueprint on a bare Flask app: every provider keyed, no cache or probes, batches in ``tmp_path``, jobs in memory"""
+    for name in ('OPENAI_API_KEY', 'ANTHROPIC_API_KEY', 'TOGETHER_API_KEY'):
+        monkeypatch.setenv(name, 'test-key')
+    monkeypatch.setenv('PROVIDER_PROBE_INTERVAL', '0')
+    monkeypatch.setenv('AI_CACHE_ENABLED', 'false')
+    monkeypatch.setenv('BATCH_DB', str(tmp_path / 'batches.db'))
+    monkeypatch.setenv('JOB_QUEUE_BACKEND', 'memory')
+    app = Flask(__name__)
+    app.register_blueprint(api_bp, url_prefix='/api')
+    yield app
+    for name in ('job_manager', 'ai_service'):
+        if name in app.extensions:
+            app.extensions[name].close()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def provider(monkeypatch):
+    """Fake provider calls answering ``<model> answer``
+
+    Calls are recorded as (model, prompt) in ``calls``; models in ``failing``
+    are rejected with a 400 and every call first sleeps ``delay`` seconds.
+    """
+    state = {'calls': [], 'failing': set(), 'delay': 0.0}
+    lock = threading.Lock()
+
+    def call_provider(self, provider, model, prompt, timeout):
+        with lock:
+            state['calls'].append((model, prompt))
+        time.sleep(state['delay'])
+        if model in state['failing']:
+            raise ProviderError(f'{model} rejected the request', 400)
+        return f'{model} answer', build_usage(model, prompt, f'{model} answer')
+    monkeypatch.setattr(AIService, '_call_provider', call_provider)
+    return state
+
+
+@pytest.fixture
+def mock_providers(monkeypatch):
+    """bench/mock_providers.py serving every provider with 0.2 s latency, and AIService pointed at it"""
+    server = MockProviderServer(MockConfig(LatencyModel('fixed', 0.2), response_tokens=5, token_delay=0)).start()
+    for name, value in server.base_urls().items():
+        monkeypatch.setenv(name, value)
+    yield server
+    server.stop()
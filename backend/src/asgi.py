@@ -0,0 +1,40 @@
+"""ASGI entry point for the Intern Stack API.
+
+Serves the same Flask app as main.py under an ASGI server through asgiref's
+WsgiToAsgi. Flask views are synchronous, so every request still occupies a
+thread for its whole duration. WsgiToAsgi alone would run all of them on one
+shared thread; each request here gets its own ThreadSensitiveContext (and so
+its own thread), with at most ASGI_MAX_THREADS requests in the app at once.
+What the native async backend saves is the thread per provider call: the
+calls a request fans out run as coroutines on one shared event loop and
+connection pool.
+
+Run from the backend directory with:
+    uvicorn src.asgi:application --host 0.0.0.0 --port 5000
+"""
+import asyncio
+import os
+
+os.environ.setdefault('AI_ASYNC_BACKEND', 'true')
+
+from asgiref.sync import ThreadSensitiveContext
+from asgiref.wsgi import WsgiToAsgi
+from src.main import app
+
+
+class ConcurrentWsgiToAsgi(WsgiToAsgi):
+    """WsgiToAsgi that serves up to ``max_requests`` requests concurrently"""
+
+    def __init__(self, wsgi_application, max_requests: int):
+        super().__init__(wsgi_application)
+        self.max_requests = max_requests
+        self._slots = None
+
+    async def __call__(self, scope, receive, send):
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_requests)
+        async with self._slots, ThreadSensitiveContext():
+            await super().__call__(scope, receive, send)
+
+
+application = ConcurrentWsgiToAsgi(app, int(os.getenv('ASGI_MAX_THREADS', '64')))
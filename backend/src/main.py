@@ -8,29 +8,58 @@ import sys
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from flask import Flask, send_from_directory
+from flask import Flask, Response, request, send_from_directory
 from flask_cors import CORS
 from src.models.user import db
 from src.routes.user import user_bp
-from src.routes.api import api_bp
+from src.routes.api import api_bp, job_handlers
+from src.routes.history import history_bp
+from src.services.agent_registry import AgentRegistry
+from src.services.ai_service import AIService
+from src.services.fast_json import FastJSONProvider
+from src.services.history_writer import HistoryWriter
+from src.services.jobs import JobManager, job_queue_from_env
+from src.services.near_duplicates import NearDuplicateIndex
+from src.services.static_assets import StaticManifest
+from src.services.structured_logging import configure_logging
+
+# Logs go through a queue to a background writer so request threads never block on stdout
+configure_logging()
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
+# orjson-backed jsonify/get_json when orjson is installed
+app.json = FastJSONProvider(app)
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'asdf#FGSgvasgf$5$WGT')
 
 # Enable CORS for all routes
 cors_origins = os.getenv('CORS_ORIGINS', '*').split(',') if os.getenv('CORS_ORIGINS') else ['*']
 CORS(app, origins=cors_origins)
 
+# One AIService per process: pooled provider connections shared by all worker threads
+AIService(AgentRegistry()).init_app(app)
+
 # Register blueprints
 #app.register_blueprint(user_bp, url_prefix='/api')
 app.register_blueprint(api_bp, url_prefix='/api')
+app.register_blueprint(history_bp, url_prefix='/api')
+
+# Job workers start with the app so jobs left in a durable queue resume after a restart
+JobManager(job_queue_from_env(), job_handlers()).init_app(app)
 
-# Database configuration (commented out for MVP - no database needed)
-# app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
-# app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-# db.init_app(app)
-# with app.app_context():
-#     db.create_all()
+# Database for comparison/assessment history, written behind the request path
+if os.getenv('HISTORY_ENABLED', 'true').lower() == 'true':
+    # Defaults to its own untracked file rather than the app.db checked into the repo
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL') or f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'history.db')}"
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+    HistoryWriter().init_app(app)
+    # Past questions for near-duplicate reuse, re-indexed in the background
+    NearDuplicateIndex().init_app(app, load_history=True)
+
+# Static files are indexed and compressed once at startup; see StaticManifest
+static_manifest = StaticManifest(app.static_folder)
 
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
@@ -39,15 +68,30 @@ def serve(path):
     if static_folder_path is None:
             return "Static folder not configured", 404
 
-    if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
-        return send_from_directory(static_folder_path, path)
-    else:
-        index_path = os.path.join(static_folder_path, 'index.html')
-        if os.path.exists(index_path):
-            return send_from_directory(static_folder_path, 'index.html')
-        else:
+    asset = static_manifest.get(path)
+    if asset is None and path in static_manifest.large_files:
+        response = send_from_directory(static_folder_path, path)
+        response.headers['Cache-Control'] = static_manifest.cache_control(path)
+        return response
+    if asset is None:
+        # A missing bundle must not be answered with index.html
+        if path.startswith('assets/'):
+            return "Not found", 404
+        # Client-side routes get the SPA shell
+        asset = static_manifest.index
+        if asset is None:
             return "index.html not found", 404
 
+    body, etag, encoding = asset.select(request.accept_encodings)
+    response = Response(body, content_type=asset.mimetype)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = asset.cache_control
+    if asset.variants:
+        response.vary.add('Accept-Encoding')
+    if encoding:
+        response.content_encoding = encoding
+    return response.make_conditional(request)
+
 
 if __name__ == '__main__':
     port = int(os.getenv('PORT', 5000))
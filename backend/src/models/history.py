@@ -0,0 +1,120 @@
+import hashlib
+import re
+from src.models.user import db
+
+
+def question_hash(question: str) -> str:
+    """SHA-256 of a question with case and whitespace normalized, for grouping repeats"""
+    normalized = re.sub(r'\s+', ' ', (question or '').strip().lower())
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+class Comparison(db.Model):
+    """One finished /compare (or /compare/stream) run"""
+
+    __tablename__ = 'comparisons'
+    __table_args__ = (
+        db.Index('ix_comparisons_created', 'created_at', 'id'),
+        db.Index('ix_comparisons_agent1_created', 'agent1_id', 'created_at'),
+        db.Index('ix_comparisons_agent2_created', 'agent2_id', 'created_at'),
+        db.Index('ix_comparisons_question_created', 'question_hash', 'created_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    comparison_id = db.Column(db.String(32), unique=True, nullable=False)
+    session_id = db.Column(db.String(32))
+    created_at = db.Column(db.Float, nullable=False)
+    question = db.Column(db.Text, nullable=False)
+    question_hash = db.Column(db.String(64), nullable=False)
+    agent1_id = db.Column(db.String(80), nullable=False)
+    agent2_id = db.Column(db.String(80), nullable=False)
+    agent1_response = db.Column(db.Text)
+    agent2_response = db.Column(db.Text)
+    agent1_error = db.Column(db.Text)
+    agent2_error = db.Column(db.Text)
+    agent1_elapsed = db.Column(db.Float)
+    agent2_elapsed = db.Column(db.Float)
+    streamed = db.Column(db.Boolean, nullable=False, default=False)
+    best_practices = db.Column(db.JSON)
+    follow_up = db.Column(db.Boolean, nullable=False, default=False)
+    usage = db.Column(db.JSON)
+    # N-way runs: every agent in order, and each one's response, error and elapsed
+    # (agent1/agent2 hold the first two); NULL for two-agent comparisons
+    agent_ids = db.Column(db.JSON(none_as_null=True))
+    responses = db.Column(db.JSON(none_as_null=True))
+
+    def __repr__(self):
+        return f'<Comparison {self.comparison_id}>'
+
+    def to_dict(self, full: bool = True):
+        data = {
+            'id': self.id,
+            'comparison_id': self.comparison_id,
+            'session_id': self.session_id,
+            'created_at': self.created_at,
+            'question': self.question,
+            'question_hash': self.question_hash,
+            'agent1_id': self.agent1_id,
+            'agent2_id': self.agent2_id,
+            'agent1_error': self.agent1_error,
+            'agent2_error': self.agent2_error,
+            'agent1_elapsed': self.agent1_elapsed,
+            'agent2_elapsed': self.agent2_elapsed,
+            'streamed': self.streamed,
+            'best_practices': self.best_practices,
+            'follow_up': self.follow_up,
+            'agent_ids': self.agent_ids
+        }
+        if full:
+            data.update(agent1_response=self.agent1_response, agent2_response=self.agent2_response, usage=self.usage,
+                        responses=self.responses)
+        return data
+
+
+class Assessment(db.Model):
+    """One finished /assess (or /assess/stream) run, or the assessment part of a /compare"""
+
+    __tablename__ = 'assessments'
+    __table_args__ = (
+        db.Index('ix_assessments_created', 'created_at', 'id'),
+        db.Index('ix_assessments_agent1_created', 'agent1_id', 'created_at'),
+        db.Index('ix_assessments_agent2_created', 'agent2_id', 'created_at'),
+        db.Index('ix_assessments_question_created', 'question_hash', 'created_at'),
+        db.Index('ix_assessments_comparison', 'comparison_id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    comparison_id = db.Column(db.String(32))
+    created_at = db.Column(db.Float, nullable=False)
+    question = db.Column(db.Text, nullable=False)
+    question_hash = db.Column(db.String(64), nullable=False)
+    agent1_id = db.Column(db.String(80), nullable=False)
+    agent2_id = db.Column(db.String(80), nullable=False)
+    criteria = db.Column(db.JSON)
+    agent1_assessment = db.Column(db.Text)
+    agent2_assessment = db.Column(db.Text)
+    usage = db.Column(db.JSON)
+    # N-way runs: every agent involved (judge included), and the assessments as
+    # assessor_id/assessed_id/assessment entries; NULL for two-agent assessments
+    agent_ids = db.Column(db.JSON(none_as_null=True))
+    assessments = db.Column(db.JSON(none_as_null=True))
+
+    def __repr__(self):
+        return f'<Assessment {self.id}>'
+
+    def to_dict(self, full: bool = True):
+        data = {
+            'id': self.id,
+            'comparison_id': self.comparison_id,
+            'created_at': self.created_at,
+            'question': self.question,
+            'question_hash': self.question_hash,
+            'agent1_id': self.agent1_id,
+            'agent2_id': self.agent2_id,
+            'criteria': self.criteria,
+            'agent_ids': self.agent_ids
+        }
+        if full:
+            data.update(agent1_assessment=self.agent1_assessment, agent2_assessment=self.agent2_assessment,
+                        usage=self.usage, assessments=self.assessments)
+        return data
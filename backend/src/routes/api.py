@@ -1,100 +1,36 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, current_app, has_request_context, jsonify, request, stream_with_context
 import asyncio
+import hashlib
+import json
+import logging
+import math
+import os
+import queue
+import threading
 import time
+import uuid
+from src.models.history import Comparison
 from src.services.ai_service import AIService
+from src.services.batch_store import BatchStore
+from src.services.compression import ResponseCompressor
+from src.services.deadline import Deadline
+from src.services import fast_json
+from src.services.jobs import FINISHED, JobManager, job_queue_from_env
+from src.services.local_assessment import assess_pairs, summary_text
+from src.services.multi_compare import (
+    ASSESSMENT_MODES, answer_key, assessment_key, assessment_pairs, validate_agent_ids
+)
+from src.services.near_duplicates import NearDuplicateIndex, comparison_scope
+from src.services.pricing import cached_usage
+from src.services.prompts import build_assessment_prompt, build_compare_prompt, build_criteria_text
+from src.services.result_store import ComparisonStore
+from src.services.sessions import SessionStore
+from src.services.structured_logging import log_fields
 
-api_bp = Blueprint('api', __name__)
+logger = logging.getLogger(__name__)
 
-# Updated AI Agents Configuration with Corrected Models
-AGENTS = [
-    # OpenAI Models
-    {
-        "id": "gpt-3.5",
-        "name": "GPT-3.5 Turbo",
-        "provider": "openai",
-        "model": "gpt-3.5-turbo",
-        "domains": ["Chat/Reasoning", "Code", "Analysis"],
-        "tags": ["General-purpose Q&A", "Python", "Summarization"],
-        "tier": "free",
-        "enabled": True
-    },
-    {
-        "id": "gpt-4",
-        "name": "GPT-4",
-        "provider": "openai",
-        "model": "gpt-4",
-        "domains": ["Chat/Reasoning", "Code", "Analysis", "Creative"],
-        "tags": ["Advanced reasoning", "Complex tasks", "Creative writing"],
-        "tier": "free",
-        "enabled": True
-    },
-    
-    # Mistral AI Models (via Together.ai)
-    {
-        "id": "mistral-7b",
-        "name": "Mistral 7B",
-        "provider": "together",
-        "model": "mistralai/Mistral-7B-Instruct-v0.1",
-        "domains": ["Chat/Reasoning", "Analysis"],
-        "tags": ["General-purpose Q&A", "Fast responses"],
-        "tier": "free",
-        "enabled": True
-    },
-    {
-        "id": "mixtral-8x7b",
-        "name": "Mixtral 8x7B",
-        "provider": "together",
-        "model": "mistralai/Mixtral-8x7B-Instruct-v0.1",
-        "domains": ["Chat/Reasoning", "Code", "Analysis"],
-        "tags": ["Advanced reasoning", "Code generation", "Multi-lingual"],
-        "tier": "free",
-        "enabled": True
-    },
-    
-    # Meta Llama Models (via Together.ai)
-    {
-        "id": "llama-2-7b",
-        "name": "Llama 2 7B",
-        "provider": "together",
-        "model": "meta-llama/Llama-2-7b-chat-hf",
-        "domains": ["Chat/Reasoning"],
-        "tags": ["General-purpose Q&A", "Open source"],
-        "tier": "free",
-        "enabled": False
-    },
-    {
-        "id": "code-llama",
-        "name": "Code Llama 7B",
-        "provider": "together",
-        "model": "codellama/CodeLlama-7b-Instruct-hf",
-        "domains": ["Code"],
-        "tags": ["Python", "JavaScript", "Code generation"],
-        "tier": "free",
-        "enabled": False
-    },
-    
-    # Anthropic Models
-    {
-        "id": "claude-instant",
-        "name": "Claude Instant",
-        "provider": "anthropic",
-        "model": "claude-3-haiku-20240307",
-        "domains": ["Chat/Reasoning", "Analysis", "Creative"],
-        "tags": ["General-purpose Q&A", "Insight extraction", "Writing"],
-        "tier": "free",
-        "enabled": True
-    },
-    {
-        "id": "claude-3-haiku",
-        "name": "Claude 3 Haiku",
-        "provider": "anthropic",
-        "model": "claude-3-haiku-20240307",
-        "domains": ["Chat/Reasoning", "Analysis"],
-        "tags": ["Fast responses", "Cost-effective"],
-        "tier": "premium",
-        "enabled": False
-    }
-]
+api_bp = Blueprint('api', __name__)
+api_bp.after_request(ResponseCompressor())
 
 # Best practice phrases that can be added to prompts
 BEST_PRACTICES = [
@@ -107,6 +43,356 @@ BEST_PRACTICES = [
     "Use an example"
 ]
 
+# Static, so serialized once
+BEST_PRACTICES_PAYLOAD = fast_json.dumps({"phrases": BEST_PRACTICES, "total": len(BEST_PRACTICES)})
+BEST_PRACTICES_ETAG = hashlib.sha1(BEST_PRACTICES_PAYLOAD).hexdigest()
+
+_ai_service_lock = threading.Lock()
+
+
+def get_ai_service():
+    """Return the process-wide AIService held by the current app, creating it on first use"""
+    ai_service = current_app.extensions.get('ai_service')
+    if ai_service is None:
+        with _ai_service_lock:
+            ai_service = current_app.extensions.get('ai_service')
+            if ai_service is None:
+                ai_service = AIService().init_app(current_app)
+    return ai_service
+
+
+def get_batch_store():
+    """Return the app-wide BatchStore, creating it on first use"""
+    store = current_app.extensions.get('batch_store')
+    if store is None:
+        with _ai_service_lock:
+            store = current_app.extensions.get('batch_store')
+            if store is None:
+                db_path = os.getenv('BATCH_DB') or os.path.join(
+                    os.path.dirname(os.path.dirname(__file__)), 'database', 'batches.db'
+                )
+                store = current_app.extensions['batch_store'] = BatchStore(db_path)
+    return store
+
+
+def get_session_store():
+    """Return the app-wide conversation SessionStore, creating it on first use"""
+    store = current_app.extensions.get('session_store')
+    if store is None:
+        with _ai_service_lock:
+            store = current_app.extensions.get('session_store')
+            if store is None:
+                store = current_app.extensions['session_store'] = SessionStore()
+    return store
+
+
+def get_comparison_store():
+    """Return the app-wide ComparisonStore, creating it on first use"""
+    store = current_app.extensions.get('comparison_store')
+    if store is None:
+        with _ai_service_lock:
+            store = current_app.extensions.get('comparison_store')
+            if store is None:
+                store = current_app.extensions['comparison_store'] = ComparisonStore()
+    return store
+
+
+def get_near_duplicate_index():
+    """Return the app-wide NearDuplicateIndex, creating an empty one on first use"""
+    index = current_app.extensions.get('near_duplicates')
+    if index is None:
+        with _ai_service_lock:
+            index = current_app.extensions.get('near_duplicates')
+            if index is None:
+                index = NearDuplicateIndex().init_app(current_app)
+    return index
+
+
+def job_handlers():
+    """Job kinds the JobManager runs, by name"""
+    return {'compare': _run_compare, 'assess': _run_assess}
+
+
+def get_job_manager():
+    """Return the app-wide JobManager, creating it and starting its workers on first use
+
+    main.py starts it at app setup, so jobs left in a durable queue resume
+    after a restart; other apps only start workers once a job is submitted.
+    """
+    manager = current_app.extensions.get('job_manager')
+    if manager is None:
+        with _ai_service_lock:
+            manager = current_app.extensions.get('job_manager')
+            if manager is None:
+                manager = JobManager(job_queue_from_env(), job_handlers()).init_app(current_app._get_current_object())
+    return manager
+
+
+def _assessment_text(result):
+    """Turn a run_concurrent result into the assessment text shown to users"""
+    if result['error']:
+        return f"Error getting assessment: {result['error']}"
+    return result['response']
+
+
+def _validate_compare_fields(agent1_id, agent2_id, question):
+    """Check the required compare fields, returning an error message or None"""
+    if not agent1_id or not agent2_id or not question:
+        return "Missing required fields: agent1_id, agent2_id, question"
+    if agent1_id == agent2_id:
+        return "Cannot compare an agent with itself"
+    return None
+
+
+def _json_body():
+    """The request's JSON object, or None when the body is missing, malformed or not an object"""
+    data = request.get_json(silent=True)
+    return data if isinstance(data, dict) else None
+
+
+INVALID_BODY = {"error": "Request body must be a JSON object"}
+
+
+def _validate_agent_pair(ai_service, agent1_id, agent2_id):
+    """Check both agents are available, returning an error message or None"""
+    valid1, msg1 = ai_service.validate_model_availability(agent1_id)
+    if not valid1:
+        return f'Agent 1: {msg1}'
+    valid2, msg2 = ai_service.validate_model_availability(agent2_id)
+    if not valid2:
+        return f'Agent 2: {msg2}'
+    return None
+
+
+def _request_deadline(data, default=None, maximum=None):
+    """Deadline for the whole request, from the X-Request-Timeout header or a ``timeout`` field (seconds)
+
+    Falls back to ``default`` (REQUEST_DEADLINE) when neither is given or the
+    value is not a positive number, and never exceeds ``maximum``
+    (REQUEST_DEADLINE_MAX).
+    """
+    default = default or float(os.getenv('REQUEST_DEADLINE', '25'))
+    maximum = maximum or float(os.getenv('REQUEST_DEADLINE_MAX', '120'))
+    header = request.headers.get('X-Request-Timeout') if has_request_context() else None
+    value = header if header is not None else (data or {}).get('timeout')
+    try:
+        seconds = float(value) if value is not None else default
+    except (TypeError, ValueError):
+        seconds = default
+    if not seconds > 0:
+        seconds = default
+    return Deadline(min(seconds, maximum))
+
+
+def _deadline_info(deadline, results):
+    """Deadline summary for a response, listing the calls cut short by it"""
+    incomplete = [key for key, result in results.items() if result['timed_out']]
+    return {**deadline.summary(), "incomplete": incomplete, "partial": bool(incomplete)}
+
+
+def _assessment_inputs(data):
+    """Agents, question and both responses to assess, returning (inputs, error message, status)
+
+    Clients either send the ``comparison_id`` returned by /compare or, as
+    older clients do, the agent ids, question and both responses in full.
+    """
+    comparison_id = data.get('comparison_id')
+    if comparison_id:
+        comparison = get_comparison_store().get(comparison_id)
+        if comparison is None:
+            return None, f"Comparison {comparison_id} not found or expired", 404
+        if 'responses' in comparison:
+            return None, f"Comparison {comparison_id} compared {len(comparison['agent_ids'])} agents; assess it with /assess", 400
+        for key in ('agent1', 'agent2'):
+            if not comparison[f'{key}_response']:
+                return None, f"Comparison {comparison_id} has no response from {key} to assess", 400
+        return comparison, None, None
+
+    inputs = {key: data.get(key) for key in ('agent1_id', 'agent2_id', 'question', 'agent1_response', 'agent2_response')}
+    if not all(inputs.values()):
+        return None, "Missing required fields", 400
+    return inputs, None, None
+
+
+def _history_budget(agent1_info, agent2_info):
+    """Token budget for a session's history: the smaller of both agents' budgets
+
+    Agents may set ``history_tokens`` in the agent config; otherwise
+    SESSION_HISTORY_TOKENS applies.
+    """
+    default = int(os.getenv('SESSION_HISTORY_TOKENS', '3000'))
+    return min(agent1_info.get('history_tokens', default), agent2_info.get('history_tokens', default))
+
+
+def _resolve_session(data):
+    """Look up the session named in a compare request, returning (session, error message, status)"""
+    session_id = data.get('session_id')
+    if not session_id:
+        return None, None, None
+    session = get_session_store().get(session_id)
+    if session is None:
+        return None, f"Session {session_id} not found or expired", 404
+    agent_ids = (data.get('agent1_id') or session.agent1_id, data.get('agent2_id') or session.agent2_id)
+    if agent_ids != (session.agent1_id, session.agent2_id):
+        return None, "Session belongs to a different pair of agents", 400
+    return session, None, None
+
+
+def _build_compare_prompts(session, agent1_id, question, best_practices, context):
+    """Prompts for both agents: from the session history when it has any, otherwise the stateless prompt"""
+    if session is not None and session.turns:
+        return {key: session.history_prompt(key, question, best_practices) for key in ('agent1', 'agent2')}
+    # Older clients' follow-up context; both agents get the same prompt
+    own_key = 'agent1' if agent1_id == 'gpt-3.5' else 'agent2'
+    prompt = build_compare_prompt(question, best_practices, context, own_key)
+    return {'agent1': prompt, 'agent2': prompt}
+
+
+def _session_info(session):
+    """Session summary returned with each compare response"""
+    details = session.to_dict()
+    return {key: details[key] for key in ('session_id', 'turn_count', 'omitted', 'history_tokens', 'budget')}
+
+
+def _usage_summary(results):
+    """Token usage and estimated cost per call, plus totals, for API responses"""
+    usage = {key: result.get('usage') for key, result in results.items()}
+    known = [call_usage for call_usage in usage.values() if call_usage]
+    usage['total'] = {
+        "input_tokens": sum(call_usage['input_tokens'] for call_usage in known),
+        "output_tokens": sum(call_usage['output_tokens'] for call_usage in known),
+        "cached_input_tokens": sum(call_usage.get('cached_input_tokens', 0) for call_usage in known),
+        "cost": round(sum(call_usage['cost'] or 0 for call_usage in known), 8)
+    }
+    return usage
+
+
+def _sse(event, data):
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _sse_response(ai_service, calls, start_payload, error_prefixes, deadline, on_complete=None):
+    """Stream concurrent completions to the client as tagged Server-Sent Events
+
+    Emits ``start``, then ``token`` events tagged with their call key, one
+    ``agent_done`` or ``agent_error`` per key, and a final ``done`` event with
+    time-to-first-token and total time for every key. Streams still running
+    at the request deadline end with an ``agent_error`` marked ``timed_out``.
+    ``on_complete`` receives the full text per key (None for failed keys)
+    once every stream has finished.
+    """
+    def generate():
+        started = time.monotonic()
+        timing = {}
+        incomplete = []
+        texts = {key: [] for key in calls}
+        yield _sse('start', start_payload)
+        for key, kind, value in ai_service.stream_concurrent(calls, deadline=deadline):
+            if kind == 'token':
+                texts[key].append(value)
+                yield _sse('token', {"agent": key, "text": value})
+                continue
+            timing[key] = {"ttft": value['ttft'], "total": value['total']}
+            if kind == 'error':
+                texts[key] = None
+                timed_out = value.get('timed_out', False)
+                if timed_out:
+                    incomplete.append(key)
+                yield _sse('agent_error', {
+                    "agent": key,
+                    "error": f"{error_prefixes[key]}: {value['error']}",
+                    "timed_out": timed_out
+                })
+            else:
+                yield _sse('agent_done', {"agent": key, **timing[key]})
+        timing['total'] = round(time.monotonic() - started, 3)
+        if on_complete is not None:
+            on_complete({key: ''.join(text).strip() if text is not None else None for key, text in texts.items()})
+        yield _sse('done', {
+            "timing": timing,
+            "deadline": {**deadline.summary(), "incomplete": incomplete, "partial": bool(incomplete)},
+            "timestamp": time.time()
+        })
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+def _ndjson(data):
+    """Format one newline-delimited JSON record"""
+    return json.dumps(data) + "\n"
+
+
+def _record_history(kind, **row):
+    """Queue a finished compare or assessment for the history database, when enabled"""
+    writer = current_app.extensions.get('history_writer')
+    if writer is not None:
+        getattr(writer, f'record_{kind}')(**row)
+
+
+REUSE_MODES = ('off', 'offer', 'return')
+
+
+def _reuse_mode(data, bypass_cache, follow_up):
+    """How a compare may use a near-duplicate past question: 'off', 'offer' or 'return'
+
+    Taken from the request's ``reuse`` field, defaulting to NEAR_DUP_MODE.
+    Follow-ups depend on their conversation, so they never reuse.
+    """
+    if bypass_cache or follow_up:
+        return 'off'
+    mode = str(data.get('reuse') or os.getenv('NEAR_DUP_MODE', 'offer')).lower()
+    return mode if mode in REUSE_MODES else 'off'
+
+
+def _stored_responses(comparison_id):
+    """Both responses of a past comparison, from the comparison store or else the history database"""
+    stored = get_comparison_store().get(comparison_id)
+    if stored is None and current_app.extensions.get('history_writer') is not None:
+        row = Comparison.query.filter_by(comparison_id=comparison_id).first()
+        stored = row.to_dict() if row is not None else None
+    if stored is None or stored['agent1_response'] is None or stored['agent2_response'] is None:
+        return None
+    return stored['agent1_response'], stored['agent2_response']
+
+
+def _wants_job(data):
+    """Whether the client asked for job mode (``"job": true`` or ``Prefer: respond-async``)"""
+    return (data or {}).get('job') is True or 'respond-async' in request.headers.get('Prefer', '')
+
+
+def _submit_job(kind, data):
+    """Queue the request as a job and answer 202 with where to follow it"""
+    payload = dict(data)
+    if 'X-Request-Timeout' in request.headers:
+        # The deadline starts when a worker picks the job up, not at submission
+        payload['timeout'] = request.headers['X-Request-Timeout']
+    try:
+        job = get_job_manager().submit(kind, payload)
+    except queue.Full:
+        return jsonify({"error": "Job queue is full, try again later"}), 503, {'Retry-After': '5'}
+    job_id = job['job_id']
+    return jsonify({
+        "job_id": job_id,
+        "status": job['status'],
+        "status_url": f"/api/jobs/{job_id}",
+        "events_url": f"/api/jobs/{job_id}/events"
+    }), 202, {'Location': f"/api/jobs/{job_id}"}
+
+
+def _job_info(job, include_result=True):
+    """Public view of a job: its state, timings and (once finished) result"""
+    info = {key: job[key] for key in ('job_id', 'kind', 'status', 'created_at', 'started_at', 'finished_at')}
+    if include_result and job['status'] in FINISHED:
+        info['status_code'] = job['status_code']
+        info['result'] = job['result']
+    return info
+
+
 @api_bp.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
@@ -120,12 +406,44 @@ def health_check():
 def get_agents():
     """Get list of available AI agents"""
     try:
+        payload, etag = get_ai_service().registry.agents_payload()
+        response = Response(payload, mimetype='application/json')
+        response.set_etag(etag)
+        return response.make_conditional(request)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@api_bp.route('/cache/stats', methods=['GET'])
+def get_cache_stats():
+    """Get completion cache hit/miss counters and request coalescing rate"""
+    try:
+        ai_service = get_ai_service()
+        cache = ai_service.cache
+        return jsonify({
+            "enabled": cache is not None,
+            "stats": cache.stats() if cache is not None else None,
+            "singleflight": ai_service.singleflight.stats(),
+            "retry_budget": ai_service.retry_budget.stats()
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@api_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Provider call latency, token, error and cost metrics in Prometheus text format"""
+    try:
+        return Response(get_ai_service().metrics.render(), mimetype='text/plain; version=0.0.4')
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@api_bp.route('/providers/status', methods=['GET'])
+def get_providers_status():
+    """Get each provider's configuration, circuit breaker state and last health probe"""
+    try:
+        ai_service = get_ai_service()
         return jsonify({
-            "agents": AGENTS,
-            "total": len(AGENTS),
-            "enabled": len([a for a in AGENTS if a['enabled']]),
-            "free_tier": len([a for a in AGENTS if a['tier'] == 'free' and a['enabled']]),
-            "premium_tier": len([a for a in AGENTS if a['tier'] == 'premium'])
+            "providers": ai_service.get_provider_status(),
+            "timestamp": time.time()
         })
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -134,104 +452,153 @@ def get_agents():
 def get_best_practices():
     """Get list of best practice phrases"""
     try:
-        return jsonify({
-            "phrases": BEST_PRACTICES,
-            "total": len(BEST_PRACTICES)
-        })
+        response = Response(BEST_PRACTICES_PAYLOAD, mimetype='application/json')
+        response.set_etag(BEST_PRACTICES_ETAG)
+        return response.make_conditional(request)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-@api_bp.route('/compare', methods=['POST'])
-def compare_agents():
-    """Main endpoint for comparing two AI agents"""
+def _run_compare(data):
+    """Compare two agents on a question, returning (response body, status)
+
+    Shared by /compare and its job mode, so it must not touch ``request``.
+    """
     try:
-        print("=== COMPARE ENDPOINT CALLED ===")
-        data = request.get_json()
-        print(f"Request data received: {data}")
-        agent1_id = data.get('agent1_id')
-        agent2_id = data.get('agent2_id')
+        if 'agent_ids' in (data or {}):
+            return _run_compare_multi(data)
+        deadline = _request_deadline(data)
+        
+        # Follow-ups may send just a session id; its history stays server-side
+        session, error, status = _resolve_session(data)
+        if error:
+            return {"error": error}, status
+        agent1_id = data.get('agent1_id') or (session.agent1_id if session else None)
+        agent2_id = data.get('agent2_id') or (session.agent2_id if session else None)
         question = data.get('question')
         best_practices = data.get('best_practices', [])
         context = data.get('context',None)
         conversation_history = data.get('conversation_history',[])
+        include_assessment = bool(data.get('include_assessment', False))
+        bypass_cache = bool(data.get('bypass_cache', False))
+        assessment_criteria = data.get('assessment_criteria',[])
         
         # Validate input
-        if not agent1_id or not agent2_id or not question:
-            return jsonify({"error": "Missing required fields: agent1_id, agent2_id, question"}), 400
+        error = _validate_compare_fields(agent1_id, agent2_id, question)
+        if error:
+            return {"error": error}, 400
         
-        if agent1_id == agent2_id:
-            return jsonify({"error": "Cannot compare an agent with itself"}), 400
-        
-        # Initialize AI service
-        print("About to initialize AIService...")
-        ai_service = AIService()
-        print("AIService initialized successfully")
+        ai_service = get_ai_service()
         
         # Validate models are available
-        valid1, msg1 = ai_service.validate_model_availability(agent1_id)
-        if not valid1:
-            return jsonify({'error': f'Agent 1: {msg1}'}), 400
-            
-        valid2, msg2 = ai_service.validate_model_availability(agent2_id)
-        if not valid2:
-            return jsonify({'error': f'Agent 2: {msg2}'}), 400
-        
-        # Build enhanced prompt with best practices
-        enhanced_question = question
-        if best_practices:
-            enhanced_question += "\n\nAlso: " + " ".join(best_practices)
-
-        # Add follow-up context if this is a follow-up question
-        if conversation_history:
-            enhanced_question = "Conversation history:\n"
-            for i, exchange in enumerate(conversation_history):
-                enhanced_question += f"\nQ{i+1}: {exchange['question']}\n"
-                enhanced_question += f"Your previous response: {exchange.get('agent1_response' if agent1_id else 'agent2_response', '')}\n"
-                enhanced_question += f"Other agent's response: {exchange.get('agent2_response' if agent1_id else 'agent1_response', '')}\n"
-            enhanced_question += f"\nCurrent question: {question}"
-        elif context:
-            enhanced_question = f"Previous question: {context['original_question']}\n"
-            enhanced_question += f"Your previous response: {context['original_responses'].get('agent1' if agent1_id == 'gpt-3.5' else 'agent2', '')}\n"
-            enhanced_question += f"Other agent's response: {context['original_responses'].get('agent2' if agent1_id == 'gpt-3.5' else 'agent1', '')}\n\n"
-            enhanced_question += f"Follow-up question: {question}"
-        
-        # Add best practices
-        if best_practices:
-            enhanced_question += "\n\nAlso: " + " ".join(best_practices)
+        error = _validate_agent_pair(ai_service, agent1_id, agent2_id)
+        if error:
+            return {'error': error}, 400
         
         # Get agent information
         agent1_info = ai_service.get_model_info(agent1_id)
         agent2_info = ai_service.get_model_info(agent2_id)
         
-        # Step 1: Get initial responses from both agents
-        print("Aboutto call first AI service...")
-        try:
-            response1 = ai_service.get_completion(
-                agent1_info['provider'], 
-                agent1_info['model'], 
-                enhanced_question
+        # New conversations get a session; client-side history is imported once
+        if session is None:
+            session = get_session_store().create(
+                agent1_id, agent2_id, _history_budget(agent1_info, agent2_info), conversation_history
             )
-        except Exception as e:
-            print(f"FULL ERROR: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            return jsonify({
-                "error": f"Error getting response from {agent1_info['name']}: {str(e)}"
-            }), 500
+        follow_up = bool(session.turns or context)
+        prompts = _build_compare_prompts(session, agent1_id, question, best_practices, context)
         
-        try:
-            response2 = ai_service.get_completion(
-                agent2_info['provider'], 
-                agent2_info['model'], 
-                enhanced_question
-            )
-        except Exception as e:
-            return jsonify({
-                "error": f"Error getting response from {agent2_info['name']}: {str(e)}"
-            }), 500 
+        # A near-duplicate of a past question can be pointed out, or answered from its stored result
+        reuse_mode = _reuse_mode(data, bypass_cache, follow_up)
+        scope = comparison_scope(agent1_id, agent2_id, best_practices)
+        similar = get_near_duplicate_index().query(scope, question) if reuse_mode != 'off' else None
+        stored = None
+        if similar is not None and reuse_mode == 'return' and not include_assessment:
+            stored = _stored_responses(similar['comparison_id'])
+            if stored is None:
+                get_near_duplicate_index().discard(similar['comparison_id'])
+        
+        # Step 1: Get initial responses from both agents concurrently
+        calls = {
+            'agent1': {
+                'provider': agent1_info['provider'],
+                'model': agent1_info['model'],
+                'prompt': prompts['agent1'],
+                'bypass_cache': bypass_cache
+            },
+            'agent2': {
+                'provider': agent2_info['provider'],
+                'model': agent2_info['model'],
+                'prompt': prompts['agent2'],
+                'bypass_cache': bypass_cache
+            }
+        }
+
+        # Step 2 (optional): start each cross-assessment as soon as the answer it grades is ready
+        if include_assessment:
+            criteria_text = build_criteria_text(assessment_criteria)
+            calls['agent1_assessment'] = {
+                'provider': agent2_info['provider'],
+                'model': agent2_info['model'],
+                'depends_on': 'agent1',
+                'prompt': lambda answer: build_assessment_prompt(question, answer, criteria_text),
+                'bypass_cache': bypass_cache
+            }
+            calls['agent2_assessment'] = {
+                'provider': agent1_info['provider'],
+                'model': agent1_info['model'],
+                'depends_on': 'agent2',
+                'prompt': lambda answer: build_assessment_prompt(question, answer, criteria_text),
+                'bypass_cache': bypass_cache
+            }
+
+        started = time.monotonic()
+        if stored is not None:
+            results = {
+                key: {'response': response, 'error': None, 'elapsed': 0.0, 'timed_out': False, 'usage': cached_usage()}
+                for key, response in zip(('agent1', 'agent2'), stored)
+            }
+        else:
+            results = ai_service.run_concurrent(calls, deadline=deadline)
+        total_elapsed = round(time.monotonic() - started, 3)
+
+        error1 = results['agent1']['error']
+        error2 = results['agent2']['error']
+        if error1:
+            error1 = f"Error getting response from {agent1_info['name']}: {error1}"
+            logger.warning("Agent call failed", extra=log_fields(
+                agent=agent1_id, timed_out=results['agent1']['timed_out'], error=error1))
+        if error2:
+            error2 = f"Error getting response from {agent2_info['name']}: {error2}"
+            logger.warning("Agent call failed", extra=log_fields(
+                agent=agent2_id, timed_out=results['agent2']['timed_out'], error=error2))
+
+        # Only fail the whole comparison when neither agent answered
+        if error1 and error2:
+            timed_out = results['agent1']['timed_out'] and results['agent2']['timed_out']
+            return {
+                "error": f"{error1}; {error2}",
+                "deadline": _deadline_info(deadline, results)
+            }, 504 if timed_out else 500
+        
+        session.add_turn(question, results['agent1']['response'], results['agent2']['response'])
+        get_session_store().save(session)
+        
+        # Keep the answers so /assess can reference them by id
+        comparison_id = ComparisonStore.new_id()
+        get_comparison_store().save(
+            comparison_id, question, agent1_id, agent2_id,
+            results['agent1']['response'], results['agent2']['response']
+        )
         
+        # Summaries only: questions and responses can be large and are not logged
+        logger.info("Compare finished", extra=log_fields(
+            comparison_id=comparison_id, agent1=agent1_id, agent2=agent2_id,
+            question_chars=len(question or ''), history_turns=len(session.turns),
+            include_assessment=include_assessment, reused=stored is not None, elapsed=total_elapsed,
+            agent1_elapsed=results['agent1']['elapsed'], agent2_elapsed=results['agent2']['elapsed']))
+
         # Return comprehensive comparison results
-        return jsonify({
+        comparison = {
+            "comparison_id": comparison_id,
             "question": question,
             "best_practices_used": best_practices,
             "agent1": {
@@ -240,7 +607,9 @@ def compare_agents():
                 "provider": agent1_info['provider'],
                 "domains": agent1_info['domains'],
                 "tags": agent1_info['tags'],
-                "response": response1,
+                "response": results['agent1']['response'],
+                "error": error1,
+                "timed_out": results['agent1']['timed_out'],
             },
             "agent2": {
                 "id": agent2_id,
@@ -248,103 +617,931 @@ def compare_agents():
                 "provider": agent2_info['provider'],
                 "domains": agent2_info['domains'],
                 "tags": agent2_info['tags'],
-                "response": response2,
+                "response": results['agent2']['response'],
+                "error": error2,
+                "timed_out": results['agent2']['timed_out'],
             },
+            "timing": {
+                "agent1": results['agent1']['elapsed'],
+                "agent2": results['agent2']['elapsed'],
+                "total": total_elapsed
+            },
+            "usage": _usage_summary(results),
+            "deadline": _deadline_info(deadline, results),
+            "session": _session_info(session),
+            "session_id": session.id,
             "timestamp": time.time()
-        })
+        }
+
+        if include_assessment:
+            comparison["assessments"] = {
+                "agent1_assessment_by_agent2": _assessment_text(results['agent1_assessment']),
+                "agent2_assessment_by_agent1": _assessment_text(results['agent2_assessment']),
+                "assessor_info": {
+                    "agent1_name": agent1_info['name'],
+                    "agent2_name": agent2_info['name']
+                }
+            }
+            comparison["timing"]["agent1_assessment"] = results['agent1_assessment']['elapsed']
+            comparison["timing"]["agent2_assessment"] = results['agent2_assessment']['elapsed']
+
+        if stored is not None:
+            # Already in history under the original comparison
+            comparison["reused"] = similar
+            return comparison, 200
+        if similar is not None:
+            comparison["similar"] = similar
+
+        _record_history(
+            'comparison', comparison_id=comparison_id, session_id=session.id, question=question,
+            agent1_id=agent1_id, agent2_id=agent2_id,
+            agent1_response=results['agent1']['response'], agent2_response=results['agent2']['response'],
+            agent1_error=error1, agent2_error=error2,
+            agent1_elapsed=results['agent1']['elapsed'], agent2_elapsed=results['agent2']['elapsed'],
+            best_practices=best_practices, follow_up=follow_up, usage=comparison['usage']
+        )
+        if not (follow_up or error1 or error2):
+            get_near_duplicate_index().add(scope, comparison_id, question)
+        if include_assessment:
+            _record_history(
+                'assessment', comparison_id=comparison_id, question=question,
+                agent1_id=agent1_id, agent2_id=agent2_id, criteria=assessment_criteria,
+                agent1_assessment=comparison['assessments']['agent1_assessment_by_agent2'],
+                agent2_assessment=comparison['assessments']['agent2_assessment_by_agent1']
+            )
+
+        return comparison, 200
         
+    except Exception as e:
+        logger.exception("Compare failed")
+        return {"error": f"Unexpected error: {str(e)}"}, 500
+
+
+def _validate_agents(ai_service, agent_ids):
+    """Check every agent is available, returning an error message or None"""
+    for agent_id in agent_ids:
+        valid, msg = ai_service.validate_model_availability(agent_id)
+        if not valid:
+            return f'{agent_id}: {msg}'
+    return None
+
+
+def _assessment_calls(pairs, infos, question, responses, criteria_text, bypass_cache):
+    """Calls for (assessor, assessed) pairs; answers not yet known are waited for by dependency"""
+    calls = {}
+    for assessor, assessed in pairs:
+        call = {
+            'provider': infos[assessor]['provider'],
+            'model': infos[assessor]['model'],
+            'bypass_cache': bypass_cache
+        }
+        if responses is None:
+            call['depends_on'] = answer_key(assessed)
+            call['prompt'] = lambda answer: build_assessment_prompt(question, answer, criteria_text)
+        elif responses.get(assessed):
+            call['prompt'] = build_assessment_prompt(question, responses[assessed], criteria_text)
+        else:
+            continue
+        calls[assessment_key(assessor, assessed)] = call
+    return calls
+
+
+def _assessment_list(pairs, results):
+    """N-way assessments in plan order, one entry per (assessor, assessed) pair that ran"""
+    return [
+        {
+            "assessor_id": assessor,
+            "assessed_id": assessed,
+            "assessment": _assessment_text(results[assessment_key(assessor, assessed)]),
+            "elapsed": results[assessment_key(assessor, assessed)]['elapsed'],
+            "timed_out": results[assessment_key(assessor, assessed)]['timed_out']
+        }
+        for assessor, assessed in pairs if assessment_key(assessor, assessed) in results
+    ]
+
+
+def _run_compare_multi(data):
+    """Compare the N agents in ``agent_ids`` on a question, returning (response body, status)
+
+    Every answer starts at once. With ``include_assessment`` each assessment
+    starts as soon as the answer it grades is in, following
+    ``assessment_mode`` (and ``judge_id`` for the ``judge`` mode). All calls
+    are held to the per-provider concurrency caps. N-way comparisons do not
+    keep a session; history records every agent's answer in ``responses``.
+    """
+    deadline = _request_deadline(data)
+    agent_ids = data.get('agent_ids')
+    question = data.get('question')
+    best_practices = data.get('best_practices', [])
+    include_assessment = bool(data.get('include_assessment', False))
+    assessment_mode = data.get('assessment_mode', 'all_pairs')
+    judge_id = data.get('judge_id')
+    bypass_cache = bool(data.get('bypass_cache', False))
+    assessment_criteria = data.get('assessment_criteria', [])
+
+    error = validate_agent_ids(agent_ids)
+    if error is None and not question:
+        error = "Missing required field: question"
+    if error is None and assessment_mode not in ASSESSMENT_MODES:
+        error = f"Unknown assessment_mode: {assessment_mode}"
+    if error is None and judge_id is not None and not isinstance(judge_id, str):
+        error = "judge_id must be an agent id"
+    if error:
+        return {"error": error}, 400
+
+    ai_service = get_ai_service()
+    judges = [judge_id] if include_assessment and judge_id and judge_id not in agent_ids else []
+    error = _validate_agents(ai_service, agent_ids + judges)
+    if error:
+        return {"error": error}, 400
+    infos = {agent_id: ai_service.get_model_info(agent_id) for agent_id in agent_ids + judges}
+
+    # Without follow-up context every agent gets the same prompt
+    prompt = build_compare_prompt(question, best_practices)
+    calls = {
+        answer_key(agent_id): {
+            'provider': infos[agent_id]['provider'],
+            'model': infos[agent_id]['model'],
+            'prompt': prompt,
+            'bypass_cache': bypass_cache
+        }
+        for agent_id in agent_ids
+    }
+    pairs = assessment_pairs(agent_ids, assessment_mode, judge_id) if include_assessment else []
+    calls.update(_assessment_calls(
+        pairs, infos, question, None, build_criteria_text(assessment_criteria), bypass_cache
+    ))
+
+    started = time.monotonic()
+    results = ai_service.run_concurrent(calls, deadline=deadline, scheduled=True)
+    total_elapsed = round(time.monotonic() - started, 3)
+
+    answers = {agent_id: results[answer_key(agent_id)] for agent_id in agent_ids}
+    errors = {
+        agent_id: f"Error getting response from {infos[agent_id]['name']}: {result['error']}"
+        for agent_id, result in answers.items() if result['error']
+    }
+    for agent_id, error in errors.items():
+        logger.warning("Agent call failed", extra=log_fields(
+            agent=agent_id, timed_out=answers[agent_id]['timed_out'], error=error))
+    if len(errors) == len(agent_ids):
+        timed_out = all(result['timed_out'] for result in answers.values())
+        return {
+            "error": "; ".join(errors.values()),
+            "deadline": _deadline_info(deadline, results)
+        }, 504 if timed_out else 500
+
+    comparison_id = ComparisonStore.new_id()
+    get_comparison_store().save_multi(
+        comparison_id, question, {agent_id: result['response'] for agent_id, result in answers.items()}
+    )
+    logger.info("Compare finished", extra=log_fields(
+        comparison_id=comparison_id, agents=agent_ids, question_chars=len(question),
+        assessments=len(pairs), assessment_mode=assessment_mode if pairs else None, elapsed=total_elapsed))
+
+    comparison = {
+        "comparison_id": comparison_id,
+        "question": question,
+        "best_practices_used": best_practices,
+        "agents": [
+            {
+                "id": agent_id,
+                "name": infos[agent_id]['name'],
+                "provider": infos[agent_id]['provider'],
+                "domains": infos[agent_id]['domains'],
+                "tags": infos[agent_id]['tags'],
+                "response": answers[agent_id]['response'],
+                "error": errors.get(agent_id),
+                "timed_out": answers[agent_id]['timed_out']
+            }
+            for agent_id in agent_ids
+        ],
+        "timing": {**{agent_id: result['elapsed'] for agent_id, result in answers.items()}, "total": total_elapsed},
+        "usage": _usage_summary(results),
+        "deadline": _deadline_info(deadline, results),
+        "timestamp": time.time()
+    }
+    if include_assessment:
+        comparison["assessment_mode"] = assessment_mode
+        comparison["assessments"] = _assessment_list(pairs, results)
+
+    first, second = agent_ids[:2]
+    _record_history(
+        'comparison', comparison_id=comparison_id, question=question,
+        agent1_id=first, agent2_id=second,
+        agent1_response=answers[first]['response'], agent2_response=answers[second]['response'],
+        agent1_error=errors.get(first), agent2_error=errors.get(second),
+        agent1_elapsed=answers[first]['elapsed'], agent2_elapsed=answers[second]['elapsed'],
+        best_practices=best_practices, usage=comparison['usage'],
+        agent_ids=agent_ids, responses={
+            agent_id: {
+                'response': answers[agent_id]['response'],
+                'error': errors.get(agent_id),
+                'elapsed': answers[agent_id]['elapsed']
+            }
+            for agent_id in agent_ids
+        }
+    )
+    if include_assessment:
+        _record_multi_assessment(comparison_id, question, agent_ids + judges, assessment_criteria,
+                                 comparison['assessments'])
+    return comparison, 200
+
+
+def _record_multi_assessment(comparison_id, question, agent_ids, criteria, assessments, usage=None):
+    """Queue N-way assessments for the history database, the first two agents in the pair columns"""
+    _record_history(
+        'assessment', comparison_id=comparison_id, question=question,
+        agent1_id=agent_ids[0], agent2_id=agent_ids[1], criteria=criteria, usage=usage,
+        agent_ids=agent_ids, assessments=[
+            {key: entry[key] for key in ('assessor_id', 'assessed_id', 'assessment')} for entry in assessments
+        ]
+    )
+
+
+@api_bp.route('/compare', methods=['POST'])
+def compare_agents():
+    """Main endpoint for comparing two AI agents
+
+    In job mode it answers 202 with a job id at once; the comparison runs on
+    a job worker and is collected from /jobs/<job_id>.
+    """
+    try:
+        data = _json_body()
+        if data is None:
+            return jsonify(INVALID_BODY), 400
+        if _wants_job(data):
+            return _submit_job('compare', data)
+        body, status = _run_compare(data)
+        return jsonify(body), status
     except Exception as e:
         return jsonify({"error": f"Unexpected error: {str(e)}"}), 500
 
 
-@api_bp.route('/assess', methods=['POST'])
-def assess_responses():
-    """Get cross-assessments for existing responses"""
+@api_bp.route('/compare/stream', methods=['POST'])
+def compare_agents_stream():
+    """Stream both agents' responses token by token as Server-Sent Events"""
     try:
-        data = request.get_json()
-        agent1_id = data.get('agent1_id')
-        agent2_id = data.get('agent2_id')
+        data = _json_body()
+        if data is None:
+            return jsonify(INVALID_BODY), 400
+        if 'agent_ids' in data:
+            return jsonify({"error": "N-way comparisons are not streamed; use /compare"}), 400
+        deadline = _request_deadline(data)
+        session, error, status = _resolve_session(data)
+        if error:
+            return jsonify({"error": error}), status
+        agent1_id = data.get('agent1_id') or (session.agent1_id if session else None)
+        agent2_id = data.get('agent2_id') or (session.agent2_id if session else None)
         question = data.get('question')
-        agent1_response = data.get('agent1_response')
-        agent2_response = data.get('agent2_response')
-        assessment_criteria = data.get('assessment_criteria',[])
+        best_practices = data.get('best_practices', [])
+        context = data.get('context',None)
+        conversation_history = data.get('conversation_history',[])
+        bypass_cache = bool(data.get('bypass_cache', False))
         
         # Validate input
-        if not all([agent1_id, agent2_id, question, agent1_response, agent2_response]):
-            return jsonify({"error": "Missing required fields"}), 400
+        error = _validate_compare_fields(agent1_id, agent2_id, question)
+        if error:
+            return jsonify({"error": error}), 400
         
-        # Initialize AI service
-        ai_service = AIService()
+        ai_service = get_ai_service()
+        error = _validate_agent_pair(ai_service, agent1_id, agent2_id)
+        if error:
+            return jsonify({'error': error}), 400
         
-        # Get agent information
         agent1_info = ai_service.get_model_info(agent1_id)
         agent2_info = ai_service.get_model_info(agent2_id)
+        if session is None:
+            session = get_session_store().create(
+                agent1_id, agent2_id, _history_budget(agent1_info, agent2_info), conversation_history
+            )
+        follow_up = bool(session.turns or context)
+        prompts = _build_compare_prompts(session, agent1_id, question, best_practices, context)
         
-        # Build assessment criteria text
-        if assessment_criteria:
-            criteria_text = "Focus your assessment on these specific aspects:\n" + "\n".join([f"- {criteria}" for criteria in assessment_criteria])
-        else:
-            criteria_text = "Assess its accuracy and completeness. Suggest improvements or revisions if needed."
+        calls = {
+            'agent1': {
+                'provider': agent1_info['provider'],
+                'model': agent1_info['model'],
+                'prompt': prompts['agent1'],
+                'bypass_cache': bypass_cache
+            },
+            'agent2': {
+                'provider': agent2_info['provider'],
+                'model': agent2_info['model'],
+                'prompt': prompts['agent2'],
+                'bypass_cache': bypass_cache
+            }
+        }
+        session_store = get_session_store()
+        comparison_store = get_comparison_store()
+        near_duplicates = get_near_duplicate_index()
+        comparison_id = ComparisonStore.new_id()
+        
+        def record_results(responses):
+            if responses['agent1'] is not None or responses['agent2'] is not None:
+                session.add_turn(question, responses['agent1'], responses['agent2'])
+                session_store.save(session)
+                comparison_store.save(
+                    comparison_id, question, agent1_id, agent2_id, responses['agent1'], responses['agent2']
+                )
+                _record_history(
+                    'comparison', comparison_id=comparison_id, session_id=session.id, question=question,
+                    agent1_id=agent1_id, agent2_id=agent2_id,
+                    agent1_response=responses['agent1'], agent2_response=responses['agent2'],
+                    best_practices=best_practices, follow_up=follow_up, streamed=True
+                )
+            if not follow_up and responses['agent1'] is not None and responses['agent2'] is not None:
+                near_duplicates.add(comparison_scope(agent1_id, agent2_id, best_practices), comparison_id, question)
         
-        assessment_prompt_template = """I asked the following question:
-"{question}"
+        start_payload = {
+            "comparison_id": comparison_id,
+            "session_id": session.id,
+            "question": question,
+            "best_practices_used": best_practices,
+            "agent1": {"id": agent1_id, "name": agent1_info['name'], "provider": agent1_info['provider']},
+            "agent2": {"id": agent2_id, "name": agent2_info['name'], "provider": agent2_info['provider']}
+        }
+        error_prefixes = {
+            'agent1': f"Error getting response from {agent1_info['name']}",
+            'agent2': f"Error getting response from {agent2_info['name']}"
+        }
+        return _sse_response(ai_service, calls, start_payload, error_prefixes, deadline, record_results)
+        
+    except Exception as e:
+        return jsonify({"error": f"Unexpected error: {str(e)}"}), 500
 
-I received this answer:
-"{answer}"
 
-{criteria}"""
+ASSESS_MODES = ('llm', 'local', 'auto')
 
-        
-        # Agent 2 assesses Agent 1's response
+
+def _disagreement_threshold(data):
+    """The request's ``disagreement_threshold``, defaulting to ASSESS_DISAGREEMENT_THRESHOLD
+
+    Raises ValueError when it is not a finite number.
+    """
+    value = data.get('disagreement_threshold')
+    if value is None:
+        value = os.getenv('ASSESS_DISAGREEMENT_THRESHOLD', '0.35')
+    try:
+        threshold = float(value)
+    except (TypeError, ValueError):
+        threshold = math.nan
+    if isinstance(value, bool) or not math.isfinite(threshold):
+        raise ValueError(f"disagreement_threshold must be a number, got {value!r}")
+    return threshold
+
+
+def _run_assess(data):
+    """Cross-assess two responses, returning (response body, status); must not touch ``request``
+
+    ``mode`` (default ASSESS_MODE) picks the assessor: ``llm`` has each agent
+    assess the other, ``local`` only scores agreement locally, and ``auto``
+    scores locally and asks the agents only when the disagreement reaches
+    ``disagreement_threshold`` (default ASSESS_DISAGREEMENT_THRESHOLD).
+    """
+    try:
+        stored = get_comparison_store().get(data['comparison_id']) if data.get('comparison_id') else None
+        if 'agent_ids' in data or (stored is not None and 'responses' in stored):
+            return _run_assess_multi(data, stored)
+        deadline = _request_deadline(data)
+        assessment_criteria = data.get('assessment_criteria',[])
+        bypass_cache = bool(data.get('bypass_cache', False))
+        mode = str(data.get('mode') or os.getenv('ASSESS_MODE', 'llm')).lower()
+        if mode not in ASSESS_MODES:
+            return {"error": f"Unknown assessment mode: {mode}"}, 400
         try:
-            assessment_of_agent1 = ai_service.get_completion(
-                agent2_info['provider'],
-                agent2_info['model'],
-                assessment_prompt_template.format(question=question, answer=agent1_response, criteria=criteria_text)
-            )
-        except Exception as e:
-            assessment_of_agent1 = f"Error getting assessment: {str(e)}"
+            threshold = _disagreement_threshold(data)
+        except ValueError as e:
+            return {"error": str(e)}, 400
         
-        # Agent 1 assesses Agent 2's response
-        try:
-            assessment_of_agent2 = ai_service.get_completion(
-                agent1_info['provider'],
-                agent1_info['model'],
-                assessment_prompt_template.format(question=question, answer=agent2_response, criteria=criteria_text)
+        # Validate input (a comparison id, or the full responses from older clients)
+        inputs, error, status = _assessment_inputs(data)
+        if error:
+            return {"error": error}, status
+        agent1_id = inputs['agent1_id']
+        agent2_id = inputs['agent2_id']
+        question = inputs['question']
+        agent1_response = inputs['agent1_response']
+        agent2_response = inputs['agent2_response']
+        
+        ai_service = get_ai_service()
+        if mode == 'local':
+            # No agent is called, so only unknown agents are an error
+            unknown = [agent_id for agent_id in (agent1_id, agent2_id) if ai_service.get_model_info(agent_id) is None]
+            error = f"Agent {unknown[0]} not found" if unknown else None
+        else:
+            error = _validate_agent_pair(ai_service, agent1_id, agent2_id)
+        if error:
+            return {"error": error}, 400
+        
+        # Get agent information
+        agent1_info = ai_service.get_model_info(agent1_id)
+        agent2_info = ai_service.get_model_info(agent2_id)
+        assessor_info = {
+            "agent1_name": agent1_info['name'],
+            "agent2_name": agent2_info['name']
+        }
+        
+        # Agreement is scored locally in milliseconds; the agents are only asked when it is low
+        local = assess_pairs([(agent1_response, agent2_response)])[0] if mode != 'llm' else None
+        escalated = mode == 'llm' or (mode == 'auto' and local['disagreement'] >= threshold)
+        if not escalated:
+            assessment_text = summary_text(local, threshold)
+            usage = _usage_summary({})
+            _record_history(
+                'assessment', comparison_id=data.get('comparison_id'), question=question,
+                agent1_id=agent1_id, agent2_id=agent2_id, criteria=assessment_criteria,
+                agent1_assessment=assessment_text, agent2_assessment=assessment_text, usage=usage
             )
-        except Exception as e:
-            assessment_of_agent2 = f"Error getting assessment: {str(e)}"
+            return {
+                "agent1_assessment_by_agent2": assessment_text,
+                "agent2_assessment_by_agent1": assessment_text,
+                "assessor_info": assessor_info,
+                "mode": mode,
+                "escalated": False,
+                "local": {**local, "threshold": threshold},
+                "usage": usage,
+                "deadline": _deadline_info(deadline, {})
+            }, 200
         
-        return jsonify({
+        # Build assessment criteria text
+        criteria_text = build_criteria_text(assessment_criteria)
+
+        # Run both cross-assessments concurrently; each one fails independently
+        results = ai_service.run_concurrent({
+            # Agent 2 assesses Agent 1's response
+            'agent1_assessment': {
+                'provider': agent2_info['provider'],
+                'model': agent2_info['model'],
+                'prompt': build_assessment_prompt(question, agent1_response, criteria_text),
+                'bypass_cache': bypass_cache
+            },
+            # Agent 1 assesses Agent 2's response
+            'agent2_assessment': {
+                'provider': agent1_info['provider'],
+                'model': agent1_info['model'],
+                'prompt': build_assessment_prompt(question, agent2_response, criteria_text),
+                'bypass_cache': bypass_cache
+            }
+        }, deadline=deadline)
+        assessment_of_agent1 = _assessment_text(results['agent1_assessment'])
+        assessment_of_agent2 = _assessment_text(results['agent2_assessment'])
+        usage = _usage_summary(results)
+        _record_history(
+            'assessment', comparison_id=data.get('comparison_id'), question=question,
+            agent1_id=agent1_id, agent2_id=agent2_id, criteria=assessment_criteria,
+            agent1_assessment=assessment_of_agent1, agent2_assessment=assessment_of_agent2, usage=usage
+        )
+        
+        body = {
             "agent1_assessment_by_agent2": assessment_of_agent1,
             "agent2_assessment_by_agent1": assessment_of_agent2,
+            "assessor_info": assessor_info,
+            "mode": mode,
+            "escalated": True,
+            "usage": usage,
+            "deadline": _deadline_info(deadline, results)
+        }
+        if local is not None:
+            body["local"] = {**local, "threshold": threshold}
+        return body, 200
+        
+    except Exception as e:
+        return {"error": f"Assessment error: {str(e)}"}, 500
+
+
+def _run_assess_multi(data, stored):
+    """Assess the answers of an N-way comparison, returning (response body, status)
+
+    Takes the ``comparison_id`` of an N-way /compare, or ``agent_ids`` with a
+    ``responses`` object keyed by agent id and the ``question``. Who assesses
+    whom follows ``assessment_mode``; ``mode`` works as for two agents, where
+    ``auto`` only has the answers assessed that locally disagree with another.
+    """
+    deadline = _request_deadline(data)
+    if stored is not None:
+        agent_ids, question, responses = stored['agent_ids'], stored['question'], stored['responses']
+    else:
+        agent_ids, question, responses = data.get('agent_ids'), data.get('question'), data.get('responses')
+        error = validate_agent_ids(agent_ids)
+        if error:
+            return {"error": error}, 400
+        if not question or not isinstance(responses, dict) or not all(responses.get(agent_id) for agent_id in agent_ids):
+            return {"error": "Missing required fields: question, and a response for every agent in responses"}, 400
+    assessment_criteria = data.get('assessment_criteria', [])
+    bypass_cache = bool(data.get('bypass_cache', False))
+    assessment_mode = data.get('assessment_mode', 'all_pairs')
+    judge_id = data.get('judge_id')
+    mode = str(data.get('mode') or os.getenv('ASSESS_MODE', 'llm')).lower()
+    if mode not in ASSESS_MODES:
+        return {"error": f"Unknown assessment mode: {mode}"}, 400
+    if assessment_mode not in ASSESSMENT_MODES:
+        return {"error": f"Unknown assessment_mode: {assessment_mode}"}, 400
+    if judge_id is not None and not isinstance(judge_id, str):
+        return {"error": "judge_id must be an agent id"}, 400
+    try:
+        threshold = _disagreement_threshold(data)
+    except ValueError as e:
+        return {"error": str(e)}, 400
+
+    ai_service = get_ai_service()
+    judges = [judge_id] if judge_id and judge_id not in agent_ids else []
+    if mode == 'local':
+        # No agent is called, so only unknown agents are an error
+        unknown = [agent_id for agent_id in agent_ids + judges if ai_service.get_model_info(agent_id) is None]
+        error = f"{unknown[0]}: Agent {unknown[0]} not found" if unknown else None
+    else:
+        # Stored comparisons are checked again: an agent may have been disabled since
+        error = _validate_agents(ai_service, agent_ids + judges)
+    if error:
+        return {"error": error}, 400
+    infos = {agent_id: ai_service.get_model_info(agent_id) for agent_id in agent_ids + judges}
+
+    # Every pair of answers is scored locally in one batch
+    answered = [agent_id for agent_id in agent_ids if responses.get(agent_id)]
+    local_pairs = [(a, b) for index, a in enumerate(answered) for b in answered[index + 1:]]
+    local = None
+    if mode != 'llm':
+        scores = assess_pairs([(responses[a], responses[b]) for a, b in local_pairs])
+        local = [{"agent_ids": [a, b], **score} for (a, b), score in zip(local_pairs, scores)]
+
+    pairs = assessment_pairs(agent_ids, assessment_mode, judge_id)
+    if mode == 'local':
+        pairs = []
+    elif mode == 'auto':
+        disputed = {agent_id for entry in local if entry['disagreement'] >= threshold for agent_id in entry['agent_ids']}
+        pairs = [(assessor, assessed) for assessor, assessed in pairs if assessed in disputed]
+    calls = _assessment_calls(
+        pairs, infos, question, responses, build_criteria_text(assessment_criteria), bypass_cache
+    )
+    results = ai_service.run_concurrent(calls, deadline=deadline, scheduled=True) if calls else {}
+
+    body = {
+        "assessment_mode": assessment_mode,
+        "assessments": _assessment_list(pairs, results),
+        "mode": mode,
+        "escalated": bool(calls),
+        "usage": _usage_summary(results),
+        "deadline": _deadline_info(deadline, results)
+    }
+    if local is not None:
+        body["local"] = {"pairs": local, "threshold": threshold}
+    _record_multi_assessment(data.get('comparison_id'), question, agent_ids + judges, assessment_criteria,
+                             body['assessments'], body['usage'])
+    return body, 200
+
+
+@api_bp.route('/assess', methods=['POST'])
+def assess_responses():
+    """Get cross-assessments for existing responses (job mode as for /compare)"""
+    try:
+        data = _json_body()
+        if data is None:
+            return jsonify(INVALID_BODY), 400
+        if _wants_job(data):
+            return _submit_job('assess', data)
+        body, status = _run_assess(data)
+        return jsonify(body), status
+    except Exception as e:
+        return jsonify({"error": f"Assessment error: {str(e)}"}), 500
+
+
+@api_bp.route('/assess/stream', methods=['POST'])
+def assess_responses_stream():
+    """Stream both cross-assessments token by token as Server-Sent Events"""
+    try:
+        data = _json_body()
+        if data is None:
+            return jsonify(INVALID_BODY), 400
+        deadline = _request_deadline(data)
+        assessment_criteria = data.get('assessment_criteria',[])
+        bypass_cache = bool(data.get('bypass_cache', False))
+        
+        # Validate input (a comparison id, or the full responses from older clients)
+        inputs, error, status = _assessment_inputs(data)
+        if error:
+            return jsonify({"error": error}), status
+        agent1_id = inputs['agent1_id']
+        agent2_id = inputs['agent2_id']
+        question = inputs['question']
+        agent1_response = inputs['agent1_response']
+        agent2_response = inputs['agent2_response']
+        
+        ai_service = get_ai_service()
+        error = _validate_agent_pair(ai_service, agent1_id, agent2_id)
+        if error:
+            return jsonify({"error": error}), 400
+        agent1_info = ai_service.get_model_info(agent1_id)
+        agent2_info = ai_service.get_model_info(agent2_id)
+        criteria_text = build_criteria_text(assessment_criteria)
+        
+        calls = {
+            'agent1_assessment': {
+                'provider': agent2_info['provider'],
+                'model': agent2_info['model'],
+                'prompt': build_assessment_prompt(question, agent1_response, criteria_text),
+                'bypass_cache': bypass_cache
+            },
+            'agent2_assessment': {
+                'provider': agent1_info['provider'],
+                'model': agent1_info['model'],
+                'prompt': build_assessment_prompt(question, agent2_response, criteria_text),
+                'bypass_cache': bypass_cache
+            }
+        }
+        start_payload = {
             "assessor_info": {
                 "agent1_name": agent1_info['name'],
                 "agent2_name": agent2_info['name']
             }
-        })
+        }
+        error_prefixes = {
+            'agent1_assessment': "Error getting assessment",
+            'agent2_assessment': "Error getting assessment"
+        }
+        
+        def record_results(assessments):
+            _record_history(
+                'assessment', comparison_id=data.get('comparison_id'), question=question,
+                agent1_id=agent1_id, agent2_id=agent2_id, criteria=assessment_criteria,
+                agent1_assessment=assessments['agent1_assessment'], agent2_assessment=assessments['agent2_assessment']
+            )
+        
+        return _sse_response(ai_service, calls, start_payload, error_prefixes, deadline, record_results)
         
     except Exception as e:
         return jsonify({"error": f"Assessment error: {str(e)}"}), 500
 
 
+@api_bp.route('/batch', methods=['POST'])
+def run_batch():
+    """Run every question against every agent, streaming results as NDJSON
+
+    Send ``questions`` and ``agent_ids`` to start a batch, or the ``batch_id``
+    of an earlier batch to resume it: cells that already succeeded are
+    replayed from the store and only missing or failed cells are run. The
+    stream ends at the request deadline (BATCH_DEADLINE unless the request
+    sets one), reporting the cells still running as ``timed_out``.
+    """
+    try:
+        data = _json_body()
+        if data is None:
+            return jsonify(INVALID_BODY), 400
+        deadline = _request_deadline(
+            data, float(os.getenv('BATCH_DEADLINE', '1800')), float(os.getenv('BATCH_DEADLINE_MAX', '3600'))
+        )
+        batch_id = data.get('batch_id')
+        bypass_cache = bool(data.get('bypass_cache', False))
+        store = get_batch_store()
+        
+        batch = None
+        if batch_id:
+            batch = store.get_batch(batch_id)
+            if batch is None:
+                return jsonify({"error": f"Batch {batch_id} not found"}), 404
+            agent_ids = batch['agent_ids']
+        else:
+            questions = data.get('questions')
+            agent_ids = data.get('agent_ids')
+            best_practices = data.get('best_practices', [])
+            if not isinstance(questions, list) or not isinstance(agent_ids, list) or not questions or not agent_ids:
+                return jsonify({"error": "Missing required fields: questions, agent_ids"}), 400
+            if not all(isinstance(q, str) and q.strip() for q in questions):
+                return jsonify({"error": "Every question must be a non-empty string"}), 400
+            if len(set(agent_ids)) != len(agent_ids):
+                return jsonify({"error": "Duplicate agent ids"}), 400
+            max_cells = int(os.getenv('BATCH_MAX_CELLS', '5000'))
+            if len(questions) * len(agent_ids) > max_cells:
+                return jsonify({"error": f"Batch too large: at most {max_cells} question/agent pairs"}), 400
+        
+        # Every agent is checked before a new batch is stored, so a rejected one leaves nothing behind
+        ai_service = get_ai_service()
+        agent_infos = {}
+        for agent_id in agent_ids:
+            valid, msg = ai_service.validate_model_availability(agent_id)
+            if not valid:
+                return jsonify({"error": f"Agent {agent_id}: {msg}"}), 400
+            agent_infos[agent_id] = ai_service.get_model_info(agent_id)
+        
+        if batch is None:
+            batch_id = uuid.uuid4().hex
+            store.create_batch(batch_id, questions, agent_ids, best_practices)
+            batch = store.get_batch(batch_id)
+        
+        questions = batch['questions']
+        finished = store.results(batch_id, successful_only=True)
+        finished_cells = {(r['question_index'], r['agent_id']) for r in finished}
+        pending = [
+            (question_index, agent_id)
+            for question_index in range(len(questions))
+            for agent_id in batch['agent_ids']
+            if (question_index, agent_id) not in finished_cells
+        ]
+        
+        def generate():
+            started = time.monotonic()
+            yield _ndjson({
+                "type": "batch",
+                "batch_id": batch_id,
+                "total": len(questions) * len(batch['agent_ids']),
+                "resumed": len(finished),
+                "pending": len(pending)
+            })
+            for result in finished:
+                yield _ndjson({"type": "result", "batch_id": batch_id, "resumed": True, **result})
+            
+            # Results are persisted by the worker as each cell finishes, so a
+            # client disconnect loses nothing that already completed
+            completed = queue.Queue()
+            
+            def on_done(future, question_index, agent_id):
+                if future.cancelled():
+                    return
+                # Always report the cell, or the stream would wait for it until the deadline
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = {'response': None, 'error': str(e), 'elapsed': 0.0}
+                try:
+                    store.save_result(batch_id, question_index, agent_id,
+                                      result['response'], result['error'], result['elapsed'])
+                except Exception as e:
+                    logger.exception("Batch result not saved", extra=log_fields(
+                        batch_id=batch_id, question_index=question_index, agent_id=agent_id
+                    ))
+                    result = {**result, 'error': result['error'] or f"Result not saved: {str(e)}"}
+                completed.put((question_index, agent_id, result))
+            
+            for question_index, agent_id in pending:
+                info = agent_infos[agent_id]
+                prompt = build_compare_prompt(questions[question_index], batch['best_practices'])
+                future = ai_service.schedule_completion(
+                    info['provider'], info['model'], prompt, bypass_cache=bypass_cache, group=batch_id
+                )
+                future.add_done_callback(
+                    lambda f, question_index=question_index, agent_id=agent_id: on_done(f, question_index, agent_id)
+                )
+            
+            unfinished = set(pending)
+            try:
+                while unfinished:
+                    try:
+                        question_index, agent_id, result = completed.get(timeout=deadline.remaining())
+                    except queue.Empty:
+                        break
+                    unfinished.discard((question_index, agent_id))
+                    yield _ndjson({
+                        "type": "result",
+                        "batch_id": batch_id,
+                        "question_index": question_index,
+                        "agent_id": agent_id,
+                        "response": result['response'],
+                        "error": result['error'],
+                        "elapsed": result['elapsed'],
+                        "resumed": False
+                    })
+            finally:
+                # Client went away or out of time: drop queued cells, let running ones finish and persist
+                ai_service.scheduler.cancel_group(batch_id)
+            
+            for question_index, agent_id in pending:
+                if (question_index, agent_id) in unfinished:
+                    yield _ndjson({
+                        "type": "result",
+                        "batch_id": batch_id,
+                        "question_index": question_index,
+                        "agent_id": agent_id,
+                        "response": None,
+                        "error": "Batch deadline exceeded; resume the batch to run this cell",
+                        "elapsed": None,
+                        "resumed": False,
+                        "timed_out": True
+                    })
+            
+            yield _ndjson({
+                "type": "summary",
+                "batch_id": batch_id,
+                **store.progress(batch_id),
+                "elapsed": round(time.monotonic() - started, 3),
+                "deadline": {**deadline.summary(), "incomplete": len(unfinished)}
+            })
+        
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+        
+    except Exception as e:
+        return jsonify({"error": f"Batch error: {str(e)}"}), 500
+
+
+@api_bp.route('/batch/<batch_id>', methods=['GET'])
+def get_batch(batch_id):
+    """Get the definition, progress and stored results of a batch"""
+    try:
+        store = get_batch_store()
+        batch = store.get_batch(batch_id)
+        if batch is None:
+            return jsonify({"error": f"Batch {batch_id} not found"}), 404
+        return jsonify({
+            **batch,
+            "total": len(batch['questions']) * len(batch['agent_ids']),
+            **store.progress(batch_id),
+            "results": store.results(batch_id)
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@api_bp.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Get a job's status, and its result once finished"""
+    try:
+        job = get_job_manager().get(job_id)
+        if job is None:
+            return jsonify({"error": f"Job {job_id} not found or expired"}), 404
+        response = jsonify(_job_info(job))
+        if job['status'] not in FINISHED:
+            response.headers['Retry-After'] = '1'
+        return response
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@api_bp.route('/jobs/<job_id>/events', methods=['GET'])
+def get_job_events(job_id):
+    """Follow a job as Server-Sent Events
+
+    Emits a ``status`` event on every state change and, once the job has
+    finished, a ``result`` event with the job and its result; comment lines
+    keep idle connections open meanwhile.
+    """
+    manager = get_job_manager()
+    if manager.get(job_id) is None:
+        return jsonify({"error": f"Job {job_id} not found or expired"}), 404
+
+    def generate():
+        status = None
+        while True:
+            job = manager.wait(job_id, status, timeout=15)
+            if job is None:
+                yield _sse('error', {"job_id": job_id, "error": "Job expired"})
+                return
+            if job['status'] == status:
+                yield ": keep-alive\n\n"
+                continue
+            status = job['status']
+            yield _sse('status', _job_info(job, include_result=False))
+            if status in FINISHED:
+                yield _sse('result', _job_info(job))
+                return
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+@api_bp.route('/sessions/<session_id>', methods=['GET'])
+def get_session(session_id):
+    """Get the kept (possibly compacted) history of a conversation session"""
+    try:
+        session = get_session_store().get(session_id)
+        if session is None:
+            return jsonify({"error": f"Session {session_id} not found or expired"}), 404
+        return jsonify(session.to_dict())
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@api_bp.route('/sessions/<session_id>', methods=['DELETE'])
+def delete_session(session_id):
+    """End a conversation session and drop its history"""
+    try:
+        get_session_store().delete(session_id)
+        return jsonify({"deleted": session_id})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
 @api_bp.route('/agent/<agent_id>', methods=['GET'])
 def get_agent_details(agent_id):
     """Get detailed information about a specific agent"""
     try:
-        ai_service = AIService()
+        ai_service = get_ai_service()
         agent_info = ai_service.get_model_info(agent_id)
         
         if not agent_info:
             return jsonify({"error": f"Agent {agent_id} not found"}), 404
         
-        # Check availability
+        # Check availability (fails fast while the provider's circuit is open)
         available, message = ai_service.validate_model_availability(agent_id)
+        breaker = ai_service.breakers.get(agent_info['provider'])
         
         return jsonify({
             "agent": agent_info,
             "available": available,
-            "status_message": message
+            "status_message": message,
+            "circuit": breaker.snapshot() if breaker is not None else None,
+            "last_probe": ai_service.prober.result(agent_info['provider'])
         })
         
     except Exception as e:
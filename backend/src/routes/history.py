@@ -0,0 +1,133 @@
+import base64
+import json
+from flask import Blueprint, current_app, jsonify, request
+from sqlalchemy import Text, cast, or_, tuple_
+from src.models.history import Assessment, Comparison, question_hash
+from src.models.user import db
+
+history_bp = Blueprint('history', __name__)
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def _encode_cursor(row):
+    return base64.urlsafe_b64encode(f'{row.created_at!r}:{row.id}'.encode()).decode().rstrip('=')
+
+
+def _decode_cursor(cursor):
+    padded = cursor + '=' * (-len(cursor) % 4)
+    created_at, row_id = base64.urlsafe_b64decode(padded.encode()).decode().split(':')
+    return float(created_at), int(row_id)
+
+
+def _like_escape(text):
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def _history_query(model):
+    """Filtered, newest-first query for ``model`` from the request's query string
+
+    Filters: ``agent_id`` (either side, or any agent of an N-way run),
+    ``question`` or ``question_hash``, ``since``/``until`` (epoch seconds).
+    Pages are keyset-based: ``cursor`` is the ``next_cursor`` of the previous
+    page, so deep pages cost the same as the first one.
+    """
+    args = request.args
+    query = model.query
+    if args.get('agent_id'):
+        agent_id = args['agent_id']
+        # N-way agent lists are JSON arrays, so a quoted id only matches a whole id
+        listed = f'%{_like_escape(json.dumps(agent_id))}%'
+        query = query.filter(or_(model.agent1_id == agent_id, model.agent2_id == agent_id,
+                                 cast(model.agent_ids, Text).like(listed, escape='\\')))
+    if args.get('question'):
+        query = query.filter(model.question_hash == question_hash(args['question']))
+    elif args.get('question_hash'):
+        query = query.filter(model.question_hash == args['question_hash'])
+    if args.get('since'):
+        query = query.filter(model.created_at >= float(args['since']))
+    if args.get('until'):
+        query = query.filter(model.created_at < float(args['until']))
+    if args.get('cursor'):
+        query = query.filter(tuple_(model.created_at, model.id) < _decode_cursor(args['cursor']))
+    return query.order_by(model.created_at.desc(), model.id.desc())
+
+
+def _page(query):
+    """One page of results with the cursor of the next page (None on the last page)"""
+    limit = min(max(request.args.get('limit', DEFAULT_PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+    full = request.args.get('full', 'false').lower() == 'true'
+    rows = query.limit(limit + 1).all()
+    next_cursor = _encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return jsonify({
+        "items": [row.to_dict(full=full) for row in rows[:limit]],
+        "next_cursor": next_cursor
+    })
+
+
+def _history_enabled():
+    return current_app.extensions.get('history_writer') is not None
+
+
+@history_bp.route('/history/comparisons', methods=['GET'])
+def list_comparisons():
+    """Stored comparisons, newest first; also filterable by ``session_id``"""
+    if not _history_enabled():
+        return jsonify({"error": "History is disabled"}), 503
+    try:
+        query = _history_query(Comparison)
+        if request.args.get('session_id'):
+            query = query.filter(Comparison.session_id == request.args['session_id'])
+        return _page(query)
+    except ValueError:
+        return jsonify({"error": "Invalid filter or cursor"}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@history_bp.route('/history/comparisons/<comparison_id>', methods=['GET'])
+def get_comparison(comparison_id):
+    """One stored comparison with its responses and every assessment of it"""
+    if not _history_enabled():
+        return jsonify({"error": "History is disabled"}), 503
+    try:
+        comparison = Comparison.query.filter_by(comparison_id=comparison_id).first()
+        if comparison is None:
+            return jsonify({"error": f"Comparison {comparison_id} not found"}), 404
+        assessments = Assessment.query.filter_by(comparison_id=comparison_id).order_by(Assessment.created_at).all()
+        return jsonify({
+            **comparison.to_dict(),
+            "assessments": [assessment.to_dict() for assessment in assessments]
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@history_bp.route('/history/assessments', methods=['GET'])
+def list_assessments():
+    """Stored assessments, newest first; also filterable by ``comparison_id``"""
+    if not _history_enabled():
+        return jsonify({"error": "History is disabled"}), 503
+    try:
+        query = _history_query(Assessment)
+        if request.args.get('comparison_id'):
+            query = query.filter(Assessment.comparison_id == request.args['comparison_id'])
+        return _page(query)
+    except ValueError:
+        return jsonify({"error": "Invalid filter or cursor"}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@history_bp.route('/history/status', methods=['GET'])
+def get_history_status():
+    """Write-behind queue counters: rows pending, written, dropped and failed"""
+    writer = current_app.extensions.get('history_writer')
+    if writer is None:
+        return jsonify({"enabled": False})
+    return jsonify({
+        "enabled": True,
+        "database": db.engine.url.render_as_string(hide_password=True),
+        **writer.stats()
+    })
@@ -0,0 +1,160 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from src.services.structured_logging import log_fields
+
+try:
+    import yaml
+except ImportError:  # YAML configs are optional
+    yaml = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_AGENTS_CONFIG = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'config', 'agents.json')
+
+REQUIRED_FIELDS = ('id', 'name', 'provider', 'model', 'domains', 'tags', 'tier', 'enabled')
+
+
+class AgentIndex:
+    """Immutable snapshot of the agent list with precomputed lookups
+
+    Built once per config load and swapped atomically, so readers never need
+    a lock. Also holds the pre-serialized ``/agents`` payload and its ETag.
+    """
+
+    def __init__(self, agents: List[Dict[str, Any]]):
+        self.agents = agents
+        self.by_id = {}
+        self.by_provider = {}
+        self.by_domain = {}
+        self.by_tag = {}
+        self.by_tier = {}
+        for agent in agents:
+            if agent['id'] in self.by_id:
+                raise ValueError(f"Duplicate agent id: {agent['id']}")
+            self.by_id[agent['id']] = agent
+            self.by_provider.setdefault(agent['provider'], []).append(agent)
+            self.by_tier.setdefault(agent['tier'], []).append(agent)
+            for domain in agent['domains']:
+                self.by_domain.setdefault(domain, []).append(agent)
+            for tag in agent['tags']:
+                self.by_tag.setdefault(tag, []).append(agent)
+        self.enabled = [agent for agent in agents if agent['enabled']]
+
+        payload = {
+            "agents": agents,
+            "total": len(agents),
+            "enabled": len(self.enabled),
+            "free_tier": len([a for a in self.enabled if a['tier'] == 'free']),
+            "premium_tier": len(self.by_tier.get('premium', []))
+        }
+        self.payload = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        self.etag = hashlib.sha1(self.payload).hexdigest()
+
+
+class AgentRegistry:
+    """Agent configuration loaded from a JSON or YAML file
+
+    The file is re-checked at most every ``reload_interval`` seconds and
+    reloaded in place when its modification time changes, so enabling or
+    adding a model needs no redeploy or worker restart. A file that fails to
+    load leaves the previous configuration in service.
+    """
+
+    def __init__(self, path: Optional[str] = None, reload_interval: Optional[float] = None):
+        self.path = path or os.getenv('AGENTS_CONFIG') or DEFAULT_AGENTS_CONFIG
+        if reload_interval is None:
+            reload_interval = float(os.getenv('AGENTS_RELOAD_INTERVAL', '2'))
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._checked_at = 0.0
+        self._index = None
+        self.version = 0
+        self.reload()
+
+    def reload(self) -> bool:
+        """Load the config file, returning True when the agent set was replaced"""
+        with self._lock:
+            try:
+                mtime = os.stat(self.path).st_mtime
+                index = AgentIndex(self._read_agents())
+            except Exception as e:
+                if self._index is None:
+                    raise
+                logger.warning("Keeping previous agent config", extra=log_fields(path=self.path, error=str(e)))
+                # Don't retry the same broken file until it changes again
+                self._mtime = os.stat(self.path).st_mtime if os.path.exists(self.path) else self._mtime
+                return False
+            self._index = index
+            self._mtime = mtime
+            self._checked_at = time.monotonic()
+            self.version += 1
+            return True
+
+    def _read_agents(self) -> List[Dict[str, Any]]:
+        """Parse and validate the agent list from the config file"""
+        with open(self.path, 'r', encoding='utf-8') as f:
+            if self.path.endswith(('.yaml', '.yml')):
+                if yaml is None:
+                    raise RuntimeError("PyYAML is required to load YAML agent configs")
+                config = yaml.safe_load(f)
+            else:
+                config = json.load(f)
+
+        agents = config['agents'] if isinstance(config, dict) else config
+        for agent in agents:
+            missing = [field for field in REQUIRED_FIELDS if field not in agent]
+            if missing:
+                raise ValueError(f"Agent {agent.get('id', '?')} is missing fields: {', '.join(missing)}")
+        return agents
+
+    def _current(self) -> AgentIndex:
+        """Return the live snapshot, reloading first if the file has changed"""
+        now = time.monotonic()
+        if now - self._checked_at >= self.reload_interval:
+            self._checked_at = now
+            try:
+                changed = os.stat(self.path).st_mtime != self._mtime
+            except OSError:
+                changed = False
+            if changed:
+                self.reload()
+        return self._index
+
+    def get(self, agent_id: str) -> Optional[Dict[str, Any]]:
+        """Look an agent up by id"""
+        return self._current().by_id.get(agent_id)
+
+    def all(self) -> List[Dict[str, Any]]:
+        """Every configured agent, in config order"""
+        return self._current().agents
+
+    def enabled(self) -> List[Dict[str, Any]]:
+        """Agents that are enabled"""
+        return self._current().enabled
+
+    def by_provider(self, provider: str) -> List[Dict[str, Any]]:
+        """Agents served by one provider"""
+        return self._current().by_provider.get(provider, [])
+
+    def by_domain(self, domain: str) -> List[Dict[str, Any]]:
+        """Agents listed under one domain"""
+        return self._current().by_domain.get(domain, [])
+
+    def by_tag(self, tag: str) -> List[Dict[str, Any]]:
+        """Agents carrying one tag"""
+        return self._current().by_tag.get(tag, [])
+
+    def by_tier(self, tier: str) -> List[Dict[str, Any]]:
+        """Agents in one tier"""
+        return self._current().by_tier.get(tier, [])
+
+    def agents_payload(self) -> Tuple[bytes, str]:
+        """Pre-serialized ``/agents`` response body and its ETag"""
+        index = self._current()
+        return index.payload, index.etag
@@ -1,24 +1,165 @@
 import os
 import asyncio
+import logging
 import time
+import contextlib
 import requests
+import httpx
 import json
-from typing import Dict, Any, Tuple
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from http.cookiejar import DefaultCookiePolicy
+from typing import Dict, Any, Iterator, Optional, Tuple
+from src.services.agent_registry import AgentRegistry
+from src.services.async_ai_service import AsyncAIService
+from src.services.circuit_breaker import ProviderCircuitBreakers
+from src.services.completion_cache import CompletionCache
+from src.services.deadline import Deadline
+from src.services.endpoints import GENERATION_PARAMS, provider_endpoints
+from src.services.errors import CallTimeout, CircuitOpenError, ProviderError, RateLimitExceeded
+from src.services.health_prober import HealthProber
+from src.services.http_timing import TimedHTTPAdapter, connect_timer
+from src.services.metrics import AIMetrics
+from src.services.pricing import build_usage, cached_usage, reported_tokens
+from src.services.prompts import anthropic_content
+from src.services.rate_limit import ProviderRateLimiter, RetryBudget, RetryPolicy, parse_retry_after
+from src.services.scheduler import ProviderScheduler
+from src.services.singleflight import SingleFlight
+from src.services.structured_logging import log_fields
+from src.services.tokens import estimate_tokens
+
+logger = logging.getLogger(__name__)
 
 class AIService:
-    """Service for interacting with multiple AI providers"""
+    """Service for interacting with multiple AI providers
+
+    One instance is meant to live for the whole process (see ``init_app``) and
+    be shared by all worker threads: it owns a keep-alive connection pool per
+    provider and the bounded executor used to fan calls out concurrently.
+    """
     
-    def __init__(self):
+    def __init__(self, registry: Optional[AgentRegistry] = None,
+                 max_workers: Optional[int] = None,
+                 pool_connections: Optional[int] = None,
+                 pool_maxsize: Optional[int] = None,
+                 async_backend: Optional[bool] = None):
         self.openai_api_key = os.getenv('OPENAI_API_KEY')
         self.anthropic_api_key = os.getenv('ANTHROPIC_API_KEY')
         self.together_api_key = os.getenv('TOGETHER_API_KEY')
-        print("✅ OPENAI_API_KEY present?", bool(self.openai_api_key))
-        print("✅ ANTHROPIC_API_KEY present?", bool(self.anthropic_api_key))
-        print("✅ TOGETHER_API_KEY present?", bool(self.together_api_key))
+        logger.info("AI provider keys loaded", extra=log_fields(
+            openai=bool(self.openai_api_key),
+            anthropic=bool(self.anthropic_api_key),
+            together=bool(self.together_api_key)
+        ))
+        
+        # Completion endpoint per provider (overridable with <PROVIDER>_BASE_URL)
+        self.urls = provider_endpoints()
+        
+        # Indexed, hot-reloading agent configuration
+        self.registry = registry or AgentRegistry()
+        
+        # Bounded pool used to fan provider calls out concurrently
+        max_workers = max_workers or int(os.getenv('AI_MAX_WORKERS', '16'))
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ai-call')
+        
+        # Per-provider concurrency caps for large fan-outs such as batches
+        self.scheduler = ProviderScheduler(self.executor)
+        
+        # One keep-alive connection pool per provider. pool_maxsize caps the
+        # connections kept (and, with blocking pools, opened) per host.
+        pool_connections = pool_connections or int(os.getenv('AI_POOL_CONNECTIONS', '4'))
+        pool_maxsize = pool_maxsize or int(os.getenv('AI_POOL_MAXSIZE', str(max_workers)))
+        self.sessions = {
+            'openai': self._build_session(pool_connections, pool_maxsize, {
+                'Authorization': f'Bearer {self.openai_api_key}'
+            }),
+            'anthropic': self._build_session(pool_connections, pool_maxsize, {
+                'x-api-key': self.anthropic_api_key or '',
+                'anthropic-version': '2023-06-01'
+            }),
+            'together': self._build_session(pool_connections, pool_maxsize, {
+                'Authorization': f'Bearer {self.together_api_key}'
+            })
+        }
         
-        # Import AGENTS from api routes
-        from src.routes.api import AGENTS
-        self.agents = AGENTS
+        # Native async provider layer. With the async backend on, run_concurrent
+        # drives provider calls as coroutines on one background event loop
+        # instead of holding a worker thread per call.
+        self.async_service = AsyncAIService(
+            self.openai_api_key,
+            self.anthropic_api_key,
+            self.together_api_key,
+            max_connections=int(os.getenv('AI_ASYNC_MAX_CONNECTIONS', '200')),
+            max_keepalive_connections=pool_maxsize,
+            urls=self.urls
+        )
+        if async_backend is None:
+            async_backend = os.getenv('AI_ASYNC_BACKEND', 'false').lower() == 'true'
+        self.async_backend = async_backend
+        
+        # Cache of successful completions (memory LRU+TTL, optional SQLite tier)
+        self.cache = None
+        if os.getenv('AI_CACHE_ENABLED', 'true').lower() == 'true':
+            self.cache = CompletionCache(
+                maxsize=int(os.getenv('AI_CACHE_MAX_ENTRIES', '1024')),
+                ttl=float(os.getenv('AI_CACHE_TTL', '3600')),
+                db_path=os.getenv('AI_CACHE_DB') or None
+            )
+        
+        # Per provider/model latency, token, error and cost metrics
+        self.metrics = AIMetrics()
+        
+        # Identical completions already in flight share one upstream call
+        self.singleflight = SingleFlight(self.metrics)
+        
+        # Per-provider RPM/TPM limits, and retries that cannot turn into a storm
+        self.rate_limiter = ProviderRateLimiter()
+        self.retry_policy = RetryPolicy()
+        self.retry_budget = RetryBudget()
+        
+        # Fail fast on providers that keep failing; a background prober
+        # (started by init_app) re-checks them with probe_provider
+        self.breakers = ProviderCircuitBreakers()
+        self.circuit_min_timeout = float(os.getenv('CIRCUIT_MIN_TIMEOUT', '5'))
+        self.prober = HealthProber(
+            self.probe_provider,
+            self._record_outcome,
+            lambda: [provider for provider, key in self._api_keys().items() if key and self._probe_model(provider)]
+        )
+    
+    @staticmethod
+    def _build_session(pool_connections: int, pool_maxsize: int, headers: Dict[str, str]) -> requests.Session:
+        """Create a pooled keep-alive session that is safe to share across threads"""
+        session = requests.Session()
+        adapter = TimedHTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=os.getenv('AI_POOL_BLOCK', 'true').lower() == 'true',
+            max_retries=0
+        )
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers.update({'Content-Type': 'application/json', **headers})
+        # Never store cookies: the session is shared mutable state across threads
+        session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        return session
+    
+    def init_app(self, app):
+        """Register this service as the process-wide instance for a Flask app"""
+        app.extensions['ai_service'] = self
+        self.prober.start()
+        return self
+    
+    def close(self):
+        """Release pooled connections and worker threads"""
+        self.prober.stop()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        for session in self.sessions.values():
+            session.close()
+        self.async_service.close()
+        if self.cache is not None:
+            self.cache.close()
     
     def validate_model_availability(self, agent_id: str) -> Tuple[bool, str]:
         """Check if a model is available and properly configured"""
@@ -39,179 +180,787 @@ class AIService:
         elif provider == 'together' and not self.together_api_key:
             return False, f"Together.ai API key not configured for {agent['name']}"
         
+        # Fail fast while the provider's circuit is open
+        breaker = self.breakers.get(provider)
+        if breaker is not None and breaker.is_open():
+            return False, f"{agent['name']} is temporarily unavailable: {provider} is failing (retry in {breaker.retry_after():.0f} seconds)"
+        
         return True, "Model available"
     
     def get_model_info(self, agent_id: str) -> Dict[str, Any]:
         """Get model information for a specific agent"""
-        for agent in self.agents:
-            if agent['id'] == agent_id:
-                return agent
-        return None
+        return self.registry.get(agent_id)
     
-    def get_completion(self, provider: str, model: str, prompt: str, timeout: int = 20) -> str:
-        """Get completion from specified AI provider"""
+    def get_completion(self, provider: str, model: str, prompt: str, timeout: int = 20,
+                       bypass_cache: bool = False) -> str:
+        """Get completion from specified AI provider
+
+        Successful completions are cached by provider, model, final prompt and
+        generation parameters. ``bypass_cache`` skips the lookup and refreshes
+        the cached entry with the new completion. Concurrent misses for the
+        same key are coalesced into a single upstream call.
+        """
+        return self.get_completion_with_usage(provider, model, prompt, timeout, bypass_cache)[0]
+    
+    def get_completion_with_usage(self, provider: str, model: str, prompt: str, timeout: float = 20,
+                                  bypass_cache: bool = False) -> Tuple[str, Dict[str, Any]]:
+        """get_completion that also returns the call's token usage and estimated cost"""
+        cache_key = self._cache_key(provider, model, prompt)
+        cached = self._cache_lookup(cache_key, bypass_cache)
+        if cached is not None:
+            self.metrics.record_cache_hit(provider, model)
+            return cached, cached_usage()
         
-        try:
-            if provider == 'openai':
-                return self._get_openai_completion(model, prompt, timeout)
-            elif provider == 'anthropic':
-                return self._get_anthropic_completion(model, prompt, timeout)
-            elif provider == 'together':
-                return self._get_together_completion(model, prompt, timeout)
-            else:
-                raise ValueError(f"Unsupported provider: {provider}")
-                
-        except requests.exceptions.Timeout:
-            raise Exception(f"Request timed out after {timeout} seconds")
-        except requests.exceptions.RequestException as e:
-            raise Exception(f"Network error: {str(e)}")
-        except Exception as e:
-            raise Exception(f"API error: {str(e)}")
+        def fetch(remaining):
+            response, usage = self._fetch_completion(provider, model, prompt, remaining)
+            if self.cache is not None:
+                self.cache.set(cache_key, response)
+            return response, usage
+        
+        return self.singleflight.do(cache_key, fetch, timeout)
+    
+    def _cache_key(self, provider: str, model: str, prompt: str) -> str:
+        """Cache key for a completion request"""
+        return CompletionCache.make_key(provider, model, prompt, GENERATION_PARAMS.get(provider, {}))
+    
+    def _cache_lookup(self, cache_key: str, bypass_cache: bool) -> Optional[str]:
+        """Return a cached completion unless caching is off or bypassed"""
+        if self.cache is None or bypass_cache:
+            return None
+        return self.cache.get(cache_key)
+    
+    def _fetch_completion(self, provider: str, model: str, prompt: str, timeout: int) -> Tuple[str, Dict[str, Any]]:
+        """Call the provider API for a completion, retrying rate limits and transient failures
+
+        Each attempt first waits for the provider's local rate limit. Retryable
+        failures (429, 5xx, dropped connections) are retried with jittered
+        backoff that honors Retry-After, while the retry budget and the call's
+        own timeout allow it.
+        """
+        deadline = time.monotonic() + timeout
+        self.retry_budget.record_request()
+        attempt = 0
+        while True:
+            try:
+                self._check_circuit(provider)
+                time.sleep(self._rate_limit_wait(provider, prompt, deadline))
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise requests.exceptions.Timeout()
+                started = time.monotonic()
+                connect_timer.reset()
+                try:
+                    response, usage = self._call_provider(provider, model, prompt, remaining)
+                except Exception as e:
+                    self._record_outcome(provider, e, remaining)
+                    self.metrics.record_call(provider, model, time.monotonic() - started,
+                                             connect_timer.seconds, connect_timer.connections, error=e)
+                    raise
+                self._record_outcome(provider)
+                self.metrics.record_call(provider, model, time.monotonic() - started,
+                                         connect_timer.seconds, connect_timer.connections, usage)
+                return response, usage
+            except (CircuitOpenError, RateLimitExceeded) as e:
+                self.metrics.record_refused(provider, model, e)
+                raise self._wrap_error(e, timeout) from e
+            except Exception as e:
+                attempt += 1
+                delay = self._retry_delay(provider, e, attempt, deadline)
+                if delay is None:
+                    raise self._wrap_error(e, timeout) from e
+            time.sleep(delay)
+    
+    async def _fetch_completion_async(self, provider: str, model: str, prompt: str, timeout: float) -> Tuple[str, Dict[str, Any]]:
+        """Async version of _fetch_completion on the native async provider layer"""
+        deadline = time.monotonic() + timeout
+        self.retry_budget.record_request()
+        attempt = 0
+        while True:
+            try:
+                self._check_circuit(provider)
+                await asyncio.sleep(self._rate_limit_wait(provider, prompt, deadline))
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError()
+                started = time.monotonic()
+                timing = {}
+                try:
+                    response, usage = await self.async_service.call(provider, model, prompt, remaining, timing)
+                except Exception as e:
+                    self._record_outcome(provider, e, remaining)
+                    self.metrics.record_call(provider, model, time.monotonic() - started,
+                                             timing.get('connect', 0.0), timing.get('connections', 0), error=e)
+                    raise
+                self._record_outcome(provider)
+                self.metrics.record_call(provider, model, time.monotonic() - started,
+                                         timing.get('connect', 0.0), timing.get('connections', 0), usage)
+                return response, usage
+            except (CircuitOpenError, RateLimitExceeded) as e:
+                self.metrics.record_refused(provider, model, e)
+                raise self._wrap_error(e, timeout) from e
+            except Exception as e:
+                attempt += 1
+                delay = self._retry_delay(provider, e, attempt, deadline)
+                if delay is None:
+                    raise self._wrap_error(e, timeout) from e
+            await asyncio.sleep(delay)
+    
+    def _call_provider(self, provider: str, model: str, prompt: str, timeout: float) -> Tuple[str, Dict[str, Any]]:
+        """Make a single provider API call, returning the completion text and its usage"""
+        if provider == 'openai':
+            return self._get_openai_completion(model, prompt, timeout)
+        elif provider == 'anthropic':
+            return self._get_anthropic_completion(model, prompt, timeout)
+        elif provider == 'together':
+            return self._get_together_completion(model, prompt, timeout)
+        else:
+            raise ValueError(f"Unsupported provider: {provider}")
+    
+    def _check_circuit(self, provider: str):
+        """Refuse the call without touching the network while the provider's circuit is open"""
+        breaker = self.breakers.get(provider)
+        if breaker is not None and not breaker.allow():
+            raise CircuitOpenError(
+                f"{provider} is temporarily unavailable after repeated failures", breaker.retry_after()
+            )
+    
+    def _record_outcome(self, provider: str, error: Optional[Exception] = None, timeout: float = 0):
+        """Feed a call outcome to the provider's circuit breaker
+
+        Only failures that say something about the provider's health count:
+        network errors, retryable statuses (429, 5xx) and timeouts of calls
+        that had at least CIRCUIT_MIN_TIMEOUT seconds (so clients sending tight
+        deadlines cannot open the circuit). Any other error still proves the
+        provider is reachable.
+        """
+        breaker = self.breakers.get(provider)
+        if breaker is None or isinstance(error, (CircuitOpenError, RateLimitExceeded)):
+            # Refused locally, so the call says nothing about the provider
+            return
+        if error is None:
+            breaker.record_success()
+        elif isinstance(error, (requests.exceptions.Timeout, httpx.TimeoutException, asyncio.TimeoutError)):
+            if timeout >= self.circuit_min_timeout:
+                breaker.record_failure(f"Request timed out after {round(timeout, 3)} seconds")
+        elif isinstance(error, ProviderError) and not error.retryable:
+            breaker.record_success()
+        elif isinstance(error, (ProviderError, requests.exceptions.RequestException, httpx.HTTPError)):
+            breaker.record_failure(str(error))
+        else:
+            breaker.record_success()
+    
+    def _rate_limit_wait(self, provider: str, prompt: str, deadline: float) -> float:
+        """Reserve rate-limit capacity for one call, returning how long to wait for it"""
+        tokens = estimate_tokens(prompt) + GENERATION_PARAMS.get(provider, {}).get('max_tokens', 0)
+        wait = self.rate_limiter.reserve(provider, tokens)
+        if wait > 0 and time.monotonic() + wait >= deadline:
+            self.rate_limiter.release(provider, tokens)
+            raise RateLimitExceeded(f"{provider} rate limit reached; retry in {wait:.1f} seconds", wait)
+        return wait
     
-    def _get_openai_completion(self, model: str, prompt: str, timeout: int) -> str:
+    def _retry_delay(self, provider: str, error: Exception, attempt: int, deadline: float) -> Optional[float]:
+        """Seconds to wait before retrying a failed call, or None to give up"""
+        if isinstance(error, ProviderError):
+            if not error.retryable:
+                return None
+            if error.status_code == 429:
+                # Hold back every caller of this provider, not just this one
+                self.rate_limiter.pause(provider, self.retry_policy.delay(attempt, error.retry_after))
+        elif not isinstance(error, (requests.exceptions.ConnectionError, httpx.ConnectError, httpx.RemoteProtocolError)):
+            return None
+        
+        if attempt > self.retry_policy.max_retries:
+            return None
+        delay = self.retry_policy.delay(attempt, getattr(error, 'retry_after', None))
+        if time.monotonic() + delay >= deadline:
+            return None
+        if not self.retry_budget.try_retry():
+            return None
+        return delay
+    
+    @staticmethod
+    def _wrap_error(error: Exception, timeout: float) -> Exception:
+        """Turn a provider call failure into the error message shown to users"""
+        if isinstance(error, (requests.exceptions.Timeout, httpx.TimeoutException, asyncio.TimeoutError)):
+            return CallTimeout(timeout)
+        if isinstance(error, (requests.exceptions.RequestException, httpx.HTTPError)):
+            return Exception(f"Network error: {str(error)}")
+        return Exception(f"API error: {str(error)}")
+    
+    def _get_openai_completion(self, model: str, prompt: str, timeout: int) -> Tuple[str, Dict[str, Any]]:
         """Get completion from OpenAI API"""
         if not self.openai_api_key:
             raise Exception("OpenAI API key not configured")
         
-        response = requests.post(
-            'https://api.openai.com/v1/chat/completions',
-            headers={
-                'Authorization': f'Bearer {self.openai_api_key}',
-                'Content-Type': 'application/json'
-            },
+        response = self.sessions['openai'].post(
+            self.urls['openai'],
             json={
                 'model': model,
                 'messages': [{'role': 'user', 'content': prompt}],
-                'max_tokens': 1000,
-                'temperature': 0.7
+                **GENERATION_PARAMS['openai']
             },
             timeout=timeout
         )
         
         if response.status_code != 200:
-            error_detail = response.json().get('error', {}).get('message', 'Unknown error')
-            raise Exception(f"OpenAI API error: {error_detail}")
+            raise self._provider_error('OpenAI', response)
         
         result = response.json()
-        return result['choices'][0]['message']['content'].strip()
+        text = result['choices'][0]['message']['content'].strip()
+        return text, build_usage(model, prompt, text, provider='openai', **reported_tokens('openai', result.get('usage')))
     
-    def _get_anthropic_completion(self, model: str, prompt: str, timeout: int) -> str:
+    def _get_anthropic_completion(self, model: str, prompt: str, timeout: int) -> Tuple[str, Dict[str, Any]]:
         """Get completion from Anthropic API"""
         if not self.anthropic_api_key:
             raise Exception("Anthropic API key not configured")
         
-        response = requests.post(
-            'https://api.anthropic.com/v1/messages',
-            headers={
-                'x-api-key': self.anthropic_api_key,
-                'Content-Type': 'application/json',
-                'anthropic-version': '2023-06-01'
-            },
+        response = self.sessions['anthropic'].post(
+            self.urls['anthropic'],
             json={
                 'model': model,
-                'max_tokens': 1000,
-                'messages': [{'role': 'user', 'content': prompt}]
+                'messages': [{'role': 'user', 'content': anthropic_content(prompt)}],
+                **GENERATION_PARAMS['anthropic']
             },
             timeout=timeout
         )
         
         if response.status_code != 200:
-            error_detail = response.json().get('error', {}).get('message', 'Unknown error')
-            raise Exception(f"Anthropic API error: {error_detail}")
+            raise self._provider_error('Anthropic', response)
         
         result = response.json()
-        return result['content'][0]['text'].strip()
+        text = result['content'][0]['text'].strip()
+        return text, build_usage(model, prompt, text, provider='anthropic',
+                                 **reported_tokens('anthropic', result.get('usage')))
     
-    def _get_together_completion(self, model: str, prompt: str, timeout: int) -> str:
+    def _get_together_completion(self, model: str, prompt: str, timeout: int) -> Tuple[str, Dict[str, Any]]:
         """Get completion from Together.ai API"""
         if not self.together_api_key:
             raise Exception("Together.ai API key not configured")
         
-        response = requests.post(
-            'https://api.together.xyz/v1/chat/completions',
-            headers={
-                'Authorization': f'Bearer {self.together_api_key}',
-                'Content-Type': 'application/json'
-            },
+        response = self.sessions['together'].post(
+            self.urls['together'],
             json={
                 'model': model,  # Now uses correct model names like mistralai/Mistral-7B-Instruct-v0.1
                 'messages': [{'role': 'user', 'content': prompt}],
-                'max_tokens': 1000,
-                'temperature': 0.7
+                **GENERATION_PARAMS['together']
             },
             timeout=timeout
         )
         
         if response.status_code != 200:
-            try:
-                error_detail = response.json().get('error', {}).get('message', 'Unknown error')
-            except:
-                error_detail = f"HTTP {response.status_code}: {response.text}"
-            raise Exception(f"Together.ai API error: {error_detail}")
+            raise self._provider_error('Together.ai', response)
         
         result = response.json()
-        return result['choices'][0]['message']['content'].strip()
+        text = result['choices'][0]['message']['content'].strip()
+        return text, build_usage(model, prompt, text, provider='together', **reported_tokens('together', result.get('usage')))
     
-    async def get_completion_async(self, provider: str, model: str, prompt: str, timeout: int = 20) -> str:
-        """Async version of get_completion for concurrent requests"""
-        # For now, we'll use the sync version in a thread pool
-        # In a production app, you'd want to use aiohttp for true async
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, self.get_completion, provider, model, prompt, timeout)
+    def stream_completion(self, provider: str, model: str, prompt: str, timeout: float = 20) -> Iterator[str]:
+        """Stream completion text from specified AI provider as it is generated"""
+        
+        try:
+            self._check_circuit(provider)
+            time.sleep(self._rate_limit_wait(provider, prompt, time.monotonic() + timeout))
+            reported = {}
+            chunks = []
+            started = time.monotonic()
+            connect_timer.reset()
+            try:
+                for text in self._provider_stream(provider, model, prompt, timeout, reported):
+                    chunks.append(text)
+                    yield text
+            except Exception as e:
+                self._record_outcome(provider, e, timeout)
+                self.metrics.record_call(provider, model, time.monotonic() - started,
+                                         connect_timer.seconds, connect_timer.connections, error=e)
+                raise
+            self._record_outcome(provider)
+            usage = build_usage(model, prompt, ''.join(chunks), provider=provider, **reported)
+            self.metrics.record_call(provider, model, time.monotonic() - started,
+                                     connect_timer.seconds, connect_timer.connections, usage)
+                
+        except requests.exceptions.Timeout:
+            raise Exception(f"Request timed out after {timeout} seconds")
+        except requests.exceptions.RequestException as e:
+            raise Exception(f"Network error: {str(e)}")
+        except Exception as e:
+            raise Exception(f"API error: {str(e)}")
     
-    def get_provider_status(self) -> Dict[str, Dict[str, Any]]:
-        """Get status of all AI providers"""
-        status = {}
+    def _provider_stream(self, provider: str, model: str, prompt: str, timeout: float, usage: Dict[str, int]) -> Iterator[str]:
+        """Dispatch a streaming completion to the provider's stream method"""
+        if provider == 'openai':
+            return self._stream_openai_compatible(
+                'openai', self.urls['openai'], self.openai_api_key, 'OpenAI', model, prompt, timeout, usage
+            )
+        elif provider == 'anthropic':
+            return self._stream_anthropic(model, prompt, timeout, usage)
+        elif provider == 'together':
+            return self._stream_openai_compatible(
+                'together', self.urls['together'], self.together_api_key, 'Together.ai', model, prompt, timeout, usage
+            )
+        else:
+            raise ValueError(f"Unsupported provider: {provider}")
+    
+    def _stream_openai_compatible(self, provider: str, url: str, api_key: str, label: str, model: str, prompt: str,
+                                  timeout: float, usage: Optional[Dict[str, int]] = None) -> Iterator[str]:
+        """Stream completion text from an OpenAI-style chat completions API (OpenAI, Together.ai)
+
+        Token counts reported with the stream are stored in ``usage``.
+        """
+        if not api_key:
+            raise Exception(f"{label} API key not configured")
         
-        # OpenAI status
-        status['openai'] = {
-            'configured': bool(self.openai_api_key),
-            'models': [agent for agent in self.agents if agent['provider'] == 'openai'],
-            'enabled_models': [agent for agent in self.agents if agent['provider'] == 'openai' and agent['enabled']]
+        payload = {
+            'model': model,
+            'messages': [{'role': 'user', 'content': prompt}],
+            **GENERATION_PARAMS[provider],
+            'stream': True
         }
+        if provider == 'openai':
+            # Ask for a final chunk carrying the token usage
+            payload['stream_options'] = {'include_usage': True}
         
-        # Anthropic status
-        status['anthropic'] = {
-            'configured': bool(self.anthropic_api_key),
-            'models': [agent for agent in self.agents if agent['provider'] == 'anthropic'],
-            'enabled_models': [agent for agent in self.agents if agent['provider'] == 'anthropic' and agent['enabled']]
+        with self.sessions[provider].post(
+            url,
+            json=payload,
+            timeout=timeout,
+            stream=True
+        ) as response:
+            if response.status_code != 200:
+                raise self._provider_error(label, response)
+            
+            for data in self._iter_sse_data(response):
+                if data == '[DONE]':
+                    break
+                chunk = json.loads(data)
+                if usage is not None and chunk.get('usage'):
+                    usage.update(reported_tokens(provider, chunk['usage']))
+                choices = chunk.get('choices') or []
+                if choices:
+                    text = (choices[0].get('delta') or {}).get('content')
+                    if text:
+                        yield text
+    
+    def _stream_anthropic(self, model: str, prompt: str, timeout: float,
+                          usage: Optional[Dict[str, int]] = None) -> Iterator[str]:
+        """Stream completion text from Anthropic API, storing reported token counts in ``usage``"""
+        if not self.anthropic_api_key:
+            raise Exception("Anthropic API key not configured")
+        
+        with self.sessions['anthropic'].post(
+            self.urls['anthropic'],
+            json={
+                'model': model,
+                'messages': [{'role': 'user', 'content': anthropic_content(prompt)}],
+                **GENERATION_PARAMS['anthropic'],
+                'stream': True
+            },
+            timeout=timeout,
+            stream=True
+        ) as response:
+            if response.status_code != 200:
+                raise self._provider_error('Anthropic', response)
+            
+            for data in self._iter_sse_data(response):
+                event = json.loads(data)
+                if usage is not None:
+                    if event.get('type') == 'message_start':
+                        usage.update(reported_tokens('anthropic', event.get('message', {}).get('usage')))
+                    elif event.get('type') == 'message_delta':
+                        usage['output_tokens'] = (event.get('usage') or {}).get('output_tokens')
+                if event.get('type') == 'content_block_delta':
+                    text = event.get('delta', {}).get('text')
+                    if text:
+                        yield text
+                elif event.get('type') == 'message_stop':
+                    break
+                elif event.get('type') == 'error':
+                    raise Exception(f"Anthropic API error: {event.get('error', {}).get('message', 'Unknown error')}")
+    
+    @staticmethod
+    def _iter_sse_data(response) -> Iterator[str]:
+        """Yield the data payload of each Server-Sent Event in a streaming response"""
+        for line in response.iter_lines():
+            if line.startswith(b'data:'):
+                yield line[5:].strip().decode('utf-8')
+    
+    @staticmethod
+    def _provider_error(label: str, response) -> ProviderError:
+        """Build the error for a failed provider response, keeping status and Retry-After"""
+        try:
+            error_detail = response.json().get('error', {}).get('message', 'Unknown error')
+        except Exception:
+            error_detail = f"HTTP {response.status_code}: {response.text}"
+        return ProviderError(
+            f"{label} API error: {error_detail}",
+            response.status_code,
+            parse_retry_after(response.headers)
+        )
+    
+    def stream_concurrent(self, calls: Dict[str, Dict[str, Any]], timeout: float = 20,
+                          deadline: Optional[Deadline] = None) -> Iterator[Tuple[str, str, Any]]:
+        """Stream several completions concurrently as ``(key, kind, value)`` events
+
+        ``calls`` has the same shape as for run_concurrent (without dependencies).
+        ``kind`` is 'token' with a text chunk, then exactly one 'done' or 'error'
+        per key whose value holds ``ttft`` and ``total`` seconds (plus ``error``).
+        A stream past its deadline, or every stream once the iterator is closed,
+        is cancelled between chunks and its connection released. A request
+        ``deadline`` caps every per-call timeout at the budget it has left.
+        """
+        events = queue.Queue()
+        cancelled = {key: threading.Event() for key in calls}
+        started = time.monotonic()
+        deadlines = {}
+        timeouts = {}
+        for key, call in calls.items():
+            timeouts[key] = call.get('timeout', timeout)
+            if deadline is not None:
+                timeouts[key] = deadline.budget(timeouts[key])
+            deadlines[key] = started + timeouts[key]
+            self.executor.submit(self._pump_stream, key, call, timeouts[key], events, cancelled[key])
+        
+        remaining = set(calls)
+        try:
+            while remaining:
+                next_deadline = min(deadlines[key] for key in remaining)
+                try:
+                    key, kind, value = events.get(timeout=max(0, next_deadline - time.monotonic()))
+                except queue.Empty:
+                    now = time.monotonic()
+                    for key in [key for key in remaining if deadlines[key] <= now]:
+                        cancelled[key].set()
+                        remaining.discard(key)
+                        yield key, 'error', {
+                            'error': f"Request timed out after {timeouts[key]} seconds",
+                            'ttft': None,
+                            'total': round(now - started, 3),
+                            'timed_out': True
+                        }
+                    continue
+                
+                # Ignore stragglers from streams that already timed out
+                if key not in remaining:
+                    continue
+                if kind != 'token':
+                    remaining.discard(key)
+                yield key, kind, value
+        finally:
+            for event in cancelled.values():
+                event.set()
+    
+    def _pump_stream(self, key: str, call: Dict[str, Any], timeout: float, events: queue.Queue, cancelled: threading.Event):
+        """Forward one provider stream into the shared event queue until done or cancelled"""
+        started = time.monotonic()
+        
+        # A cached completion is replayed as a single chunk
+        cache_key = self._cache_key(call['provider'], call['model'], call['prompt'])
+        cached = self._cache_lookup(cache_key, call.get('bypass_cache', False))
+        if cached is not None:
+            self.metrics.record_cache_hit(call['provider'], call['model'])
+            events.put((key, 'token', cached))
+            elapsed = round(time.monotonic() - started, 3)
+            events.put((key, 'done', {'ttft': elapsed, 'total': elapsed}))
+            return
+        
+        first_token = None
+        chunks = []
+        stream = self.stream_completion(call['provider'], call['model'], call['prompt'], timeout)
+        try:
+            for text in stream:
+                if cancelled.is_set():
+                    return
+                if first_token is None:
+                    first_token = round(time.monotonic() - started, 3)
+                chunks.append(text)
+                events.put((key, 'token', text))
+        except Exception as e:
+            events.put((key, 'error', {'error': str(e), 'ttft': first_token, 'total': round(time.monotonic() - started, 3)}))
+            return
+        finally:
+            stream.close()
+        if self.cache is not None:
+            self.cache.set(cache_key, ''.join(chunks).strip())
+        events.put((key, 'done', {'ttft': first_token, 'total': round(time.monotonic() - started, 3)}))
+    
+    def run_concurrent(self, calls: Dict[str, Dict[str, Any]], timeout: float = 20,
+                       deadline: Optional[Deadline] = None, scheduled: bool = False) -> Dict[str, Dict[str, Any]]:
+        """Run several completions concurrently and collect per-call results
+
+        ``calls`` maps a key (e.g. 'agent1') to a dict with ``provider``, ``model``,
+        ``prompt`` and optional per-call ``timeout`` and ``bypass_cache``. A call
+        may name another key in ``depends_on``; it then starts as soon as that
+        call has succeeded, and its ``prompt`` may be a callable that receives
+        the upstream response.
+
+        Every call gets its own deadline; calls still queued when it passes are
+        cancelled. A request ``deadline`` caps each call's timeout at the budget
+        left when the call starts, so dependent calls only get what their
+        upstream left over; calls that would start after it has passed are not
+        made. A failing call never affects independent ones: each key maps to a
+        dict with ``response``, ``error``, ``elapsed`` and ``timed_out``. With
+        the async backend on, the calls run as coroutines instead of threads.
+
+        ``scheduled`` holds calls to the per-provider concurrency caps, as
+        batches are, for large fan-outs such as N-way comparisons. Calls wait
+        for a slot within their own deadline.
+        """
+        self._check_dependencies(calls)
+        if self.async_backend:
+            return self.async_service.run(self._run_concurrent_async(calls, timeout, deadline, scheduled))
+        
+        results = {}
+        futures = {}
+        submitted = {}
+        deadlines = {}
+        timeouts = {}
+        waiting = dict(calls)
+
+        while waiting or futures:
+            # Start every call whose dependency (if any) has finished
+            for key, call in list(waiting.items()):
+                upstream = call.get('depends_on')
+                if upstream is not None and upstream not in results:
+                    continue
+                del waiting[key]
+
+                if upstream is not None and results[upstream]['error']:
+                    results[key] = self._call_result(None, f"Skipped because {upstream} failed", 0)
+                    continue
+
+                call_timeout = self._call_timeout(call, timeout, deadline)
+                if call_timeout is None:
+                    results[key] = self._call_result(None, "Not started: request deadline exceeded", 0, timed_out=True)
+                    continue
+
+                prompt = call['prompt']
+                if callable(prompt):
+                    prompt = prompt(results[upstream]['response'] if upstream is not None else None)
+
+                submitted[key] = time.monotonic()
+                deadlines[key] = submitted[key] + call_timeout
+                timeouts[key] = call_timeout
+                args = (call['provider'], call['model'], prompt, call_timeout, call.get('bypass_cache', False))
+                if scheduled:
+                    futures[key] = self.scheduler.submit(call['provider'], self._timed_completion, *args)
+                else:
+                    futures[key] = self.executor.submit(self._timed_completion, *args)
+
+            if not futures:
+                continue
+
+            # Wake up on the first completion or the nearest deadline
+            next_deadline = min(deadlines[key] for key in futures)
+            wait(list(futures.values()), timeout=max(0, next_deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+
+            now = time.monotonic()
+            for key, future in list(futures.items()):
+                if future.done() and not future.cancelled():
+                    results[key] = future.result()
+                elif deadlines[key] <= now:
+                    # Deadline passed: drop the call if still queued, abandon it if running
+                    future.cancel()
+                    results[key] = self._call_result(
+                        None,
+                        f"Request timed out after {timeouts[key]} seconds",
+                        now - submitted[key],
+                        timed_out=True
+                    )
+                else:
+                    continue
+                del futures[key]
+
+        return results
+
+    async def _run_concurrent_async(self, calls: Dict[str, Dict[str, Any]], timeout: float,
+                                    deadline: Optional[Deadline] = None,
+                                    scheduled: bool = False) -> Dict[str, Dict[str, Any]]:
+        """run_concurrent on the native async backend: one task per call, no threads
+
+        Scheduled calls share one semaphore per provider, sized by the
+        scheduler's caps, for the duration of this run.
+        """
+        tasks = {}
+        slots = {}
+        if scheduled:
+            for call in calls.values():
+                limit = self.scheduler.limits.get(call['provider'], self.scheduler.default_limit)
+                slots.setdefault(call['provider'], asyncio.Semaphore(limit))
+        
+        async def run(key, call):
+            upstream = call.get('depends_on')
+            upstream_response = None
+            if upstream is not None:
+                upstream_result = await tasks[upstream]
+                if upstream_result['error']:
+                    return self._call_result(None, f"Skipped because {upstream} failed", 0)
+                upstream_response = upstream_result['response']
+            
+            # Only the provider call holds a slot, never the wait for an upstream call
+            async with slots.get(call['provider']) or contextlib.nullcontext():
+                call_timeout = self._call_timeout(call, timeout, deadline)
+                if call_timeout is None:
+                    return self._call_result(None, "Not started: request deadline exceeded", 0, timed_out=True)
+                
+                prompt = call['prompt']
+                if callable(prompt):
+                    prompt = prompt(upstream_response)
+                
+                started = time.monotonic()
+                try:
+                    response, usage = await self.get_completion_with_usage_async(
+                        call['provider'], call['model'], prompt, call_timeout, call.get('bypass_cache', False)
+                    )
+                except Exception as e:
+                    return self._call_result(None, str(e), time.monotonic() - started,
+                                             timed_out=str(e).startswith('Request timed out'))
+                return self._call_result(response, None, time.monotonic() - started, usage=usage)
+        
+        for key, call in calls.items():
+            tasks[key] = asyncio.ensure_future(run(key, call))
+        await asyncio.gather(*tasks.values())
+        return {key: task.result() for key, task in tasks.items()}
+    
+    @staticmethod
+    def _call_timeout(call: Dict[str, Any], timeout: float, deadline: Optional[Deadline]) -> Optional[float]:
+        """Timeout for a call starting now, or None if the request deadline has passed"""
+        call_timeout = call.get('timeout', timeout)
+        if deadline is None:
+            return call_timeout
+        if deadline.expired():
+            return None
+        return deadline.budget(call_timeout)
+    
+    @staticmethod
+    def _check_dependencies(calls: Dict[str, Dict[str, Any]]):
+        """Reject dependencies on unknown calls and dependency cycles"""
+        for key, call in calls.items():
+            seen = {key}
+            upstream = call.get('depends_on')
+            while upstream is not None:
+                if upstream not in calls:
+                    raise ValueError(f"Call {key} depends on unknown call {upstream}")
+                if upstream in seen:
+                    raise ValueError(f"Circular dependency between calls: {', '.join(sorted(seen))}")
+                seen.add(upstream)
+                upstream = calls[upstream].get('depends_on')
+    
+    def schedule_completion(self, provider: str, model: str, prompt: str, timeout: float = 20,
+                            bypass_cache: bool = False, group: Optional[str] = None) -> Future:
+        """Queue a completion under the provider's concurrency cap
+
+        The returned future resolves to the same result dict as run_concurrent
+        produces per call. ``group`` lets queued calls be cancelled together.
+        """
+        return self.scheduler.submit(
+            provider, self._timed_completion, provider, model, prompt, timeout, bypass_cache, group=group
+        )
+    
+    def _timed_completion(self, provider: str, model: str, prompt: str, timeout: float,
+                          bypass_cache: bool = False) -> Dict[str, Any]:
+        """Run one completion, capturing its result or error and how long it took"""
+        started = time.monotonic()
+        usage = None
+        try:
+            response, usage = self.get_completion_with_usage(provider, model, prompt, timeout, bypass_cache)
+            error = None
+        except Exception as e:
+            response = None
+            error = str(e)
+        return self._call_result(response, error, time.monotonic() - started, usage=usage)
+
+    @staticmethod
+    def _call_result(response: str, error: str, elapsed: float, timed_out: bool = False,
+                     usage: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Build the per-call result dict returned by run_concurrent"""
+        return {
+            'response': response,
+            'error': error,
+            'elapsed': round(elapsed, 3),
+            'timed_out': timed_out,
+            'usage': usage
         }
+
+    async def get_completion_async(self, provider: str, model: str, prompt: str, timeout: int = 20,
+                                   bypass_cache: bool = False) -> str:
+        """Async version of get_completion for concurrent requests"""
+        response, _ = await self.get_completion_with_usage_async(provider, model, prompt, timeout, bypass_cache)
+        return response
+    
+    async def get_completion_with_usage_async(self, provider: str, model: str, prompt: str, timeout: float = 20,
+                                              bypass_cache: bool = False) -> Tuple[str, Dict[str, Any]]:
+        """Async version of get_completion_with_usage
+
+        Cache reads and writes can hit the SQLite tier, so they run on a
+        worker thread rather than blocking the event loop.
+        """
+        cache_key = self._cache_key(provider, model, prompt)
+        cached = await asyncio.to_thread(self._cache_lookup, cache_key, bypass_cache)
+        if cached is not None:
+            self.metrics.record_cache_hit(provider, model)
+            return cached, cached_usage()
+        
+        async def fetch(remaining):
+            response, usage = await self._fetch_completion_async(provider, model, prompt, remaining)
+            if self.cache is not None:
+                await asyncio.to_thread(self.cache.set, cache_key, response)
+            return response, usage
         
-        # Together.ai status
-        status['together'] = {
-            'configured': bool(self.together_api_key),
-            'models': [agent for agent in self.agents if agent['provider'] == 'together'],
-            'enabled_models': [agent for agent in self.agents if agent['provider'] == 'together' and agent['enabled']]
+        return await self.singleflight.do_async(cache_key, fetch, timeout)
+    
+    def _api_keys(self) -> Dict[str, Optional[str]]:
+        """API key of each provider (None when not configured)"""
+        return {
+            'openai': self.openai_api_key,
+            'anthropic': self.anthropic_api_key,
+            'together': self.together_api_key
         }
+    
+    def get_provider_status(self) -> Dict[str, Dict[str, Any]]:
+        """Get status of all AI providers, with circuit breaker state and the last health probe"""
+        status = {}
+        
+        for provider, api_key in self._api_keys().items():
+            models = self.registry.by_provider(provider)
+            breaker = self.breakers.get(provider)
+            status[provider] = {
+                'configured': bool(api_key),
+                'models': models,
+                'enabled_models': [agent for agent in models if agent['enabled']],
+                'circuit': breaker.snapshot() if breaker is not None else None,
+                'last_probe': self.prober.result(provider)
+            }
         
         return status
     
-    def test_provider_connection(self, provider: str) -> Tuple[bool, str]:
+    def _probe_model(self, provider: str) -> Optional[str]:
+        """Model to probe ``provider`` with: that of its first enabled agent"""
+        for agent in self.registry.by_provider(provider):
+            if agent['enabled']:
+                return agent['model']
+        return None
+    
+    def probe_provider(self, provider: str, timeout: float = 10) -> str:
+        """Send one short completion to ``provider`` with a configured model, raising on failure
+
+        The probe waits for rate-limit capacity like any other call.
+        """
+        model = self._probe_model(provider)
+        if model is None:
+            raise ValueError(f"No enabled agent uses {provider}")
+        test_prompt = "Hello, this is a test. Please respond with 'Test successful.'"
+        deadline = time.monotonic() + timeout
+        time.sleep(self._rate_limit_wait(provider, test_prompt, deadline))
+        result, _ = self._call_provider(provider, model, test_prompt, max(0.001, deadline - time.monotonic()))
+        return f"Success: {result[:50]}..."
+    
+    def test_provider_connection(self, provider: str, timeout: float = 10) -> Tuple[bool, str]:
         """Test connection to a specific provider"""
+        if provider not in self.urls:
+            return False, f"Unknown provider: {provider}"
+        if not self._api_keys().get(provider):
+            return False, "API key not configured"
         try:
-            test_prompt = "Hello, this is a test. Please respond with 'Test successful.'"
-            
-            if provider == 'openai':
-                if not self.openai_api_key:
-                    return False, "API key not configured"
-                result = self._get_openai_completion('gpt-3.5-turbo', test_prompt, 10)
-                return True, f"Success: {result[:50]}..."
-                
-            elif provider == 'anthropic':
-                if not self.anthropic_api_key:
-                    return False, "API key not configured"
-                result = self._get_anthropic_completion('claude-instant-1.2', test_prompt, 10)
-                return True, f"Success: {result[:50]}..."
-                
-            elif provider == 'together':
-                if not self.together_api_key:
-                    return False, "API key not configured"
-                result = self._get_together_completion('mistralai/Mistral-7B-Instruct-v0.1', test_prompt, 10)
-                return True, f"Success: {result[:50]}..."
-                
-            else:
-                return False, f"Unknown provider: {provider}"
-                
+            return True, self.probe_provider(provider, timeout)
         except Exception as e:
             return False, f"Error: {str(e)}"
 
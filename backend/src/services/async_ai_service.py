@@ -0,0 +1,234 @@
+import asyncio
+import threading
+import time
+import weakref
+import httpx
+from typing import Dict, Any, Optional, Tuple
+from src.services.endpoints import GENERATION_PARAMS, provider_endpoints
+from src.services.errors import ProviderError
+from src.services.pricing import build_usage, reported_tokens
+from src.services.prompts import anthropic_content
+from src.services.rate_limit import parse_retry_after
+
+# httpcore trace events that end a TCP or TLS connection phase
+CONNECT_PHASE_ENDS = (
+    'connection.connect_tcp.complete', 'connection.connect_tcp.failed',
+    'connection.start_tls.complete', 'connection.start_tls.failed'
+)
+
+
+def connect_trace(timing: Dict[str, float]):
+    """httpcore ``trace`` extension adding connection setup time to ``timing``
+
+    Every phase is added to ``timing['connect']`` as it ends, so retries and
+    redirects that open further connections are summed rather than
+    overwriting the first one; ``timing['connections']`` counts them.
+    """
+    async def trace(event_name, info):
+        if event_name == 'connection.connect_tcp.started':
+            timing['phase_started'] = time.monotonic()
+            timing['connections'] = timing.get('connections', 0) + 1
+        elif event_name in CONNECT_PHASE_ENDS:
+            now = time.monotonic()
+            timing['connect'] = timing.get('connect', 0.0) + now - timing['phase_started']
+            timing['phase_started'] = now
+    return trace
+
+
+class AsyncProviderClient:
+    """Native async chat client for one AI provider"""
+
+    label = ''
+    provider = ''
+
+    def __init__(self, service: 'AsyncAIService', api_key: Optional[str], url: str):
+        self.service = service
+        self.api_key = api_key
+        self.url = url
+
+    def headers(self) -> Dict[str, str]:
+        """Request headers for this provider"""
+        return {
+            'Authorization': f'Bearer {self.api_key}',
+            'Content-Type': 'application/json'
+        }
+
+    def payload(self, model: str, prompt: str) -> Dict[str, Any]:
+        """Request body for a single-turn chat completion"""
+        return {
+            'model': model,
+            'messages': [{'role': 'user', 'content': prompt}],
+            **GENERATION_PARAMS[self.provider]
+        }
+
+    def parse(self, result: Dict[str, Any]) -> str:
+        """Extract the completion text from a successful response body"""
+        return result['choices'][0]['message']['content'].strip()
+
+    def parse_usage(self, result: Dict[str, Any]) -> Dict[str, Optional[int]]:
+        """Token counts reported in a response body, as build_usage keyword arguments"""
+        return reported_tokens(self.provider, result.get('usage'))
+
+    async def complete(self, model: str, prompt: str, timeout: float,
+                       timing: Optional[Dict[str, float]] = None) -> Tuple[str, Dict[str, Any]]:
+        """Get a completion and its token usage without blocking the event loop
+
+        Time spent opening new connections is added to ``timing['connect']``
+        (with their number in ``timing['connections']``) when given.
+        """
+        if not self.api_key:
+            raise Exception(f"{self.label} API key not configured")
+
+        extensions = {}
+        if timing is not None:
+            extensions['trace'] = connect_trace(timing)
+
+        response = await self.service.http_client().post(
+            self.url,
+            headers=self.headers(),
+            json=self.payload(model, prompt),
+            timeout=timeout,
+            extensions=extensions
+        )
+
+        if response.status_code != 200:
+            try:
+                error_detail = response.json().get('error', {}).get('message', 'Unknown error')
+            except Exception:
+                error_detail = f"HTTP {response.status_code}: {response.text}"
+            raise ProviderError(
+                f"{self.label} API error: {error_detail}",
+                response.status_code,
+                parse_retry_after(response.headers)
+            )
+
+        result = response.json()
+        text = self.parse(result)
+        return text, build_usage(model, prompt, text, provider=self.provider, **self.parse_usage(result))
+
+
+class AsyncOpenAIClient(AsyncProviderClient):
+    """Async client for the OpenAI chat completions API"""
+
+    label = 'OpenAI'
+    provider = 'openai'
+
+
+class AsyncAnthropicClient(AsyncProviderClient):
+    """Async client for the Anthropic messages API"""
+
+    label = 'Anthropic'
+    provider = 'anthropic'
+
+    def headers(self) -> Dict[str, str]:
+        return {
+            'x-api-key': self.api_key,
+            'Content-Type': 'application/json',
+            'anthropic-version': '2023-06-01'
+        }
+
+    def payload(self, model: str, prompt: str) -> Dict[str, Any]:
+        return {
+            'model': model,
+            'messages': [{'role': 'user', 'content': anthropic_content(prompt)}],
+            **GENERATION_PARAMS['anthropic']
+        }
+
+    def parse(self, result: Dict[str, Any]) -> str:
+        return result['content'][0]['text'].strip()
+
+
+class AsyncTogetherClient(AsyncProviderClient):
+    """Async client for the Together.ai chat completions API"""
+
+    label = 'Together.ai'
+    provider = 'together'
+
+
+class AsyncAIService:
+    """Native async access to the AI providers
+
+    All provider clients share one httpx connection pool per event loop, so a
+    single process can keep hundreds of calls in flight without a thread per
+    call. Synchronous code can hand coroutines to a background event loop
+    owned by the service through ``run``.
+    """
+
+    def __init__(self, openai_api_key: Optional[str], anthropic_api_key: Optional[str],
+                 together_api_key: Optional[str], max_connections: int = 100,
+                 max_keepalive_connections: int = 20, urls: Optional[Dict[str, str]] = None):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections
+        )
+        urls = urls or provider_endpoints()
+        self.clients = {
+            'openai': AsyncOpenAIClient(self, openai_api_key, urls['openai']),
+            'anthropic': AsyncAnthropicClient(self, anthropic_api_key, urls['anthropic']),
+            'together': AsyncTogetherClient(self, together_api_key, urls['together'])
+        }
+        # httpx pools are bound to the loop they were created on
+        self._http_clients = weakref.WeakKeyDictionary()
+        self._loop = None
+        self._loop_thread = None
+        self._lock = threading.Lock()
+
+    def http_client(self) -> httpx.AsyncClient:
+        """Return the connection pool for the running event loop"""
+        loop = asyncio.get_running_loop()
+        client = self._http_clients.get(loop)
+        if client is None:
+            client = httpx.AsyncClient(limits=self.limits)
+            self._http_clients[loop] = client
+        return client
+
+    async def get_completion(self, provider: str, model: str, prompt: str, timeout: float = 20) -> str:
+        """Get completion from specified AI provider"""
+
+        try:
+            text, _ = await self.call(provider, model, prompt, timeout)
+            return text
+
+        except (httpx.TimeoutException, asyncio.TimeoutError):
+            raise Exception(f"Request timed out after {timeout} seconds")
+        except httpx.HTTPError as e:
+            raise Exception(f"Network error: {str(e)}")
+        except Exception as e:
+            raise Exception(f"API error: {str(e)}")
+
+    async def call(self, provider: str, model: str, prompt: str, timeout: float,
+                   timing: Optional[Dict[str, float]] = None) -> Tuple[str, Dict[str, Any]]:
+        """Make a single provider API call returning text and usage, raising the underlying error unchanged"""
+        client = self.clients.get(provider)
+        if client is None:
+            raise ValueError(f"Unsupported provider: {provider}")
+        return await asyncio.wait_for(client.complete(model, prompt, timeout, timing), timeout)
+
+    def run(self, coro):
+        """Run a coroutine on the shared background event loop and wait for its result"""
+        return asyncio.run_coroutine_threadsafe(coro, self._background_loop()).result()
+
+    def _background_loop(self) -> asyncio.AbstractEventLoop:
+        """Start the background event loop on first use"""
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._loop_thread = threading.Thread(
+                    target=self._loop.run_forever, name='ai-async-loop', daemon=True
+                )
+                self._loop_thread.start()
+            return self._loop
+
+    async def aclose(self):
+        """Close the connection pool of the running event loop"""
+        client = self._http_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+    def close(self):
+        """Close the background event loop and its connection pool"""
+        with self._lock:
+            loop, self._loop = self._loop, None
+        if loop is not None:
+            asyncio.run_coroutine_threadsafe(self.aclose(), loop).result()
+            loop.call_soon_threadsafe(loop.stop)
@@ -0,0 +1,109 @@
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+class BatchStore:
+    """Durable record of batch runs and their per-cell results
+
+    Every finished (question, agent) cell is written as soon as it completes,
+    so a batch interrupted by a disconnect or restart can be resumed by id and
+    only its missing or failed cells are run again.
+    """
+
+    def __init__(self, db_path: str = ':memory:'):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.executescript('''
+            CREATE TABLE IF NOT EXISTS batches (
+                id TEXT PRIMARY KEY,
+                questions TEXT NOT NULL,
+                agent_ids TEXT NOT NULL,
+                best_practices TEXT NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS batch_results (
+                batch_id TEXT NOT NULL,
+                question_index INTEGER NOT NULL,
+                agent_id TEXT NOT NULL,
+                response TEXT,
+                error TEXT,
+                elapsed REAL,
+                finished_at REAL NOT NULL,
+                PRIMARY KEY (batch_id, question_index, agent_id)
+            );
+        ''')
+        self._db.commit()
+
+    def create_batch(self, batch_id: str, questions: List[str], agent_ids: List[str], best_practices: List[str]):
+        """Record a new batch definition"""
+        with self._lock:
+            self._db.execute(
+                'INSERT INTO batches (id, questions, agent_ids, best_practices, created_at) VALUES (?, ?, ?, ?, ?)',
+                (batch_id, json.dumps(questions), json.dumps(agent_ids), json.dumps(best_practices), time.time())
+            )
+            self._db.commit()
+
+    def get_batch(self, batch_id: str) -> Optional[Dict[str, Any]]:
+        """Load a batch definition, or None if unknown"""
+        with self._lock:
+            row = self._db.execute('SELECT * FROM batches WHERE id = ?', (batch_id,)).fetchone()
+        if row is None:
+            return None
+        return {
+            'batch_id': row['id'],
+            'questions': json.loads(row['questions']),
+            'agent_ids': json.loads(row['agent_ids']),
+            'best_practices': json.loads(row['best_practices']),
+            'created_at': row['created_at']
+        }
+
+    def save_result(self, batch_id: str, question_index: int, agent_id: str,
+                    response: Optional[str], error: Optional[str], elapsed: float):
+        """Record (or overwrite) the outcome of one cell"""
+        with self._lock:
+            self._db.execute(
+                'INSERT OR REPLACE INTO batch_results '
+                '(batch_id, question_index, agent_id, response, error, elapsed, finished_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (batch_id, question_index, agent_id, response, error, elapsed, time.time())
+            )
+            self._db.commit()
+
+    def results(self, batch_id: str, successful_only: bool = False) -> List[Dict[str, Any]]:
+        """Stored cell results of a batch, in matrix order"""
+        query = 'SELECT * FROM batch_results WHERE batch_id = ?'
+        if successful_only:
+            query += ' AND error IS NULL'
+        query += ' ORDER BY question_index, agent_id'
+        with self._lock:
+            rows = self._db.execute(query, (batch_id,)).fetchall()
+        return [
+            {
+                'question_index': row['question_index'],
+                'agent_id': row['agent_id'],
+                'response': row['response'],
+                'error': row['error'],
+                'elapsed': row['elapsed']
+            }
+            for row in rows
+        ]
+
+    def progress(self, batch_id: str) -> Dict[str, int]:
+        """Counts of completed and failed cells"""
+        with self._lock:
+            row = self._db.execute(
+                'SELECT COUNT(*) AS finished, SUM(error IS NOT NULL) AS failed '
+                'FROM batch_results WHERE batch_id = ?',
+                (batch_id,)
+            ).fetchone()
+        failed = row['failed'] or 0
+        return {'completed': row['finished'] - failed, 'failed': failed}
+
+    def close(self):
+        """Close the underlying database"""
+        with self._lock:
+            self._db.close()
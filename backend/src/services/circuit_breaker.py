@@ -0,0 +1,116 @@
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    """Fail fast on a provider that keeps failing
+
+    ``failure_threshold`` consecutive failures open the circuit; while open,
+    calls are refused without touching the network. After
+    ``recovery_timeout`` seconds one trial call is let through (half-open):
+    success closes the circuit, failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_started = None
+        self.last_error = None
+        self.times_opened = 0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a call may go out now (claims the trial slot when half-open)"""
+        with self._lock:
+            now = time.monotonic()
+            if self.state == OPEN:
+                if now - self.opened_at < self.recovery_timeout:
+                    return False
+                self.state = HALF_OPEN
+                self.trial_started = None
+            if self.state == HALF_OPEN:
+                # One trial at a time; a trial that never reports back is replaced
+                if self.trial_started is not None and now - self.trial_started < self.recovery_timeout:
+                    return False
+                self.trial_started = now
+            return True
+
+    def is_open(self) -> bool:
+        """Whether calls are currently being refused"""
+        with self._lock:
+            return self.state == OPEN and time.monotonic() - self.opened_at < self.recovery_timeout
+
+    def retry_after(self) -> float:
+        """Seconds until an open circuit lets a trial call through"""
+        with self._lock:
+            if self.state != OPEN:
+                return 0.0
+            return max(0.0, self.recovery_timeout - (time.monotonic() - self.opened_at))
+
+    def record_success(self):
+        """A call reached the provider and got a usable answer"""
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self.trial_started = None
+
+    def record_failure(self, error: Optional[str] = None):
+        """A call failed because of the provider (timeout, network error, 5xx, 429)"""
+        with self._lock:
+            self.failures += 1
+            self.last_error = error
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self._open()
+
+    def _open(self):
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self.trial_started = None
+        self.times_opened += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current state for status endpoints"""
+        retry_after = self.retry_after()
+        with self._lock:
+            return {
+                'state': self.state,
+                'consecutive_failures': self.failures,
+                'failure_threshold': self.failure_threshold,
+                'retry_after': round(retry_after, 3),
+                'times_opened': self.times_opened,
+                'last_error': self.last_error
+            }
+
+
+class ProviderCircuitBreakers:
+    """One circuit breaker per provider
+
+    Thresholds come from CIRCUIT_FAILURE_THRESHOLD and
+    CIRCUIT_RECOVERY_TIMEOUT unless given explicitly.
+    """
+
+    def __init__(self, providers=('openai', 'anthropic', 'together'),
+                 failure_threshold: Optional[int] = None, recovery_timeout: Optional[float] = None):
+        if failure_threshold is None:
+            failure_threshold = int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', '5'))
+        if recovery_timeout is None:
+            recovery_timeout = float(os.getenv('CIRCUIT_RECOVERY_TIMEOUT', '30'))
+        self.breakers = {
+            provider: CircuitBreaker(failure_threshold, recovery_timeout)
+            for provider in providers
+        }
+
+    def get(self, provider: str) -> Optional[CircuitBreaker]:
+        return self.breakers.get(provider)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {provider: breaker.snapshot() for provider, breaker in self.breakers.items()}
@@ -0,0 +1,151 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+class LRUTTLCache:
+    """Thread-safe in-memory LRU cache whose entries expire after a TTL"""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value, or None when missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        """Store a value, evicting the least recently used entry when full"""
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        """Drop a single entry if present"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """Drop every entry"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class CompletionCache:
+    """Two-tier cache of provider completions
+
+    Entries live in an in-memory LRU with TTL. When ``db_path`` is set they are
+    also written to a SQLite file, so cached completions survive restarts;
+    disk hits are promoted back into memory.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 3600, db_path: Optional[str] = None):
+        self.ttl = ttl
+        self.memory = LRUTTLCache(maxsize, ttl)
+        self.db_path = db_path
+        self._db = None
+        self._db_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS completions '
+                '(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)'
+            )
+            self._db.execute('DELETE FROM completions WHERE expires_at <= ?', (time.time(),))
+            self._db.commit()
+
+    @staticmethod
+    def make_key(provider: str, model: str, prompt: str, params: Dict[str, Any]) -> str:
+        """Hash everything that determines a completion into a cache key"""
+        material = json.dumps(
+            {'provider': provider, 'model': model, 'prompt': prompt, 'params': params},
+            sort_keys=True
+        )
+        return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Look a completion up in memory, then on disk"""
+        value = self.memory.get(key)
+        from_disk = False
+        if value is None and self._db is not None:
+            with self._db_lock:
+                row = self._db.execute(
+                    'SELECT value, expires_at FROM completions WHERE key = ?', (key,)
+                ).fetchone()
+            if row is not None and row[1] > time.time():
+                value = row[0]
+                from_disk = True
+                self.memory.set(key, value, ttl=row[1] - time.time())
+
+        with self._stats_lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                if from_disk:
+                    self.disk_hits += 1
+        return value
+
+    def set(self, key: str, value: str):
+        """Store a completion in memory and, if enabled, on disk"""
+        self.memory.set(key, value)
+        if self._db is not None:
+            with self._db_lock:
+                self._db.execute(
+                    'INSERT OR REPLACE INTO completions (key, value, expires_at) VALUES (?, ?, ?)',
+                    (key, value, time.time() + self.ttl)
+                )
+                self._db.commit()
+
+    def clear(self):
+        """Drop every cached completion from both tiers"""
+        self.memory.clear()
+        if self._db is not None:
+            with self._db_lock:
+                self._db.execute('DELETE FROM completions')
+                self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and tier sizes"""
+        with self._stats_lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'disk_hits': self.disk_hits,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'memory_entries': len(self.memory),
+                'persistent': self._db is not None
+            }
+
+    def close(self):
+        """Close the SQLite tier"""
+        if self._db is not None:
+            with self._db_lock:
+                self._db.close()
+                self._db = None
@@ -0,0 +1,54 @@
+import gzip
+import os
+from typing import Optional
+from flask import Response, request
+from src.services.completion_cache import LRUTTLCache
+
+COMPRESSIBLE_MIMETYPES = ('application/json', 'text/plain')
+
+
+class ResponseCompressor:
+    """``after_request`` hook adding gzip negotiation and conditional GETs to API responses
+
+    JSON (and plain-text) bodies of at least JSON_GZIP_MIN_BYTES are gzipped
+    for clients that accept it. GET responses without an ETag get one derived
+    from their body, so polling clients receive 304s while nothing changed.
+    Compressed bodies of responses whose handler set an ETag (pre-serialized,
+    static data) are cached under that ETag instead of being recompressed.
+    Streaming responses are left untouched.
+    """
+
+    def __init__(self, min_size: Optional[int] = None, level: Optional[int] = None):
+        self.min_size = min_size if min_size is not None else int(os.getenv('JSON_GZIP_MIN_BYTES', '1024'))
+        self.level = level if level is not None else int(os.getenv('JSON_GZIP_LEVEL', '6'))
+        self.compressed = LRUTTLCache(maxsize=64, ttl=3600)
+
+    def __call__(self, response: Response) -> Response:
+        if (response.status_code != 200 or response.is_streamed or response.direct_passthrough
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES or 'Content-Encoding' in response.headers):
+            return response
+
+        conditional = request.method in ('GET', 'HEAD')
+        etag, weak = response.get_etag()
+        static_etag = etag
+        if conditional and not etag:
+            response.add_etag()
+            etag, weak = response.get_etag()
+
+        response.vary.add('Accept-Encoding')
+        body = response.get_data()
+        if len(body) >= self.min_size and request.accept_encodings['gzip']:
+            compressed = self.compressed.get(static_etag) if static_etag else None
+            if compressed is None:
+                compressed = gzip.compress(body, compresslevel=self.level, mtime=0)
+                if static_etag:
+                    self.compressed.set(static_etag, compressed)
+            response.set_data(compressed)
+            response.content_encoding = 'gzip'
+            if etag:
+                # Each encoding is a separate representation with its own validator
+                response.set_etag(f'{etag}-gzip', weak)
+
+        if conditional:
+            response = response.make_conditional(request)
+        return response
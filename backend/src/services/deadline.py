@@ -0,0 +1,35 @@
+import time
+from typing import Any, Dict
+
+class Deadline:
+    """Time budget for one API request, fixed when the request arrives
+
+    Every stage and provider call made on behalf of the request asks the
+    deadline for its timeout, so later stages only get whatever budget the
+    earlier ones left over instead of a fresh fixed timeout each.
+    """
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.started = time.monotonic()
+        self.expires_at = self.started + seconds
+
+    def remaining(self) -> float:
+        """Seconds left before the deadline (never negative)"""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        """Whether the deadline has passed"""
+        return time.monotonic() >= self.expires_at
+
+    def budget(self, timeout: float) -> float:
+        """Timeout for a call that would otherwise get ``timeout`` seconds"""
+        return round(min(timeout, self.remaining()), 3)
+
+    def summary(self) -> Dict[str, Any]:
+        """Budget, elapsed time and whether it ran out, for API responses"""
+        return {
+            'budget': self.seconds,
+            'elapsed': round(time.monotonic() - self.started, 3),
+            'exceeded': self.expired()
+        }
@@ -0,0 +1,31 @@
+import os
+from typing import Dict
+
+# Public API roots; <PROVIDER>_BASE_URL replaces them, e.g. with a proxy or bench/mock_providers.py
+DEFAULT_BASE_URLS = {
+    'openai': 'https://api.openai.com/v1',
+    'anthropic': 'https://api.anthropic.com/v1',
+    'together': 'https://api.together.xyz/v1'
+}
+
+COMPLETION_PATHS = {
+    'openai': '/chat/completions',
+    'anthropic': '/messages',
+    'together': '/chat/completions'
+}
+
+# Generation settings sent with every completion request, by both the sync and async
+# backends; they are part of the completion cache key
+GENERATION_PARAMS = {
+    'openai': {'max_tokens': 1000, 'temperature': 0.7},
+    'anthropic': {'max_tokens': 1000},
+    'together': {'max_tokens': 1000, 'temperature': 0.7}
+}
+
+
+def provider_endpoints() -> Dict[str, str]:
+    """Completion endpoint URL per provider, honouring OPENAI_BASE_URL, ANTHROPIC_BASE_URL and TOGETHER_BASE_URL"""
+    return {
+        provider: os.getenv(f'{provider.upper()}_BASE_URL', default).rstrip('/') + COMPLETION_PATHS[provider]
+        for provider, default in DEFAULT_BASE_URLS.items()
+    }
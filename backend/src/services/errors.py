@@ -0,0 +1,47 @@
+from typing import Optional
+
+# HTTP statuses worth retrying: rate limits, transient server errors, Anthropic overload
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504, 529}
+
+
+class ProviderError(Exception):
+    """Non-success response from an AI provider API"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+    @property
+    def retryable(self) -> bool:
+        return self.status_code in RETRYABLE_STATUS_CODES
+
+
+class CallTimeout(Exception):
+    """A provider call, or a wait on a coalesced one, ran out of time"""
+
+    def __init__(self, timeout: float):
+        super().__init__(f"Request timed out after {timeout} seconds")
+        self.timeout = timeout
+
+
+class RateLimitExceeded(ProviderError):
+    """Local rate limit would delay a call past its deadline"""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message, 429, retry_after)
+
+    @property
+    def retryable(self) -> bool:
+        return False
+
+
+class CircuitOpenError(ProviderError):
+    """Call refused locally because the provider's circuit breaker is open"""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message, 503, retry_after)
+
+    @property
+    def retryable(self) -> bool:
+        return False
@@ -0,0 +1,75 @@
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+class HealthProber:
+    """Background thread that probes each configured provider on an interval
+
+    ``probe(provider, timeout)`` returns a message on success and raises on
+    failure (AIService passes its ``probe_provider``). Results are cached for
+    status endpoints and handed to ``record_outcome(provider, error,
+    timeout)`` (AIService's ``_record_outcome``), which classifies them like
+    any other call: provider failures count towards opening the circuit,
+    while errors such as a 4xx still prove the provider is up, so a
+    successful or merely rejected probe closes it again and recovery does
+    not wait for user traffic to risk a trial call.
+    """
+
+    def __init__(self, probe: Callable[[str, float], str],
+                 record_outcome: Callable[[str, Optional[Exception], float], None], providers,
+                 interval: Optional[float] = None, timeout: Optional[float] = None):
+        self.probe = probe
+        self.record_outcome = record_outcome
+        self.providers = providers
+        if interval is None:
+            # Off unless asked for: every probe is a real, billed completion
+            interval = float(os.getenv('PROVIDER_PROBE_INTERVAL', '0'))
+        self.interval = interval
+        self.timeout = timeout or float(os.getenv('PROVIDER_PROBE_TIMEOUT', '10'))
+        self.results = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start probing in the background (no-op when disabled or already running)"""
+        if self.interval <= 0 or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name='ai-health-prober', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            for provider in self.providers():
+                if self._stop.is_set():
+                    return
+                self.check(provider)
+            self._stop.wait(self.interval)
+
+    def check(self, provider: str) -> Dict[str, Any]:
+        """Probe one provider now and cache the result"""
+        started = time.monotonic()
+        error = None
+        try:
+            message = self.probe(provider, self.timeout)
+        except Exception as e:
+            error, message = e, f"Error: {str(e)}"
+        result = {
+            'ok': error is None,
+            'message': message,
+            'latency': round(time.monotonic() - started, 3),
+            'checked_at': time.time()
+        }
+        with self._lock:
+            self.results[provider] = result
+        self.record_outcome(provider, error, self.timeout)
+        return result
+
+    def result(self, provider: str) -> Optional[Dict[str, Any]]:
+        """Most recent cached probe result, or None if never probed"""
+        with self._lock:
+            return self.results.get(provider)
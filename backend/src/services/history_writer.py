@@ -0,0 +1,115 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from sqlalchemy import insert
+from src.models.history import Assessment, Comparison, question_hash
+from src.models.user import db
+from src.services.structured_logging import log_fields
+
+logger = logging.getLogger(__name__)
+
+MODELS = {'comparison': Comparison, 'assessment': Assessment}
+
+
+class HistoryWriter:
+    """Write-behind persistence of comparisons and assessments
+
+    Request threads only put rows on a bounded queue; one background thread
+    drains it and bulk-inserts up to HISTORY_BATCH_SIZE rows per table and
+    transaction, at least every HISTORY_FLUSH_INTERVAL seconds. When the
+    database falls behind and the queue (HISTORY_QUEUE_MAX) is full, new rows
+    are dropped and counted rather than slowing requests down.
+    """
+
+    def __init__(self, maxsize: Optional[int] = None, batch_size: Optional[int] = None,
+                 flush_interval: Optional[float] = None):
+        self.queue = queue.Queue(maxsize=maxsize or int(os.getenv('HISTORY_QUEUE_MAX', '10000')))
+        self.batch_size = batch_size or int(os.getenv('HISTORY_BATCH_SIZE', '200'))
+        self.flush_interval = flush_interval or float(os.getenv('HISTORY_FLUSH_INTERVAL', '1'))
+        self.app = None
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self._thread = None
+        self._stop = object()
+
+    def init_app(self, app):
+        """Register as the app's history writer and start the background thread"""
+        app.extensions['history_writer'] = self
+        self.app = app
+        self._thread = threading.Thread(target=self._run, name='history-writer', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+        return self
+
+    def record_comparison(self, **row: Any):
+        row.setdefault('question_hash', question_hash(row['question']))
+        self._put('comparison', row)
+
+    def record_assessment(self, **row: Any):
+        row.setdefault('question_hash', question_hash(row['question']))
+        self._put('assessment', row)
+
+    def _put(self, kind: str, row: Dict[str, Any]):
+        row.setdefault('created_at', time.time())
+        try:
+            self.queue.put_nowait((kind, row))
+        except queue.Full:
+            self.dropped += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'pending': self.queue.qsize(),
+            'written': self.written,
+            'dropped': self.dropped,
+            'failed': self.failed
+        }
+
+    def close(self, timeout: float = 5):
+        """Flush what is queued and stop the background thread"""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        try:
+            self.queue.put(self._stop, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size and batch[-1] is not self._stop:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            stopping = batch[-1] is self._stop
+            if stopping:
+                batch.pop()
+            if batch:
+                self._flush(batch)
+            if stopping:
+                return
+
+    def _flush(self, batch: List[tuple]):
+        rows = {kind: [] for kind in MODELS}
+        for kind, row in batch:
+            rows[kind].append(row)
+        try:
+            with self.app.app_context():
+                for kind, kind_rows in rows.items():
+                    if kind_rows:
+                        db.session.execute(insert(MODELS[kind]), kind_rows)
+                db.session.commit()
+            self.written += len(batch)
+        except Exception as e:
+            self.failed += len(batch)
+            logger.error("History write failed", extra=log_fields(rows=len(batch), error=str(e)))
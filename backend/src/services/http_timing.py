@@ -0,0 +1,65 @@
+import threading
+import time
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+class ConnectTimer(threading.local):
+    """Time the calling thread spent opening new connections (TCP + TLS)
+
+    Reset it before a request and read it afterwards. Requests that reuse a
+    pooled keep-alive connection leave it at zero.
+    """
+
+    def __init__(self):
+        self.seconds = 0.0
+        self.connections = 0
+
+    def reset(self):
+        self.seconds = 0.0
+        self.connections = 0
+
+    def add(self, seconds: float):
+        self.seconds += seconds
+        self.connections += 1
+
+
+connect_timer = ConnectTimer()
+
+
+class TimedHTTPConnection(HTTPConnection):
+    def connect(self):
+        started = time.monotonic()
+        try:
+            super().connect()
+        finally:
+            connect_timer.add(time.monotonic() - started)
+
+
+class TimedHTTPSConnection(HTTPSConnection):
+    def connect(self):
+        started = time.monotonic()
+        try:
+            super().connect()
+        finally:
+            connect_timer.add(time.monotonic() - started)
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter whose new connections report their setup time to ``connect_timer``"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        # Replace (not mutate) the dict: urllib3 shares the default between managers
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': TimedHTTPConnectionPool,
+            'https': TimedHTTPSConnectionPool
+        }
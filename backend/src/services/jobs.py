@@ -0,0 +1,311 @@
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Any, Callable, Dict, Optional, Tuple
+from src.services.structured_logging import log_fields
+
+logger = logging.getLogger(__name__)
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+FINISHED = (SUCCEEDED, FAILED)
+
+# A handler turns a job payload into a response body and HTTP status
+JobHandler = Callable[[Dict[str, Any]], Tuple[Dict[str, Any], int]]
+
+
+def _finished_status(status_code: int) -> str:
+    return SUCCEEDED if status_code < 400 else FAILED
+
+
+class MemoryJobQueue:
+    """In-process job queue; queued and finished jobs are lost on restart
+
+    Finished jobs are kept for ``ttl`` seconds so clients can collect their
+    results. At most ``maxsize`` jobs wait at a time.
+    """
+
+    def __init__(self, maxsize: int = 1000, ttl: float = 3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._jobs = {}
+        self._pending = deque()
+        self._lock = threading.Lock()
+
+    def put(self, job: Dict[str, Any]):
+        """Queue a new job, raising queue.Full when too many are waiting"""
+        with self._lock:
+            self._prune()
+            if len(self._pending) >= self.maxsize:
+                raise queue.Full
+            self._jobs[job['job_id']] = job
+            self._pending.append(job['job_id'])
+
+    def claim(self) -> Optional[Dict[str, Any]]:
+        """Mark the oldest queued job as running and return it, or None when idle"""
+        with self._lock:
+            while self._pending:
+                job = self._jobs.get(self._pending.popleft())
+                if job is not None:
+                    job.update(status=RUNNING, started_at=time.time())
+                    return dict(job)
+        return None
+
+    def finish(self, job_id: str, status_code: int, result: Dict[str, Any]):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.update(status=_finished_status(status_code), status_code=status_code,
+                           result=result, finished_at=time.time())
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def requeue_stale(self, older_than: float) -> int:
+        return 0  # running jobs cannot outlive the process that holds them
+
+    def depth(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def _prune(self):
+        cutoff = time.time() - self.ttl
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job['status'] in FINISHED and job['finished_at'] < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+class SQLiteJobQueue:
+    """Durable job queue in SQLite, shareable by several processes on one host
+
+    Queued jobs survive a restart, and jobs left running by a process that
+    died are queued again by ``requeue_stale``. Finished jobs are deleted
+    ``ttl`` seconds after they finish.
+    """
+
+    def __init__(self, db_path: str, maxsize: int = 1000, ttl: float = 3600):
+        self.db_path = db_path
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # Autocommit; claims open their own IMMEDIATE transaction
+        self._db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None, timeout=10)
+        self._db.row_factory = sqlite3.Row
+        self._db.executescript('''
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL,
+                status_code INTEGER,
+                result TEXT,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at);
+        ''')
+
+    def put(self, job: Dict[str, Any]):
+        """Queue a new job, raising queue.Full when too many are waiting"""
+        with self._lock:
+            self._db.execute('DELETE FROM jobs WHERE finished_at < ?', (time.time() - self.ttl,))
+            waiting = self._db.execute('SELECT COUNT(*) FROM jobs WHERE status = ?', (QUEUED,)).fetchone()[0]
+            if waiting >= self.maxsize:
+                raise queue.Full
+            self._db.execute(
+                'INSERT INTO jobs (id, kind, payload, status, created_at) VALUES (?, ?, ?, ?, ?)',
+                (job['job_id'], job['kind'], json.dumps(job['payload']), QUEUED, job['created_at'])
+            )
+
+    def claim(self) -> Optional[Dict[str, Any]]:
+        """Mark the oldest queued job as running and return it, or None when idle"""
+        with self._lock:
+            self._db.execute('BEGIN IMMEDIATE')
+            try:
+                row = self._db.execute(
+                    'SELECT id FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1', (QUEUED,)
+                ).fetchone()
+                if row is not None:
+                    self._db.execute('UPDATE jobs SET status = ?, started_at = ? WHERE id = ?',
+                                     (RUNNING, time.time(), row['id']))
+                self._db.execute('COMMIT')
+            except Exception:
+                self._db.execute('ROLLBACK')
+                raise
+        return self.get(row['id']) if row is not None else None
+
+    def finish(self, job_id: str, status_code: int, result: Dict[str, Any]):
+        with self._lock:
+            self._db.execute(
+                'UPDATE jobs SET status = ?, status_code = ?, result = ?, finished_at = ? WHERE id = ?',
+                (_finished_status(status_code), status_code, json.dumps(result), time.time(), job_id)
+            )
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        if row is None:
+            return None
+        return {
+            'job_id': row['id'],
+            'kind': row['kind'],
+            'payload': json.loads(row['payload']),
+            'status': row['status'],
+            'status_code': row['status_code'],
+            'result': json.loads(row['result']) if row['result'] is not None else None,
+            'created_at': row['created_at'],
+            'started_at': row['started_at'],
+            'finished_at': row['finished_at']
+        }
+
+    def requeue_stale(self, older_than: float) -> int:
+        """Queue jobs again that have been running for longer than ``older_than`` seconds"""
+        with self._lock:
+            cursor = self._db.execute(
+                'UPDATE jobs SET status = ?, started_at = NULL WHERE status = ? AND started_at < ?',
+                (QUEUED, RUNNING, time.time() - older_than)
+            )
+        return cursor.rowcount
+
+    def depth(self) -> int:
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM jobs WHERE status = ?', (QUEUED,)).fetchone()[0]
+
+
+def job_queue_from_env():
+    """The queue backend selected by JOB_QUEUE_BACKEND ('memory' or 'sqlite')"""
+    maxsize = int(os.getenv('JOB_QUEUE_MAX', '1000'))
+    ttl = float(os.getenv('JOB_RESULT_TTL', '3600'))
+    backend = os.getenv('JOB_QUEUE_BACKEND', 'memory').lower()
+    if backend == 'sqlite':
+        db_path = os.getenv('JOB_DB') or os.path.join(
+            os.path.dirname(os.path.dirname(__file__)), 'database', 'jobs.db'
+        )
+        return SQLiteJobQueue(db_path, maxsize, ttl)
+    if backend != 'memory':
+        raise ValueError(f"Unknown JOB_QUEUE_BACKEND: {backend}")
+    return MemoryJobQueue(maxsize, ttl)
+
+
+class JobManager:
+    """Runs queued compare/assess work on a pool of in-process worker threads
+
+    Requests hand their payload to ``submit`` and return a job id at once,
+    so a slow provider round trip holds a job worker (JOB_WORKERS of them)
+    instead of a web server worker. Handlers run inside the app context.
+    ``wait`` lets status streams block until a job changes.
+    """
+
+    def __init__(self, job_queue, handlers: Dict[str, JobHandler], workers: Optional[int] = None,
+                 poll_interval: float = 1.0, stale_after: Optional[float] = None):
+        self.queue = job_queue
+        self.handlers = handlers
+        self.workers = workers or int(os.getenv('JOB_WORKERS', '4'))
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after or float(os.getenv('JOB_STALE_AFTER', '300'))
+        self.app = None
+        self._threads = []
+        self._stopping = threading.Event()
+        # Bumped on every submit/finish; workers and status streams wait on it
+        self._changed = threading.Condition()
+        self._generation = 0
+
+    def init_app(self, app):
+        """Register as the app's job manager and start the workers"""
+        app.extensions['job_manager'] = self
+        self.app = app
+        requeued = self.queue.requeue_stale(self.stale_after)
+        if requeued:
+            logger.warning("Requeued stale jobs", extra=log_fields(count=requeued))
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f'job-worker-{index}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def submit(self, kind: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Queue a job, raising queue.Full when the queue is at capacity"""
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        job = {
+            'job_id': uuid.uuid4().hex,
+            'kind': kind,
+            'payload': payload,
+            'status': QUEUED,
+            'status_code': None,
+            'result': None,
+            'created_at': time.time(),
+            'started_at': None,
+            'finished_at': None
+        }
+        self.queue.put(job)
+        self._notify()
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self.queue.get(job_id)
+
+    def wait(self, job_id: str, status: Optional[str], timeout: float) -> Optional[Dict[str, Any]]:
+        """Return the job once its status differs from ``status``, or as it is after ``timeout``"""
+        ends_at = time.monotonic() + timeout
+        while True:
+            with self._changed:
+                generation = self._generation
+            job = self.queue.get(job_id)
+            remaining = ends_at - time.monotonic()
+            if job is None or job['status'] != status or remaining <= 0:
+                return job
+            with self._changed:
+                if self._generation == generation:
+                    # Other processes sharing a SQLite queue do not notify us, so re-check periodically
+                    self._changed.wait(min(remaining, self.poll_interval))
+
+    def close(self):
+        self._stopping.set()
+        self._notify()
+
+    def _notify(self):
+        with self._changed:
+            self._generation += 1
+            self._changed.notify_all()
+
+    def _work(self):
+        while not self._stopping.is_set():
+            with self._changed:
+                generation = self._generation
+            job = self.queue.claim()
+            if job is None:
+                with self._changed:
+                    if self._generation == generation:
+                        self._changed.wait(self.poll_interval)
+                continue
+            self._notify()
+            self._run(job)
+            self._notify()
+
+    def _run(self, job: Dict[str, Any]):
+        started = time.monotonic()
+        try:
+            with self.app.app_context():
+                result, status_code = self.handlers[job['kind']](job['payload'])
+        except Exception as e:
+            logger.exception("Job crashed", extra=log_fields(job_id=job['job_id'], kind=job['kind']))
+            result, status_code = {"error": f"Job error: {str(e)}"}, 500
+        self.queue.finish(job['job_id'], status_code, result)
+        logger.info("Job finished", extra=log_fields(
+            job_id=job['job_id'], kind=job['kind'], status_code=status_code,
+            queued=round(job['started_at'] - job['created_at'], 3),
+            elapsed=round(time.monotonic() - started, 3)))
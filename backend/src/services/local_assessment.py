@@ -0,0 +1,159 @@
+import os
+import re
+import zlib
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+
+# Common words that say nothing about what an answer claims
+STOPWORDS = frozenset((
+    'the', 'and', 'for', 'are', 'but', 'not', 'you', 'your', 'with', 'this', 'that', 'these', 'those',
+    'from', 'they', 'them', 'their', 'there', 'then', 'than', 'have', 'has', 'had', 'was', 'were', 'will',
+    'would', 'can', 'could', 'should', 'may', 'might', 'also', 'into', 'onto', 'about', 'which', 'what',
+    'when', 'where', 'who', 'how', 'why', 'all', 'any', 'each', 'more', 'most', 'some', 'such', 'only',
+    'other', 'its', 'our', 'out', 'one', 'use', 'using', 'used', 'like', 'just', 'very', 'here', 'make',
+    'sure', 'if', 'so', 'it', 'is', 'be', 'to', 'of', 'in', 'on', 'or', 'as', 'an', 'at', 'by', 'we'
+))
+
+WORD_RE = re.compile(r'[a-z][a-z0-9_]{2,}')
+NUMBER_RE = re.compile(r'(?<![\w.])-?\d+(?:,\d{3})*(?:\.\d+)?')
+LIST_ITEM_RE = re.compile(r'^\s*(?:[-*•]|\d+[.)])\s+', re.MULTILINE)
+CODE_BLOCK_RE = re.compile(r'```[^\n]*\n(.*?)```', re.DOTALL)
+IDENTIFIER_RE = re.compile(r'[A-Za-z_][A-Za-z0-9_]*')
+
+KEY_TERMS = 12
+# Weights of the agreement components; components that do not apply are left out
+WEIGHTS = {
+    'term_similarity': 0.45,
+    'key_term_overlap': 0.2,
+    'numeric_agreement': 0.15,
+    'list_alignment': 0.1,
+    'code_alignment': 0.1
+}
+# How far past the disagreement threshold answers are still said to partly agree
+PARTIAL_AGREEMENT_BAND = 0.25
+
+
+def _terms(text: str) -> List[str]:
+    return [word for word in WORD_RE.findall(text.lower()) if word not in STOPWORDS]
+
+
+def _key_terms(terms: List[str]) -> List[str]:
+    # Counter.most_common keeps first-seen order among equal counts
+    return [term for term, _ in Counter(terms).most_common(KEY_TERMS)]
+
+
+def _numbers(text: str) -> np.ndarray:
+    prose = LIST_ITEM_RE.sub('', CODE_BLOCK_RE.sub('', text))
+    return np.unique(np.array([float(match.replace(',', '')) for match in NUMBER_RE.findall(prose)]))
+
+
+def _ratio(a: float, b: float) -> float:
+    return min(a, b) / max(a, b) if max(a, b) else 1.0
+
+
+def _jaccard(a: set, b: set) -> float:
+    return len(a & b) / len(a | b) if a | b else 1.0
+
+
+def _term_similarities(pairs: Sequence[Tuple[str, str]], terms: List[List[str]], dimensions: int) -> np.ndarray:
+    """Cosine similarity of hashed log term-frequency vectors, for every pair at once"""
+    rows = np.repeat(np.arange(len(terms)), [len(doc) for doc in terms])
+    columns = np.array([zlib.crc32(term.encode()) % dimensions for doc in terms for term in doc], dtype=np.int64)
+    counts = np.zeros((len(terms), dimensions))
+    np.add.at(counts, (rows, columns), 1)
+    vectors = np.log1p(counts).reshape(len(pairs), 2, dimensions)
+    norms = np.linalg.norm(vectors, axis=2)
+    dots = np.einsum('pd,pd->p', vectors[:, 0], vectors[:, 1])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        similarities = dots / (norms[:, 0] * norms[:, 1])
+    # With no content words on either side the answers count as equal; on one side, as unrelated
+    return np.where(norms.prod(axis=1) > 0, similarities, (norms.sum(axis=1) == 0).astype(float))
+
+
+def _numeric_disagreement(a: np.ndarray, b: np.ndarray, rtol: float = 0.01) -> Optional[float]:
+    """Share of the numbers quoted by either answer that the other answer does not quote"""
+    if not len(a) or not len(b):
+        return None
+    close = np.isclose(a[:, np.newaxis], b[np.newaxis, :], rtol=rtol)
+    unmatched = (~close.any(axis=1)).sum() + (~close.any(axis=0)).sum()
+    return float(unmatched / (len(a) + len(b)))
+
+
+def _code_alignment(a: str, b: str) -> Optional[float]:
+    """Identifier overlap of the answers' code blocks; None when neither has code"""
+    blocks_a, blocks_b = CODE_BLOCK_RE.findall(a), CODE_BLOCK_RE.findall(b)
+    if not blocks_a and not blocks_b:
+        return None
+    if not blocks_a or not blocks_b:
+        return 0.0
+    return _jaccard(set(IDENTIFIER_RE.findall('\n'.join(blocks_a))), set(IDENTIFIER_RE.findall('\n'.join(blocks_b))))
+
+
+def assess_pairs(pairs: Sequence[Tuple[str, str]], dimensions: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Score how far each pair of answers agrees, without calling a model
+
+    Returns per pair: ``term_similarity`` (cosine of hashed term
+    frequencies), ``key_term_overlap`` and ``shared_terms``,
+    ``numeric_disagreement`` (None unless both quote numbers), list and
+    code-block alignment, ``length_ratio``, and the weighted ``agreement``
+    with its complement ``disagreement``, all between 0 and 1.
+    """
+    if not pairs:
+        return []
+    dimensions = dimensions or int(os.getenv('LOCAL_ASSESS_DIMENSIONS', '4096'))
+    terms = [_terms(text or '') for pair in pairs for text in pair]
+    term_similarities = _term_similarities(pairs, terms, dimensions)
+
+    scores = []
+    for index, (a, b) in enumerate(pairs):
+        a, b = a or '', b or ''
+        terms_a, terms_b = terms[2 * index], terms[2 * index + 1]
+        key_a, key_b = _key_terms(terms_a), _key_terms(terms_b)
+        numeric_disagreement = _numeric_disagreement(_numbers(a), _numbers(b))
+        components = {
+            'term_similarity': float(term_similarities[index]),
+            'key_term_overlap': _jaccard(set(key_a), set(key_b)),
+            'numeric_agreement': 1 - numeric_disagreement if numeric_disagreement is not None else None,
+            'list_alignment': _ratio(len(LIST_ITEM_RE.findall(a)), len(LIST_ITEM_RE.findall(b))),
+            'code_alignment': _code_alignment(a, b)
+        }
+        applicable = {key: value for key, value in components.items() if value is not None}
+        agreement = min(sum(WEIGHTS[key] * value for key, value in applicable.items()) / sum(
+            WEIGHTS[key] for key in applicable), 1.0)
+        scores.append({
+            'term_similarity': round(components['term_similarity'], 3),
+            'key_term_overlap': round(components['key_term_overlap'], 3),
+            'shared_terms': [term for term in key_a if term in key_b],
+            'numeric_disagreement': round(numeric_disagreement, 3) if numeric_disagreement is not None else None,
+            'list_alignment': round(components['list_alignment'], 3),
+            'code_alignment': round(components['code_alignment'], 3) if components['code_alignment'] is not None else None,
+            'length_ratio': round(_ratio(len(terms_a), len(terms_b)), 3),
+            'agreement': round(agreement, 3),
+            'disagreement': round(1 - agreement, 3)
+        })
+    return scores
+
+
+def summary_text(score: Dict[str, Any], threshold: float = 0.35) -> str:
+    """One-paragraph, human-readable account of a local score, shown in place of a model's assessment
+
+    The verdict follows the disagreement ``threshold`` the request was judged
+    against: below it the answers broadly agree, and up to PARTIAL_AGREEMENT_BAND
+    above it they still partly agree.
+    """
+    if score['disagreement'] < threshold:
+        verdict = 'broadly agree'
+    elif score['disagreement'] < threshold + PARTIAL_AGREEMENT_BAND:
+        verdict = 'partly agree'
+    else:
+        verdict = 'differ substantially'
+    parts = [f"Local check: the answers {verdict} (agreement {score['agreement']:.2f})."]
+    if score['shared_terms']:
+        parts.append("Shared key terms: " + ", ".join(score['shared_terms'][:8]) + ".")
+    if score['numeric_disagreement']:
+        parts.append(f"{score['numeric_disagreement']:.0%} of the quoted numbers differ.")
+    if score['code_alignment'] is not None and score['code_alignment'] < 0.5:
+        parts.append("Their code differs." if score['code_alignment'] else "Only one answer includes code.")
+    parts.append("No model assessment was run.")
+    return " ".join(parts)
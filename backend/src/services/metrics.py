@@ -0,0 +1,208 @@
+import asyncio
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import httpx
+import requests
+from src.services.errors import CircuitOpenError, ProviderError, RateLimitExceeded
+
+# Latency buckets (seconds) sized for LLM calls: sub-second cache-warm replies up to slow 60 s tails
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60)
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...]) -> str:
+    if not names:
+        return ''
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{name}="{escaped}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    """Monotonic counter with labels"""
+
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: Tuple[str, ...] = (), amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, labels: Tuple[str, ...] = ()) -> float:
+        with self._lock:
+            return self._values.get(labels, 0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f'{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}' for labels, value in items]
+
+
+class Histogram:
+    """Cumulative-bucket histogram with labels"""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets) + (float('inf'),)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: Tuple[str, ...], value: float):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['counts'][index] += 1
+                    break
+            series['sum'] += value
+            series['count'] += 1
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((labels, dict(series, counts=list(series['counts']))) for labels, series in self._series.items())
+        lines = []
+        names = self.labelnames + ('le',)
+        for labels, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, series['counts']):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{_format_labels(names, labels + (_format_value(bound),))} {cumulative}')
+            lines.append(f'{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(round(series["sum"], 6))}')
+            lines.append(f'{self.name}_count{_format_labels(self.labelnames, labels)} {series["count"]}')
+        return lines
+
+
+class MetricsRegistry:
+    """Set of metrics rendered together in Prometheus text exposition format"""
+
+    def __init__(self):
+        self.metrics = []
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        metric = Counter(name, documentation, labelnames)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                  buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+def error_type(error: Exception) -> str:
+    """Short, low-cardinality label for a failed call"""
+    if isinstance(error, CircuitOpenError):
+        return 'circuit_open'
+    if isinstance(error, RateLimitExceeded):
+        return 'local_rate_limit'
+    if isinstance(error, ProviderError):
+        if error.status_code == 429:
+            return 'rate_limited'
+        if error.status_code is not None and error.status_code >= 500:
+            return 'server_error'
+        return 'client_error'
+    if isinstance(error, (requests.exceptions.Timeout, httpx.TimeoutException, asyncio.TimeoutError)):
+        return 'timeout'
+    if isinstance(error, (requests.exceptions.ConnectionError, httpx.TransportError)):
+        return 'connection'
+    return 'other'
+
+
+class AIMetrics:
+    """Provider call instrumentation: latency, tokens, errors and estimated cost"""
+
+    def __init__(self):
+        self.registry = MetricsRegistry()
+        self.call_duration = self.registry.histogram(
+            'ai_call_duration_seconds',
+            'Provider API call latency; phase="connect" covers new TCP/TLS connections only',
+            ('provider', 'model', 'phase')
+        )
+        self.calls = self.registry.counter(
+            'ai_calls_total', 'Provider API calls by outcome', ('provider', 'model', 'outcome')
+        )
+        self.errors = self.registry.counter(
+            'ai_call_errors_total', 'Failed provider API calls by error type', ('provider', 'model', 'error_type')
+        )
+        self.tokens = self.registry.counter(
+            'ai_tokens_total', 'Tokens reported by providers', ('provider', 'model', 'direction')
+        )
+        self.cost = self.registry.counter(
+            'ai_cost_usd_total', 'Estimated provider spend in US dollars', ('provider', 'model')
+        )
+        self.connections = self.registry.counter(
+            'ai_connections_opened_total', 'New connections opened to providers', ('provider',)
+        )
+        self.cache_hits = self.registry.counter(
+            'ai_completion_cache_hits_total', 'Completions answered from the cache', ('provider', 'model')
+        )
+        self.singleflight = self.registry.counter(
+            'ai_singleflight_requests_total',
+            'Uncached completion requests by single-flight role; followers shared a leader\'s upstream call',
+            ('role',)
+        )
+
+    def record_call(self, provider: str, model: str, total: float, connect: float = 0.0, connections: int = 0,
+                    usage: Optional[Dict[str, Any]] = None, error: Optional[Exception] = None):
+        """Record one provider API call attempt"""
+        self.call_duration.observe((provider, model, 'total'), total)
+        if connections:
+            self.call_duration.observe((provider, model, 'connect'), connect)
+            self.connections.inc((provider,), connections)
+        if error is not None:
+            self.calls.inc((provider, model, 'error'))
+            self.errors.inc((provider, model, error_type(error)))
+            return
+        self.calls.inc((provider, model, 'success'))
+        if usage:
+            self.tokens.inc((provider, model, 'input'), usage['input_tokens'])
+            self.tokens.inc((provider, model, 'output'), usage['output_tokens'])
+            if usage.get('cached_input_tokens'):
+                self.tokens.inc((provider, model, 'cached_input'), usage['cached_input_tokens'])
+            if usage.get('cache_write_tokens'):
+                self.tokens.inc((provider, model, 'cache_write'), usage['cache_write_tokens'])
+            if usage.get('cost') is not None:
+                self.cost.inc((provider, model), usage['cost'])
+
+    def record_refused(self, provider: str, model: str, error: Exception):
+        """Record a call refused locally before it reached the provider"""
+        self.errors.inc((provider, model, error_type(error)))
+
+    def record_cache_hit(self, provider: str, model: str):
+        self.cache_hits.inc((provider, model))
+
+    def record_singleflight(self, role: str):
+        """Count one request that led ('leader') or joined ('follower') an in-flight call"""
+        self.singleflight.inc((role,))
+
+    def render(self) -> str:
+        return self.registry.render()
@@ -0,0 +1,49 @@
+import os
+from typing import List, Optional, Sequence, Tuple
+
+# Who assesses whom once N agents have answered:
+#   all_pairs    every agent assesses every other answer, N*(N-1) calls
+#   round_robin  each agent assesses the next agent's answer, N calls
+#   judge        one judge assesses every answer but its own, which the next agent assesses, N calls
+ASSESSMENT_MODES = ('all_pairs', 'round_robin', 'judge')
+
+
+def max_agents() -> int:
+    return int(os.getenv('MAX_COMPARE_AGENTS', '6'))
+
+
+def validate_agent_ids(agent_ids) -> Optional[str]:
+    """Check an N-way agent list, returning an error message or None"""
+    if not isinstance(agent_ids, list) or not all(isinstance(agent_id, str) and agent_id for agent_id in agent_ids):
+        return "agent_ids must be a list of agent ids"
+    if not 2 <= len(agent_ids) <= max_agents():
+        return f"agent_ids must name between 2 and {max_agents()} agents"
+    if len(set(agent_ids)) != len(agent_ids):
+        return "agent_ids must not repeat an agent"
+    return None
+
+
+def assessment_pairs(agent_ids: Sequence[str], mode: str = 'all_pairs',
+                     judge_id: Optional[str] = None) -> List[Tuple[str, str]]:
+    """(assessor, assessed) pairs for ``mode``; no agent ever assesses its own answer"""
+    if mode not in ASSESSMENT_MODES:
+        raise ValueError(f"Unknown assessment mode: {mode}")
+    count = len(agent_ids)
+    if mode == 'all_pairs':
+        return [(assessor, assessed) for assessor in agent_ids for assessed in agent_ids if assessor != assessed]
+    if mode == 'round_robin':
+        return [(agent_ids[(index + 1) % count], agent_ids[index]) for index in range(count)]
+    judge_id = judge_id or agent_ids[0]
+    pairs = [(judge_id, assessed) for assessed in agent_ids if assessed != judge_id]
+    if judge_id in agent_ids:
+        index = list(agent_ids).index(judge_id)
+        pairs.append((agent_ids[(index + 1) % count], judge_id))
+    return pairs
+
+
+def answer_key(agent_id: str) -> str:
+    return f'answer:{agent_id}'
+
+
+def assessment_key(assessor: str, assessed: str) -> str:
+    return f'assessment:{assessor}:{assessed}'
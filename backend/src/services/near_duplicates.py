@@ -0,0 +1,193 @@
+import atexit
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from src.services.structured_logging import log_fields
+
+logger = logging.getLogger(__name__)
+
+# Words that change a question's phrasing more than its meaning
+STOPWORDS = frozenset((
+    'a', 'an', 'the', 'how', 'do', 'does', 'did', 'i', 'you', 'we', 'to', 'can', 'could', 'would',
+    'should', 'is', 'are', 'what', 'whats', 'please', 'me', 'my', 'in', 'of', 'for', 'on', 'with'
+))
+
+Scope = Tuple[str, str, Tuple[str, ...]]
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase, strip punctuation and filler words, collapse whitespace"""
+    words = re.sub(r'[^\w\s]', ' ', (question or '').lower()).split()
+    kept = [word for word in words if word not in STOPWORDS]
+    return ' '.join(kept or words)
+
+
+def lsh_bands(threshold: float, num_perm: int) -> int:
+    """Number of LSH bands whose candidate threshold sits closest below ``threshold``
+
+    A pair with Jaccard similarity s shares at least one of b bands of r rows
+    with probability 1 - (1 - s**r)**b, which rises steeply around
+    (1/b)**(1/r). Taking the largest r that keeps that point at or below the
+    similarity threshold keeps recall high without flooding every query with
+    candidates.
+    """
+    divisors = [bands for bands in range(num_perm, 0, -1) if num_perm % bands == 0]
+    best = divisors[0]
+    for bands in divisors:
+        if (1 / bands) ** (bands / num_perm) > threshold:
+            break
+        best = bands
+    return best
+
+
+def comparison_scope(agent1_id: str, agent2_id: str, best_practices: Optional[Iterable[str]]) -> Scope:
+    """Questions only match within the same agent pair and best-practice set"""
+    return agent1_id, agent2_id, tuple(sorted({phrase.strip() for phrase in best_practices or ()}))
+
+
+class NearDuplicateIndex:
+    """In-process MinHash/LSH index of past comparison questions
+
+    Questions are normalized, split into character shingles and reduced to
+    a MinHash signature, all with NumPy array operations. Signatures are
+    split into LSH bands; questions sharing any band bucket within the same
+    scope are candidates, and the best candidate whose estimated Jaccard
+    similarity reaches NEAR_DUP_THRESHOLD is the match. The number of bands
+    follows from the threshold (see ``lsh_bands``) unless NEAR_DUP_BANDS
+    sets it. Holds at most
+    NEAR_DUP_MAX_ENTRIES questions, evicting the oldest.
+    """
+
+    def __init__(self, threshold: Optional[float] = None, num_perm: int = 128, bands: Optional[int] = None,
+                 shingle_size: Optional[int] = None, max_entries: Optional[int] = None):
+        self.threshold = threshold if threshold is not None else float(os.getenv('NEAR_DUP_THRESHOLD', '0.8'))
+        self.bands = bands or int(os.getenv('NEAR_DUP_BANDS') or lsh_bands(self.threshold, num_perm))
+        if num_perm % self.bands:
+            raise ValueError("num_perm must be a multiple of the number of bands")
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size or int(os.getenv('NEAR_DUP_SHINGLE_SIZE', '4'))
+        self.max_entries = max_entries or int(os.getenv('NEAR_DUP_MAX_ENTRIES', '10000'))
+        # Multiply-shift hash family: h(x) = (a*x + b mod 2**64) >> 32, with odd a
+        rng = np.random.default_rng(1)
+        self._a = rng.integers(1, 2 ** 63, size=num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self._b = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64)
+        self._weights = np.uint64(256) ** np.arange(self.shingle_size - 1, -1, -1, dtype=np.uint64)
+        self._entries = OrderedDict()
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._rebuild = None
+
+    def shingles(self, text: str) -> np.ndarray:
+        """Distinct character shingles of ``text`` packed into uint64 values"""
+        data = np.frombuffer(text.encode('utf-8'), dtype=np.uint8).astype(np.uint64)
+        if len(data) < self.shingle_size:
+            data = np.pad(data, (0, self.shingle_size - len(data)))
+        windows = np.lib.stride_tricks.sliding_window_view(data, self.shingle_size)
+        return np.unique(windows @ self._weights)
+
+    def signature(self, question: str) -> np.ndarray:
+        """MinHash signature of a question: the minimum of each hash function over its shingles"""
+        shingles = self.shingles(normalize_question(question))
+        hashed = (shingles[np.newaxis, :] * self._a[:, np.newaxis] + self._b[:, np.newaxis]) >> np.uint64(32)
+        return hashed.min(axis=1).astype(np.uint32)
+
+    def _band_keys(self, scope: Scope, signature: np.ndarray) -> List[tuple]:
+        return [(scope, index, band.tobytes()) for index, band in enumerate(signature.reshape(self.bands, -1))]
+
+    def add(self, scope: Scope, comparison_id: str, question: str):
+        """Index the question of a stored comparison"""
+        signature = self.signature(question)
+        with self._lock:
+            if comparison_id in self._entries:
+                return
+            self._entries[comparison_id] = (scope, question, signature)
+            for key in self._band_keys(scope, signature):
+                self._buckets.setdefault(key, []).append(comparison_id)
+            while len(self._entries) > self.max_entries:
+                self._unbucket(*self._entries.popitem(last=False))
+
+    def _unbucket(self, comparison_id: str, entry: tuple):
+        scope, _, signature = entry
+        for key in self._band_keys(scope, signature):
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.remove(comparison_id)
+                if not bucket:
+                    del self._buckets[key]
+
+    def query(self, scope: Scope, question: str) -> Optional[Dict[str, Any]]:
+        """The most similar indexed question in ``scope`` at or above the threshold, or None"""
+        signature = self.signature(question)
+        with self._lock:
+            candidates = []
+            for key in self._band_keys(scope, signature):
+                candidates.extend(self._buckets.get(key, ()))
+            candidates = list(dict.fromkeys(candidates))
+            if not candidates:
+                return None
+            signatures = np.stack([self._entries[comparison_id][2] for comparison_id in candidates])
+            questions = [self._entries[comparison_id][1] for comparison_id in candidates]
+        similarities = (signatures == signature).mean(axis=1)
+        best = int(similarities.argmax())
+        if similarities[best] < self.threshold:
+            return None
+        return {
+            'comparison_id': candidates[best],
+            'question': questions[best],
+            'similarity': round(float(similarities[best]), 3)
+        }
+
+    def discard(self, comparison_id: str):
+        """Forget a comparison whose stored result is no longer available"""
+        with self._lock:
+            entry = self._entries.pop(comparison_id, None)
+            if entry is not None:
+                self._unbucket(comparison_id, entry)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def init_app(self, app, load_history: bool = False):
+        """Register as the app's index, rebuilding it from the history database in the background"""
+        app.extensions['near_duplicates'] = self
+        if load_history:
+            self._rebuild = threading.Thread(target=self._load_history, args=(app,), name='near-dup-rebuild', daemon=True)
+            self._rebuild.start()
+            # A rebuild still running while the interpreter shuts down can abort the process
+            atexit.register(self.close)
+        return self
+
+    def close(self, timeout: float = 5):
+        """Stop a history rebuild still in progress"""
+        self._stopping.set()
+        if self._rebuild is not None:
+            self._rebuild.join(timeout)
+
+    def _load_history(self, app):
+        from src.models.history import Comparison
+
+        try:
+            with app.app_context():
+                rows = (Comparison.query
+                        .with_entities(Comparison.comparison_id, Comparison.question, Comparison.agent1_id,
+                                       Comparison.agent2_id, Comparison.best_practices)
+                        .filter(Comparison.follow_up.is_(False), Comparison.agent_ids.is_(None),
+                                Comparison.agent1_response.isnot(None), Comparison.agent2_response.isnot(None),
+                                Comparison.agent1_error.is_(None), Comparison.agent2_error.is_(None))
+                        .order_by(Comparison.created_at.desc(), Comparison.id.desc())
+                        .limit(self.max_entries)
+                        .all())
+            # Oldest first, so the newest end up most recently used
+            for comparison_id, question, agent1_id, agent2_id, best_practices in reversed(rows):
+                if self._stopping.is_set():
+                    return
+                self.add(comparison_scope(agent1_id, agent2_id, best_practices), comparison_id, question)
+            logger.info("Near-duplicate index rebuilt", extra=log_fields(entries=len(self)))
+        except Exception as e:
+            logger.error("Near-duplicate index rebuild failed", extra=log_fields(error=str(e)))
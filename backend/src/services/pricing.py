@@ -0,0 +1,89 @@
+from typing import Any, Dict, Optional
+from src.services.tokens import estimate_tokens
+
+# List prices in US dollars per million tokens (input, output); models not listed report no cost
+MODEL_PRICING = {
+    'gpt-3.5-turbo': (0.50, 1.50),
+    'gpt-4': (30.00, 60.00),
+    'claude-3-haiku-20240307': (0.25, 1.25),
+    'claude-instant-1.2': (0.80, 2.40),
+    'mistralai/Mistral-7B-Instruct-v0.1': (0.20, 0.20),
+    'mistralai/Mixtral-8x7B-Instruct-v0.1': (0.60, 0.60),
+    'meta-llama/Llama-2-7b-chat-hf': (0.20, 0.20),
+    'codellama/CodeLlama-7b-Instruct-hf': (0.20, 0.20)
+}
+
+
+# Price of prompt-cache reads and writes relative to the input price, per provider
+CACHE_PRICE_FACTORS = {
+    'openai': (0.5, 1.0),
+    'anthropic': (0.1, 1.25)
+}
+
+
+def estimate_cost(model: str, input_tokens: int, output_tokens: int, cached_input_tokens: int = 0,
+                  cache_write_tokens: int = 0, provider: Optional[str] = None) -> Optional[float]:
+    """Estimated price of one call, or None when the model's pricing is unknown
+
+    ``input_tokens`` includes the prompt tokens read from or written to the
+    provider's prompt cache, which are billed at CACHE_PRICE_FACTORS.
+    """
+    prices = MODEL_PRICING.get(model)
+    if prices is None:
+        return None
+    read_factor, write_factor = CACHE_PRICE_FACTORS.get(provider, (1.0, 1.0))
+    uncached = input_tokens - cached_input_tokens - cache_write_tokens
+    input_cost = (uncached + cached_input_tokens * read_factor + cache_write_tokens * write_factor) * prices[0]
+    return round((input_cost + output_tokens * prices[1]) / 1_000_000, 8)
+
+
+def reported_tokens(provider: str, usage: Optional[Dict[str, Any]]) -> Dict[str, Optional[int]]:
+    """Token counts from a provider's usage object, as build_usage keyword arguments
+
+    Anthropic counts cache reads and writes apart from ``input_tokens``;
+    OpenAI includes cached tokens in ``prompt_tokens``. Both come out with
+    ``input_tokens`` as the whole prompt.
+    """
+    usage = usage or {}
+    if provider == 'anthropic':
+        cached = usage.get('cache_read_input_tokens') or 0
+        written = usage.get('cache_creation_input_tokens') or 0
+        input_tokens = usage.get('input_tokens')
+        return {
+            'input_tokens': input_tokens + cached + written if input_tokens is not None else None,
+            'output_tokens': usage.get('output_tokens'),
+            'cached_input_tokens': cached,
+            'cache_write_tokens': written
+        }
+    return {
+        'input_tokens': usage.get('prompt_tokens'),
+        'output_tokens': usage.get('completion_tokens'),
+        'cached_input_tokens': (usage.get('prompt_tokens_details') or {}).get('cached_tokens') or 0,
+        'cache_write_tokens': 0
+    }
+
+
+def build_usage(model: str, prompt: str, completion: str, input_tokens: Optional[int] = None,
+                output_tokens: Optional[int] = None, cached_input_tokens: int = 0, cache_write_tokens: int = 0,
+                provider: Optional[str] = None) -> Dict[str, Any]:
+    """Usage record for one call, estimating token counts the provider did not report"""
+    estimated = input_tokens is None or output_tokens is None
+    if input_tokens is None:
+        input_tokens = estimate_tokens(prompt)
+    if output_tokens is None:
+        output_tokens = estimate_tokens(completion)
+    return {
+        'input_tokens': input_tokens,
+        'output_tokens': output_tokens,
+        'cached_input_tokens': cached_input_tokens,
+        'cache_write_tokens': cache_write_tokens,
+        'estimated': estimated,
+        'cost': estimate_cost(model, input_tokens, output_tokens, cached_input_tokens, cache_write_tokens, provider),
+        'cached': False
+    }
+
+
+def cached_usage() -> Dict[str, Any]:
+    """Usage record for a completion served from cache: nothing was billed"""
+    return {'input_tokens': 0, 'output_tokens': 0, 'cached_input_tokens': 0, 'cache_write_tokens': 0,
+            'estimated': False, 'cost': 0.0, 'cached': True}
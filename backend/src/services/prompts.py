@@ -0,0 +1,99 @@
+import os
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+ASSESSMENT_PROMPT_TEMPLATE = """I asked the following question:
+"{question}"
+
+I received this answer:
+"{answer}"
+
+"""
+
+
+class Prompt(str):
+    """Prompt text laid out as a stable prefix followed by variable content
+
+    It is an ordinary string everywhere a prompt is used (cache keys, token
+    estimates, OpenAI and Together requests), so providers that cache
+    prompt prefixes automatically see the same leading text on every call.
+    ``blocks`` keeps the layout as (text, breakpoint) pairs; a breakpoint
+    marks the end of a prefix worth caching, which the Anthropic request
+    turns into a ``cache_control`` marker.
+    """
+
+    blocks: Tuple[Tuple[str, bool], ...]
+
+    def __new__(cls, blocks: Iterable[Tuple[str, bool]]):
+        blocks = tuple((text, breakpoint) for text, breakpoint in blocks if text)
+        prompt = super().__new__(cls, ''.join(text for text, _ in blocks))
+        prompt.blocks = blocks
+        return prompt
+
+    @classmethod
+    def layout(cls, stable: str, variable: str) -> 'Prompt':
+        return cls([(stable, True), (variable, False)])
+
+
+def prompt_caching_enabled() -> bool:
+    return os.getenv('PROMPT_CACHE_ENABLED', 'true').lower() == 'true'
+
+
+def anthropic_content(prompt: str) -> Union[str, List[Dict[str, Any]]]:
+    """Message content for Anthropic: text blocks with a cache breakpoint after each stable prefix"""
+    if not isinstance(prompt, Prompt) or not prompt_caching_enabled() or not any(bp for _, bp in prompt.blocks):
+        return prompt
+    content = []
+    for text, breakpoint in prompt.blocks:
+        block = {'type': 'text', 'text': text}
+        if breakpoint:
+            block['cache_control'] = {'type': 'ephemeral'}
+        content.append(block)
+    return content
+
+
+def _best_practices_text(best_practices: Optional[Sequence[str]]) -> str:
+    return "\n\nAlso: " + " ".join(best_practices) if best_practices else ""
+
+
+def build_compare_prompt(question: str, best_practices: Optional[Sequence[str]] = None,
+                         context: Optional[Dict[str, Any]] = None, own_key: str = 'agent1') -> Prompt:
+    """Prompt for one agent in a compare: earlier context first, then the question and best practices
+
+    ``context`` is the follow-up context older clients send (the previous
+    question and both responses); ``own_key`` says which of those responses
+    is this agent's own.
+    """
+    if not context:
+        return Prompt([(question + _best_practices_text(best_practices), False)])
+    other_key = 'agent2' if own_key == 'agent1' else 'agent1'
+    stable = f"Previous question: {context['original_question']}\n"
+    stable += f"Your previous response: {context['original_responses'].get(own_key, '')}\n"
+    stable += f"Other agent's response: {context['original_responses'].get(other_key, '')}\n\n"
+    return Prompt.layout(stable, f"Follow-up question: {question}" + _best_practices_text(best_practices))
+
+
+def build_history_prompt(history: Sequence[str], question: str, best_practices: Optional[Sequence[str]] = None) -> Prompt:
+    """Prompt for a question in a conversation: the kept history first, then the question and best practices
+
+    ``history`` is the rendered history in parts, one per turn. Each part is
+    its own block and the breakpoint follows the last, so Anthropic also
+    finds the prefix cached on the previous turn at the earlier boundary.
+    """
+    blocks = [(part, index == len(history) - 1) for index, part in enumerate(history)]
+    return Prompt(blocks + [(f"\nCurrent question: {question}" + _best_practices_text(best_practices), False)])
+
+
+def build_criteria_text(assessment_criteria: Optional[Sequence[str]]) -> str:
+    """The assessment instructions, from optional user criteria"""
+    if assessment_criteria:
+        return "Focus your assessment on these specific aspects:\n" + "\n".join(f"- {criteria}" for criteria in assessment_criteria)
+    return "Assess its accuracy and completeness. Suggest improvements or revisions if needed."
+
+
+def build_assessment_prompt(question: str, answer: str, criteria: str) -> Prompt:
+    """Prompt asking one agent to assess another's answer
+
+    The question and answer come first and the criteria last, so assessing
+    the same answer again under other criteria reuses the cached prefix.
+    """
+    return Prompt.layout(ASSESSMENT_PROMPT_TEMPLATE.format(question=question, answer=answer), criteria)
@@ -0,0 +1,174 @@
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Mapping, Optional
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at ``rate`` tokens per second
+
+    Callers reserve tokens up front and may drive the bucket into debt; the
+    returned wait tells them how long to sleep before their reservation is
+    covered. This keeps callers in FIFO order without a condition variable.
+    """
+
+    def __init__(self, capacity: float, rate: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float) -> float:
+        """Take ``amount`` tokens, returning the seconds to wait before using them"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens -= amount
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def refund(self, amount: float):
+        """Give back tokens from a reservation that was not used"""
+        with self._lock:
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class ProviderRateLimiter:
+    """Requests-per-minute and tokens-per-minute limits for each provider
+
+    Limits come from ``<PROVIDER>_RPM`` and ``<PROVIDER>_TPM`` (0 = unlimited).
+    A 429 from a provider pauses every caller of that provider until its
+    ``Retry-After`` has passed.
+    """
+
+    def __init__(self, providers=('openai', 'anthropic', 'together'), limits: Optional[Dict[str, Dict[str, float]]] = None):
+        self.request_buckets = {}
+        self.token_buckets = {}
+        self.paused_until = {}
+        self._lock = threading.Lock()
+        limits = limits or {}
+        for provider in providers:
+            provider_limits = limits.get(provider, {})
+            rpm = float(provider_limits.get('rpm', os.getenv(f'{provider.upper()}_RPM', '0')))
+            tpm = float(provider_limits.get('tpm', os.getenv(f'{provider.upper()}_TPM', '0')))
+            if rpm > 0:
+                self.request_buckets[provider] = TokenBucket(rpm, rpm / 60.0)
+            if tpm > 0:
+                self.token_buckets[provider] = TokenBucket(tpm, tpm / 60.0)
+
+    def reserve(self, provider: str, tokens: int) -> float:
+        """Reserve one request and ``tokens`` tokens, returning the seconds to wait"""
+        wait = 0.0
+        request_bucket = self.request_buckets.get(provider)
+        if request_bucket is not None:
+            wait = max(wait, request_bucket.reserve(1))
+        token_bucket = self.token_buckets.get(provider)
+        if token_bucket is not None:
+            # A single call larger than the whole budget can never fit; cap it
+            wait = max(wait, token_bucket.reserve(min(tokens, token_bucket.capacity)))
+        with self._lock:
+            paused = self.paused_until.get(provider, 0) - time.monotonic()
+        return max(wait, paused)
+
+    def release(self, provider: str, tokens: int):
+        """Return a reservation that will not be used"""
+        request_bucket = self.request_buckets.get(provider)
+        if request_bucket is not None:
+            request_bucket.refund(1)
+        token_bucket = self.token_buckets.get(provider)
+        if token_bucket is not None:
+            token_bucket.refund(min(tokens, token_bucket.capacity))
+
+    def pause(self, provider: str, seconds: float):
+        """Hold back every call to a provider for ``seconds`` (e.g. after a 429)"""
+        with self._lock:
+            until = time.monotonic() + seconds
+            self.paused_until[provider] = max(self.paused_until.get(provider, 0), until)
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter that honors ``Retry-After``"""
+
+    def __init__(self, max_retries: Optional[int] = None, base_delay: Optional[float] = None,
+                 max_delay: Optional[float] = None):
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv('AI_MAX_RETRIES', '2'))
+        self.base_delay = base_delay if base_delay is not None else float(os.getenv('AI_RETRY_BASE_DELAY', '0.5'))
+        self.max_delay = max_delay if max_delay is not None else float(os.getenv('AI_RETRY_MAX_DELAY', '8'))
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Seconds to sleep before retry number ``attempt`` (starting at 1)"""
+        if retry_after is not None:
+            return retry_after
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+
+
+class RetryBudget:
+    """Caps retries to a fraction of recent traffic
+
+    Every first attempt deposits ``ratio`` tokens and every retry withdraws
+    one, plus a small steady allowance so low-traffic periods can still
+    retry. When providers are overloaded and most calls fail, retries stop
+    at roughly ``ratio`` extra load instead of multiplying it.
+    """
+
+    def __init__(self, ratio: Optional[float] = None, min_per_second: float = 0.5, max_tokens: float = 100):
+        self.ratio = ratio if ratio is not None else float(os.getenv('AI_RETRY_BUDGET_RATIO', '0.2'))
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens * self.ratio
+        self.updated = time.monotonic()
+        self.retries = 0
+        self.denied = 0
+        self._lock = threading.Lock()
+
+    def record_request(self):
+        """Account for a first attempt"""
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def try_retry(self) -> bool:
+        """Spend one retry from the budget, returning False when it is exhausted"""
+        with self._lock:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                self.retries += 1
+                return True
+            self.denied += 1
+            return False
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.max_tokens, self.tokens + (now - self.updated) * self.min_per_second)
+        self.updated = now
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'retries': self.retries, 'denied': self.denied, 'available': round(self.tokens, 2)}
+
+
+def parse_retry_after(headers: Mapping[str, str]) -> Optional[float]:
+    """Read the server-requested delay from ``retry-after-ms`` or ``Retry-After``"""
+    value = headers.get('retry-after-ms')
+    if value:
+        try:
+            return max(0.0, float(value) / 1000.0)
+        except ValueError:
+            pass
+
+    value = headers.get('retry-after')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
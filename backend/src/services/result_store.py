@@ -0,0 +1,50 @@
+import os
+import uuid
+from typing import Any, Dict, Optional
+from src.services.completion_cache import LRUTTLCache
+
+class ComparisonStore:
+    """Recent comparison results, referenced by ``comparison_id``
+
+    Lets clients ask for follow-up work on a comparison (such as an
+    assessment) by id instead of uploading both responses again. Bounded to
+    COMPARISON_STORE_MAX_ENTRIES, least recently used first, and entries
+    expire COMPARISON_STORE_TTL seconds after they were stored.
+    """
+
+    def __init__(self, maxsize: Optional[int] = None, ttl: Optional[float] = None):
+        maxsize = maxsize or int(os.getenv('COMPARISON_STORE_MAX_ENTRIES', '1000'))
+        ttl = ttl or float(os.getenv('COMPARISON_STORE_TTL', '3600'))
+        self.results = LRUTTLCache(maxsize, ttl)
+
+    @staticmethod
+    def new_id() -> str:
+        return uuid.uuid4().hex
+
+    def save(self, comparison_id: str, question: str, agent1_id: str, agent2_id: str,
+             agent1_response: Optional[str], agent2_response: Optional[str]):
+        """Store the outcome of a comparison under ``comparison_id``"""
+        self.results.set(comparison_id, {
+            'comparison_id': comparison_id,
+            'question': question,
+            'agent1_id': agent1_id,
+            'agent2_id': agent2_id,
+            'agent1_response': agent1_response,
+            'agent2_response': agent2_response
+        })
+
+    def save_multi(self, comparison_id: str, question: str, responses: Dict[str, Optional[str]]):
+        """Store the outcome of an N-way comparison: each agent id's response, in order"""
+        self.results.set(comparison_id, {
+            'comparison_id': comparison_id,
+            'question': question,
+            'agent_ids': list(responses),
+            'responses': dict(responses)
+        })
+
+    def get(self, comparison_id: str) -> Optional[Dict[str, Any]]:
+        """A stored comparison, or None when unknown or expired"""
+        return self.results.get(comparison_id)
+
+    def __len__(self) -> int:
+        return len(self.results)
@@ -0,0 +1,92 @@
+import os
+import threading
+from collections import deque
+from concurrent.futures import Executor, Future
+from typing import Any, Callable, Dict, Optional
+
+PROVIDERS = ('openai', 'anthropic', 'together')
+
+
+class ProviderScheduler:
+    """Run jobs on an executor with a concurrency cap per provider
+
+    Jobs over a provider's cap wait in a FIFO queue instead of occupying a
+    worker thread; each finishing job starts the next queued job for the
+    same provider. Queued jobs can be cancelled by group (e.g. a batch id).
+    """
+
+    def __init__(self, executor: Executor, limits: Optional[Dict[str, int]] = None, default_limit: int = 4):
+        self.executor = executor
+        self.default_limit = default_limit
+        # Caps come from <PROVIDER>_MAX_CONCURRENCY unless given explicitly
+        self.limits = {
+            provider: int(os.getenv(f'{provider.upper()}_MAX_CONCURRENCY', str(default_limit)))
+            for provider in PROVIDERS
+        }
+        self.limits.update(limits or {})
+        self._lock = threading.Lock()
+        self._running = {}
+        self._queues = {}
+
+    def submit(self, provider: str, fn: Callable[..., Any], *args, group: Optional[str] = None, **kwargs) -> Future:
+        """Schedule ``fn(*args, **kwargs)`` under ``provider``'s concurrency cap"""
+        future = Future()
+        job = (future, fn, args, kwargs, group)
+        with self._lock:
+            running = self._running.get(provider, 0)
+            if running < self.limits.get(provider, self.default_limit):
+                self._running[provider] = running + 1
+            else:
+                self._queues.setdefault(provider, deque()).append(job)
+                return future
+        self._start(provider, job)
+        return future
+
+    def cancel_group(self, group: str) -> int:
+        """Cancel every queued (not yet running) job of a group"""
+        cancelled = 0
+        with self._lock:
+            for queue in self._queues.values():
+                for job in [job for job in queue if job[4] == group]:
+                    queue.remove(job)
+                    job[0].cancel()
+                    cancelled += 1
+        return cancelled
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Running and queued job counts with the cap for each provider"""
+        with self._lock:
+            providers = set(self.limits) | set(self._running) | set(self._queues)
+            return {
+                provider: {
+                    'running': self._running.get(provider, 0),
+                    'queued': len(self._queues.get(provider, ())),
+                    'limit': self.limits.get(provider, self.default_limit)
+                }
+                for provider in sorted(providers)
+            }
+
+    def _start(self, provider: str, job):
+        self.executor.submit(self._run, provider, job)
+
+    def _run(self, provider: str, job):
+        future, fn, args, kwargs, _ = job
+        try:
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(fn(*args, **kwargs))
+                except BaseException as e:
+                    future.set_exception(e)
+        finally:
+            self._release(provider)
+
+    def _release(self, provider: str):
+        """Hand the finished job's slot to the next queued job, if any"""
+        with self._lock:
+            queue = self._queues.get(provider)
+            if queue:
+                job = queue.popleft()
+            else:
+                self._running[provider] -= 1
+                return
+        self._start(provider, job)
@@ -0,0 +1,153 @@
+import os
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+from src.services.completion_cache import LRUTTLCache
+from src.services.prompts import Prompt, build_compare_prompt, build_history_prompt
+from src.services.tokens import estimate_tokens, truncate_tokens
+
+# Size of a turn once it has been compacted to a digest
+DIGEST_QUESTION_TOKENS = 60
+DIGEST_RESPONSE_TOKENS = 80
+
+# Tokens taken by the Q/response labels of one rendered turn
+TURN_OVERHEAD_TOKENS = 16
+
+
+class ConversationSession:
+    """History of one two-agent conversation, kept server-side
+
+    Each turn keeps its full text until the history outgrows ``budget``
+    tokens; the oldest turns are then compacted once into short digests, and
+    digests that still do not fit are dropped and only counted in
+    ``omitted``. Compaction runs as each turn is added, so the history sent
+    with the next question stays bounded however long the conversation gets.
+    """
+
+    def __init__(self, session_id: str, agent1_id: str, agent2_id: str, budget: int):
+        self.id = session_id
+        self.agent1_id = agent1_id
+        self.agent2_id = agent2_id
+        self.budget = budget
+        self.turns = []
+        self.omitted = 0
+        self.turn_count = 0
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+        self._lock = threading.Lock()
+
+    def add_turn(self, question: str, agent1_response: Optional[str], agent2_response: Optional[str]):
+        """Append a finished exchange and compact older turns to fit the budget"""
+        turn = {
+            'question': question,
+            'agent1_response': agent1_response or '',
+            'agent2_response': agent2_response or '',
+            'compacted': False
+        }
+        turn['tokens'] = self._turn_tokens(turn)
+        with self._lock:
+            self.turns.append(turn)
+            self.turn_count += 1
+            self.updated_at = time.time()
+            self._compact()
+
+    def _compact(self):
+        """Digest the oldest full turns, then drop the oldest digests, until the history fits"""
+        total = sum(turn['tokens'] for turn in self.turns)
+        for index, turn in enumerate(self.turns[:-1]):
+            if total <= self.budget:
+                return
+            if not turn['compacted']:
+                digest = self._digest(turn, DIGEST_RESPONSE_TOKENS)
+                total -= turn['tokens'] - digest['tokens']
+                self.turns[index] = digest
+        while total > self.budget and len(self.turns) > 1:
+            total -= self.turns.pop(0)['tokens']
+            self.omitted += 1
+        if total > self.budget:
+            # The newest turn alone is over budget: keep as much of both answers as fits
+            question_tokens = min(estimate_tokens(self.turns[0]['question']), DIGEST_QUESTION_TOKENS)
+            share = max(DIGEST_RESPONSE_TOKENS, (self.budget - question_tokens - TURN_OVERHEAD_TOKENS) // 2)
+            self.turns[0] = self._digest(self.turns[0], share)
+
+    @classmethod
+    def _digest(cls, turn: Dict[str, Any], response_tokens: int) -> Dict[str, Any]:
+        digest = {
+            'question': truncate_tokens(turn['question'], DIGEST_QUESTION_TOKENS),
+            'agent1_response': truncate_tokens(turn['agent1_response'], response_tokens),
+            'agent2_response': truncate_tokens(turn['agent2_response'], response_tokens),
+            'compacted': True
+        }
+        digest['tokens'] = cls._turn_tokens(digest)
+        return digest
+
+    @staticmethod
+    def _turn_tokens(turn: Dict[str, Any]) -> int:
+        return (estimate_tokens(turn['question']) + estimate_tokens(turn['agent1_response'])
+                + estimate_tokens(turn['agent2_response']) + TURN_OVERHEAD_TOKENS)
+
+    def history_prompt(self, agent_key: str, question: str, best_practices: Optional[List[str]] = None) -> Prompt:
+        """Prompt for ``agent_key`` ('agent1' or 'agent2'): the kept history from its point of view, then the question
+
+        The history is rendered identically until the next compaction, so it
+        forms a prefix providers can cache from one turn to the next.
+        """
+        own, other = ('agent1_response', 'agent2_response') if agent_key == 'agent1' else ('agent2_response', 'agent1_response')
+        with self._lock:
+            if not self.turns:
+                return build_compare_prompt(question, best_practices)
+            history = ["Conversation history:\n"]
+            if self.omitted:
+                history[0] += f"\n({self.omitted} earlier exchanges omitted)\n"
+            for number, turn in enumerate(self.turns, start=self.omitted + 1):
+                history.append(f"\nQ{number}: {turn['question']}\n"
+                               f"Your previous response: {turn[own]}\n"
+                               f"Other agent's response: {turn[other]}\n")
+        return build_history_prompt(history, question, best_practices)
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'session_id': self.id,
+                'agent1_id': self.agent1_id,
+                'agent2_id': self.agent2_id,
+                'turn_count': self.turn_count,
+                'omitted': self.omitted,
+                'history_tokens': sum(turn['tokens'] for turn in self.turns),
+                'budget': self.budget,
+                'turns': [{key: value for key, value in turn.items() if key != 'tokens'} for turn in self.turns],
+                'created_at': self.created_at,
+                'updated_at': self.updated_at
+            }
+
+
+class SessionStore:
+    """In-memory conversation sessions, evicted least recently used or SESSION_TTL seconds after last use"""
+
+    def __init__(self, maxsize: Optional[int] = None, ttl: Optional[float] = None):
+        maxsize = maxsize or int(os.getenv('SESSION_MAX_ENTRIES', '1000'))
+        ttl = ttl or float(os.getenv('SESSION_TTL', '3600'))
+        self.sessions = LRUTTLCache(maxsize, ttl)
+
+    def create(self, agent1_id: str, agent2_id: str, budget: int,
+               history: Optional[List[Dict[str, Any]]] = None) -> ConversationSession:
+        """Start a session, optionally seeded with client-side ``conversation_history``"""
+        session = ConversationSession(uuid.uuid4().hex, agent1_id, agent2_id, budget)
+        for exchange in history or []:
+            session.add_turn(exchange.get('question', ''), exchange.get('agent1_response'), exchange.get('agent2_response'))
+        self.sessions.set(session.id, session)
+        return session
+
+    def get(self, session_id: str) -> Optional[ConversationSession]:
+        return self.sessions.get(session_id)
+
+    def save(self, session: ConversationSession):
+        """Refresh a session's expiry after it was used"""
+        self.sessions.set(session.id, session)
+
+    def delete(self, session_id: str):
+        self.sessions.delete(session_id)
+
+    def __len__(self) -> int:
+        return len(self.sessions)
@@ -0,0 +1,137 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Any, Awaitable, Callable, Dict, Optional
+from src.services.errors import CallTimeout
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key into one execution
+
+    The first caller for a key (the leader) runs the work; callers arriving
+    while it is in flight wait for the leader and receive the same result or
+    exception. Sync callers share a thread-safe future, async callers share
+    a task on their event loop. Each caller is counted as leader or follower
+    in ``metrics`` (an AIMetrics) when given.
+    """
+
+    def __init__(self, metrics=None):
+        self.metrics = metrics
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._tasks = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    def do(self, key: str, fn: Callable[[Optional[float]], Any], timeout: Optional[float] = None) -> Any:
+        """Run ``fn`` once for all concurrent callers with the same key
+
+        ``fn`` is called with the leader's remaining timeout and is expected
+        to apply it. Waiters give up after their own ``timeout`` seconds. When
+        the leader runs out of time, waiters with budget left start a fresh
+        call instead of inheriting its CallTimeout.
+        """
+        started = time.monotonic()
+        remaining = timeout
+        while True:
+            with self._lock:
+                future = self._calls.get(key)
+                leader = future is None or future.done()
+                if leader:
+                    future = Future()
+                    self._calls[key] = future
+                    self.executions += 1
+                else:
+                    self.coalesced += 1
+            self._record(leader)
+
+            if not leader:
+                try:
+                    return future.result(remaining)
+                except FutureTimeoutError:
+                    raise CallTimeout(timeout)
+                except CallTimeout:
+                    remaining = self._remaining(started, timeout)
+                    if remaining == 0:
+                        raise CallTimeout(timeout)
+                    continue
+
+            try:
+                result = fn(remaining)
+            except BaseException as e:
+                future.set_exception(e)
+                raise
+            else:
+                future.set_result(result)
+                return result
+            finally:
+                with self._lock:
+                    if self._calls.get(key) is future:
+                        del self._calls[key]
+
+    async def do_async(self, key: str, factory: Callable[[Optional[float]], Awaitable[Any]],
+                       timeout: Optional[float] = None) -> Any:
+        """Await ``factory(remaining)`` once for all concurrent callers with the same key
+
+        Like ``do``, waiters give up after ``timeout`` seconds while the shared
+        task carries on for the others, and retry when the leader times out.
+        """
+        loop = asyncio.get_running_loop()
+        task_key = (id(loop), key)
+        started = time.monotonic()
+        remaining = timeout
+        while True:
+            with self._lock:
+                task = self._tasks.get(task_key)
+                leader = task is None or task.done()
+                if leader:
+                    task = asyncio.ensure_future(factory(remaining))
+                    self._tasks[task_key] = task
+                    task.add_done_callback(lambda done: self._forget_task(task_key, done))
+                    self.executions += 1
+                else:
+                    self.coalesced += 1
+            self._record(leader)
+
+            # Shield the shared task so one cancelled or timed-out waiter does not cancel the rest
+            try:
+                try:
+                    return await asyncio.wait_for(asyncio.shield(task), remaining)
+                except asyncio.TimeoutError:
+                    if not task.done():
+                        raise CallTimeout(timeout) from None
+                    # The task finished just as the wait ran out
+                    return task.result()
+            except CallTimeout:
+                if leader or not task.done():
+                    raise
+                remaining = self._remaining(started, timeout)
+                if remaining == 0:
+                    raise CallTimeout(timeout)
+
+    @staticmethod
+    def _remaining(started: float, timeout: Optional[float]) -> Optional[float]:
+        """What is left of a caller's timeout (None for no limit, 0 when spent)"""
+        if timeout is None:
+            return None
+        return max(0.0, round(timeout - (time.monotonic() - started), 3))
+
+    def _record(self, leader: bool):
+        if self.metrics is not None:
+            self.metrics.record_singleflight('leader' if leader else 'follower')
+
+    def _forget_task(self, task_key, task):
+        with self._lock:
+            if self._tasks.get(task_key) is task:
+                del self._tasks[task_key]
+
+    def stats(self) -> Dict[str, Any]:
+        """Upstream executions, coalesced callers and the coalesce rate"""
+        with self._lock:
+            callers = self.executions + self.coalesced
+            return {
+                'executions': self.executions,
+                'coalesced': self.coalesced,
+                'in_flight': len(self._calls) + len(self._tasks),
+                'coalesce_rate': round(self.coalesced / callers, 4) if callers else 0.0
+            }
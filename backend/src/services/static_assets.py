@@ -0,0 +1,117 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+from typing import Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional; precompressed .br files are still served
+    brotli = None
+
+# Vite emits content-hashed bundles such as assets/index-BxK3a9Qz.js
+HASHED_ASSET = re.compile(r'(^|/)assets/.+[-.][A-Za-z0-9_-]{8,}\.[A-Za-z0-9]+$')
+
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'image/svg+xml',
+                      'application/xml', 'application/manifest+json', 'font/ttf', 'font/otf')
+
+# Content-Encoding -> file suffix of its precompressed variant, in order of preference
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'no-cache'
+
+
+class StaticAsset:
+    """One file of the static folder, held in memory with its compressed variants"""
+
+    def __init__(self, path: str, body: bytes, mimetype: str, cache_control: str):
+        self.path = path
+        self.body = body
+        self.mimetype = mimetype
+        self.cache_control = cache_control
+        self.etag = hashlib.sha1(body).hexdigest()
+        # Content-Encoding -> (body, etag); each encoding is a different representation
+        self.variants = {}
+
+    def add_variant(self, encoding: str, body: bytes):
+        if len(body) < len(self.body):
+            self.variants[encoding] = (body, f'{self.etag}-{encoding}')
+
+    def select(self, accept_encodings) -> Tuple[bytes, str, Optional[str]]:
+        """Body, ETag and Content-Encoding (or None) best matching the client's Accept-Encoding"""
+        for encoding, _ in ENCODINGS:
+            if encoding in self.variants and accept_encodings[encoding]:
+                body, etag = self.variants[encoding]
+                return body, etag, encoding
+        return self.body, self.etag, None
+
+
+class StaticManifest:
+    """Startup-built index of the static folder
+
+    Every file is read, hashed and (for text formats) compressed once, so
+    requests never touch the filesystem. Precompressed ``.br``/``.gz`` files
+    produced by the build are used when present; otherwise gzip (and brotli,
+    when installed) variants are built in memory. Files larger than
+    STATIC_MAX_FILE_BYTES are left out and served from disk. Rebuilding the
+    frontend requires a restart to be picked up.
+    """
+
+    def __init__(self, folder: Optional[str], max_file_bytes: Optional[int] = None,
+                 asset_max_age: Optional[int] = None):
+        self.folder = folder
+        self.max_file_bytes = max_file_bytes or int(os.getenv('STATIC_MAX_FILE_BYTES', str(5 * 1024 * 1024)))
+        max_age = asset_max_age if asset_max_age is not None else int(os.getenv('STATIC_MAX_AGE', '3600'))
+        self.default_cache_control = f'public, max-age={max_age}'
+        self.assets = {}
+        self.large_files = set()
+        if folder and os.path.isdir(folder):
+            self._scan()
+        self.index = self.assets.get('index.html')
+
+    def _scan(self):
+        names = {}
+        for root, _, files in os.walk(self.folder):
+            for name in files:
+                full_path = os.path.join(root, name)
+                names[os.path.relpath(full_path, self.folder).replace(os.sep, '/')] = full_path
+
+        for path, full_path in names.items():
+            if path.endswith(('.br', '.gz')) and path[:-3] in names:
+                continue  # precompressed variant of another file
+            if os.path.getsize(full_path) > self.max_file_bytes:
+                self.large_files.add(path)
+                continue
+            with open(full_path, 'rb') as f:
+                body = f.read()
+            asset = StaticAsset(path, body, self._mimetype(path), self.cache_control(path))
+            for encoding, suffix in ENCODINGS:
+                if path + suffix in names:
+                    with open(names[path + suffix], 'rb') as f:
+                        asset.add_variant(encoding, f.read())
+            if asset.mimetype.startswith(COMPRESSIBLE_TYPES):
+                if 'gzip' not in asset.variants:
+                    asset.add_variant('gzip', gzip.compress(body, compresslevel=9, mtime=0))
+                if 'br' not in asset.variants and brotli is not None:
+                    asset.add_variant('br', brotli.compress(body))
+            self.assets[path] = asset
+
+    @staticmethod
+    def _mimetype(path: str) -> str:
+        mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        if mimetype.startswith('text/') or mimetype in ('application/javascript', 'application/json'):
+            mimetype += '; charset=utf-8'
+        return mimetype
+
+    def cache_control(self, path: str) -> str:
+        """Cache-Control for a file: hashed bundles never change, HTML is always revalidated"""
+        if HASHED_ASSET.search(path):
+            return IMMUTABLE
+        if path.endswith('.html'):
+            return REVALIDATE
+        return self.default_cache_control
+
+    def get(self, path: str) -> Optional[StaticAsset]:
+        return self.assets.get(path)
@@ -0,0 +1,71 @@
+import json
+import os
+
+import pytest
+
+from src.services.agent_registry import AgentRegistry
+
+
+def agent(agent_id, provider='openai', enabled=True, tier='free'):
+    return {'id': agent_id, 'name': agent_id.upper(), 'provider': provider, 'model': f'{agent_id}-model',
+            'domains': ['Code'], 'tags': ['Python'], 'tier': tier, 'enabled': enabled}
+
+
+def write_config(path, agents, mtime=None):
+    path.write_text(json.dumps({'agents': agents}))
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+
+
+@pytest.fixture
+def config(tmp_path):
+    path = tmp_path / 'agents.json'
+    write_config(path, [agent('a'), agent('b', provider='anthropic', enabled=False, tier='premium')], mtime=1000)
+    return path
+
+
+def test_lookups_are_indexed(config):
+    registry = AgentRegistry(str(config), reload_interval=0)
+    assert registry.get('a')['model'] == 'a-model' and registry.get('missing') is None
+    assert [a['id'] for a in registry.enabled()] == ['a']
+    assert [a['id'] for a in registry.by_provider('anthropic')] == ['b']
+    assert [a['id'] for a in registry.by_domain('Code')] == ['a', 'b']
+    assert [a['id'] for a in registry.by_tier('premium')] == ['b']
+
+
+def test_changed_file_is_reloaded_in_place(config):
+    registry = AgentRegistry(str(config), reload_interval=0)
+    write_config(config, [agent('a'), agent('b', provider='anthropic')], mtime=2000)
+    assert registry.get('b')['enabled'] is True
+    assert registry.version == 2
+
+
+def test_reload_checks_are_rate_limited(config):
+    registry = AgentRegistry(str(config), reload_interval=3600)
+    write_config(config, [agent('c')], mtime=2000)
+    assert registry.get('c') is None
+    registry.reload()
+    assert registry.get('c') is not None
+
+
+@pytest.mark.parametrize('content', ['{"agents": [', json.dumps({'agents': [{'id': 'x'}]}),
+                                     json.dumps({'agents': [agent('a'), agent('a')]})])
+def test_broken_config_keeps_the_previous_agents(config, content):
+    registry = AgentRegistry(str(config), reload_interval=0)
+    config.write_text(content)
+    os.utime(config, (2000, 2000))
+    assert registry.get('a') is not None and registry.version == 1
+
+
+def test_agents_endpoint_sends_an_etag_and_honours_it(client, config, monkeypatch):
+    monkeypatch.setenv('AGENTS_CONFIG', str(config))
+    monkeypatch.setenv('AGENTS_RELOAD_INTERVAL', '0')
+    response = client.get('/api/agents')
+    assert response.status_code == 200 and response.get_json()['enabled'] == 1
+    etag = response.headers['ETag']
+    assert client.get('/api/agents', headers={'If-None-Match': etag}).status_code == 304
+
+    write_config(config, [agent('a'), agent('b', provider='anthropic')], mtime=2000)
+    response = client.get('/api/agents', headers={'If-None-Match': etag})
+    assert response.status_code == 200 and response.headers['ETag'] != etag
+    assert response.get_json()['enabled'] == 2
@@ -0,0 +1,161 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.routes.api import get_ai_service
+from src.services.ai_service import AIService
+from src.services.deadline import Deadline
+from src.services.http_timing import connect_timer
+
+
+@pytest.fixture
+def service(app):
+    service = AIService()
+    yield service
+    service.close()
+
+
+def call(model, **fields):
+    return dict({'provider': 'openai', 'model': model, 'prompt': f'ask {model}'}, **fields)
+
+
+def test_dependent_call_gets_its_upstream_answer(service, provider):
+    results = service.run_concurrent({
+        'answer': call('gpt-4'),
+        'review': call('gpt-3.5-turbo', depends_on='answer', prompt=lambda answer: f'review: {answer}')
+    })
+    assert results['review']['response'] == 'gpt-3.5-turbo answer'
+    assert ('gpt-3.5-turbo', 'review: gpt-4 answer') in provider['calls']
+
+
+def test_dependent_call_starts_when_its_own_upstream_finishes(service, provider, monkeypatch):
+    started = {}
+    call_provider = AIService._call_provider
+
+    def timed(self, provider_name, model, prompt, timeout):
+        started[prompt] = time.monotonic()
+        if prompt == 'ask slow':
+            time.sleep(0.4)
+        return call_provider(self, provider_name, model, prompt, timeout)
+    monkeypatch.setattr(AIService, '_call_provider', timed)
+
+    begun = time.monotonic()
+    results = service.run_concurrent({
+        'fast': call('fast'),
+        'slow': call('slow'),
+        'fast_review': call('review', depends_on='fast', prompt=lambda answer: 'review fast')
+    })
+    assert all(result['error'] is None for result in results.values())
+    # The review of the fast answer does not wait for the slow one
+    assert started['review fast'] - begun < 0.3
+
+
+def test_failed_upstream_skips_dependents_only(service, provider):
+    provider['failing'].add('gpt-4')
+    results = service.run_concurrent({
+        'answer': call('gpt-4'),
+        'review': call('gpt-3.5-turbo', depends_on='answer', prompt=lambda answer: answer),
+        'other': call('gpt-3.5-turbo')
+    })
+    assert results['review']['error'] == 'Skipped because answer failed'
+    assert results['other']['response'] == 'gpt-3.5-turbo answer'
+    assert [model for model, _ in provider['calls']].count('gpt-3.5-turbo') == 1
+
+
+@pytest.mark.parametrize('calls, message', [
+    ({'a': call('gpt-4', depends_on='missing')}, 'unknown call missing'),
+    ({'a': call('gpt-4', depends_on='b'), 'b': call('gpt-4', depends_on='a')}, 'Circular dependency')
+])
+def test_invalid_dependencies_are_rejected(service, provider, calls, message):
+    with pytest.raises(ValueError, match=message):
+        service.run_concurrent(calls)
+    assert provider['calls'] == []
+
+
+def test_request_deadline_caps_every_call(service, provider, monkeypatch):
+    timeouts = {}
+    call_provider = AIService._call_provider
+
+    def recording(self, provider_name, model, prompt, timeout):
+        timeouts[model] = timeout
+        return call_provider(self, provider_name, model, prompt, timeout)
+    monkeypatch.setattr(AIService, '_call_provider', recording)
+    provider['delay'] = 0.2
+
+    results = service.run_concurrent({
+        'answer': call('gpt-4'),
+        'review': call('gpt-3.5-turbo', depends_on='answer', prompt=lambda answer: answer)
+    }, timeout=20, deadline=Deadline(1))
+    assert all(result['error'] is None for result in results.values())
+    assert timeouts['gpt-4'] <= 1
+    # The dependent call only gets what its upstream left over
+    assert timeouts['gpt-3.5-turbo'] <= 0.8
+
+
+def test_calls_past_the_deadline_time_out_and_later_ones_never_start(service, provider):
+    provider['delay'] = 0.5
+    started = time.monotonic()
+    results = service.run_concurrent({
+        'answer': call('gpt-4'),
+        'review': call('gpt-3.5-turbo', depends_on='answer', prompt=lambda answer: answer)
+    }, deadline=Deadline(0.2))
+    assert time.monotonic() - started < 0.45
+    assert results['answer']['timed_out'] and 'timed out' in results['answer']['error']
+    # Its upstream never finished, so the review is skipped rather than started late
+    assert results['review']['error'] == 'Skipped because answer failed'
+    assert [model for model, _ in provider['calls']] == ['gpt-4']
+
+
+def test_one_service_serves_every_request_thread(app):
+    services = []
+
+    def lookup():
+        with app.app_context():
+            services.append(get_ai_service())
+    threads = [threading.Thread(target=lookup) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len({id(service) for service in services}) == 1
+    assert app.extensions['ai_service'] is services[0]
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Length', '2')
+        self.send_header('Set-Cookie', 'session=1')
+        self.end_headers()
+        self.wfile.write(b'ok')
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), KeepAliveHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{server.server_address[1]}/'
+    server.shutdown()
+
+
+def test_provider_sessions_reuse_connections_and_drop_cookies(app, server):
+    service = AIService(pool_connections=2, pool_maxsize=5)
+    try:
+        session = service.sessions['openai']
+        adapter = session.get_adapter(server)
+        assert (adapter._pool_connections, adapter._pool_maxsize, adapter.max_retries.total) == (2, 5, 0)
+        connect_timer.reset()
+        for _ in range(3):
+            assert session.get(server).text == 'ok'
+        assert connect_timer.connections == 1
+        # The session is shared by every thread, so it must not carry one response's cookies into the next request
+        assert len(session.cookies) == 0
+    finally:
+        service.close()
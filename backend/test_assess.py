@@ -0,0 +1,173 @@
+import time
+
+import pytest
+
+from src.routes.api import get_comparison_store
+from src.services.local_assessment import summary_text
+
+QUESTION = 'How many bits are in a byte?'
+RESPONSES = {
+    'agent1_response': 'A byte has 8 bits on every modern machine.',
+    'agent2_response': 'There are 8 bits in a byte.'
+}
+
+
+@pytest.fixture(autouse=True)
+def default_threshold(monkeypatch):
+    monkeypatch.delenv('ASSESS_DISAGREEMENT_THRESHOLD', raising=False)
+
+
+def assess(client, **data):
+    response = client.post('/api/assess', json=data)
+    return response.status_code, response.get_json()
+
+
+def test_local_mode_scores_without_provider_calls(client):
+    status, body = assess(client, agent1_id='gpt-3.5', agent2_id='gpt-4', question=QUESTION, mode='local', **RESPONSES)
+    assert status == 200
+    assert body['mode'] == 'local' and body['escalated'] is False
+    assert 0 <= body['local']['agreement'] <= 1
+    assert body['usage']['total']['input_tokens'] == 0
+
+
+@pytest.mark.parametrize('threshold', ['abc', '', [0.5], 'nan', True])
+@pytest.mark.parametrize('mode', ['local', 'auto', 'llm'])
+def test_invalid_disagreement_threshold_is_rejected(client, mode, threshold):
+    status, body = assess(client, agent1_id='gpt-3.5', agent2_id='gpt-4', question=QUESTION, mode=mode,
+                          disagreement_threshold=threshold, **RESPONSES)
+    assert status == 400
+    assert 'disagreement_threshold' in body['error']
+
+
+def test_numeric_string_threshold_is_accepted(client):
+    status, body = assess(client, agent1_id='gpt-3.5', agent2_id='gpt-4', question=QUESTION, mode='auto',
+                          disagreement_threshold='1.5', **RESPONSES)
+    assert status == 200
+    assert body['local']['threshold'] == 1.5 and body['escalated'] is False
+
+
+def test_unknown_mode_is_rejected(client):
+    status, body = assess(client, agent1_id='gpt-3.5', agent2_id='gpt-4', question=QUESTION, mode='psychic', **RESPONSES)
+    assert status == 400
+
+
+N_WAY = {
+    'agent_ids': ['gpt-3.5', 'gpt-4', 'claude-instant'],
+    'question': QUESTION,
+    'responses': {
+        'gpt-3.5': 'A byte has 8 bits.',
+        'gpt-4': 'Eight bits make one byte.',
+        'claude-instant': 'A byte is 8 bits long.'
+    }
+}
+
+
+def test_n_way_assess_runs_every_pair(client, provider):
+    status, body = assess(client, **N_WAY)
+    assert status == 200
+    assert len(body['assessments']) == 6 and len(provider['calls']) == 6
+    assert all(entry['assessor_id'] != entry['assessed_id'] for entry in body['assessments'])
+
+
+@pytest.mark.parametrize('agent_id, message', [('no-such-agent', 'not found'), ('llama-2-7b', 'not enabled')])
+def test_n_way_assess_rejects_unavailable_agents(client, provider, agent_id, message):
+    responses = dict(N_WAY['responses'], **{agent_id: 'A byte has 8 bits.'})
+    status, body = assess(client, **dict(N_WAY, agent_ids=N_WAY['agent_ids'] + [agent_id], responses=responses))
+    assert status == 400
+    assert agent_id in body['error'] and message in body['error']
+    assert provider['calls'] == []
+
+
+def test_n_way_local_assess_only_needs_known_agents(client, provider):
+    responses = dict(N_WAY['responses'], **{'llama-2-7b': 'Eight.'})
+    data = dict(N_WAY, agent_ids=N_WAY['agent_ids'] + ['llama-2-7b'], responses=responses, mode='local')
+    status, body = assess(client, **data)
+    assert status == 200 and len(body['local']['pairs']) == 6 and provider['calls'] == []
+    status, body = assess(client, **dict(data, agent_ids=N_WAY['agent_ids'] + ['no-such-agent'],
+                                         responses=dict(N_WAY['responses'], **{'no-such-agent': 'Eight.'})))
+    assert status == 400 and 'no-such-agent' in body['error']
+
+
+def test_stored_n_way_comparison_is_revalidated(client, provider):
+    with client.application.app_context():
+        store = get_comparison_store()
+        comparison_id = store.new_id()
+        store.save_multi(comparison_id, QUESTION, dict(N_WAY['responses'], **{'llama-2-7b': 'Eight.'}))
+    status, body = assess(client, comparison_id=comparison_id)
+    assert status == 400 and 'llama-2-7b' in body['error']
+    assert provider['calls'] == []
+
+
+@pytest.mark.parametrize('data, field', [
+    ({'judge_id': 'no-such-agent', 'assessment_mode': 'judge'}, 'no-such-agent'),
+    ({'judge_id': ['gpt-4'], 'assessment_mode': 'judge'}, 'judge_id'),
+    ({'assessment_mode': 'tournament'}, 'assessment_mode'),
+    ({'mode': 'psychic'}, 'mode'),
+    ({'mode': 'auto', 'disagreement_threshold': 'abc'}, 'disagreement_threshold'),
+    ({'agent_ids': ['gpt-3.5']}, 'agent_ids'),
+    ({'agent_ids': ['gpt-3.5', 'gpt-3.5']}, 'agent_ids'),
+    ({'responses': {'gpt-3.5': 'Eight.'}}, 'responses')
+])
+def test_n_way_assess_rejects_invalid_fields(client, provider, data, field):
+    status, body = assess(client, **dict(N_WAY, **data))
+    assert status == 400
+    assert field in body['error']
+    assert provider['calls'] == []
+
+
+def test_summary_follows_the_request_threshold(client):
+    agreeing = dict(RESPONSES, agent2_response='A byte has 8 bits on every modern machine!')
+    status, body = assess(client, agent1_id='gpt-3.5', agent2_id='gpt-4', question=QUESTION, mode='local', **agreeing)
+    assert status == 200 and 'broadly agree' in body['agent1_assessment_by_agent2']
+    disagreement = body['local']['disagreement']
+    # The same pair judged against a threshold it reaches is no longer reported as agreeing
+    status, body = assess(client, agent1_id='gpt-3.5', agent2_id='gpt-4', question=QUESTION, mode='local',
+                          disagreement_threshold=disagreement, **agreeing)
+    assert 'partly agree' in body['agent1_assessment_by_agent2']
+    status, body = assess(client, agent1_id='gpt-3.5', agent2_id='gpt-4', question=QUESTION, mode='local',
+                          disagreement_threshold=disagreement - 0.3, **agreeing)
+    assert 'differ substantially' in body['agent1_assessment_by_agent2']
+
+
+def test_summary_text_verdicts():
+    score = {'agreement': 0.5, 'disagreement': 0.5, 'shared_terms': [], 'numeric_disagreement': None,
+             'code_alignment': None}
+    assert 'broadly agree' in summary_text(score, 0.6)
+    assert 'partly agree' in summary_text(score, 0.35)
+    assert 'differ substantially' in summary_text(score, 0.2)
+
+
+def test_cross_assessments_run_concurrently(client, provider):
+    provider['delay'] = 0.3
+    started = time.monotonic()
+    status, body = assess(client, agent1_id='gpt-3.5', agent2_id='gpt-4', question=QUESTION, mode='llm', **RESPONSES)
+    assert status == 200
+    assert body['agent1_assessment_by_agent2'] == 'gpt-4 answer'
+    assert body['agent2_assessment_by_agent1'] == 'gpt-3.5-turbo answer'
+    assert time.monotonic() - started < 0.55
+
+
+def test_assess_by_comparison_id_reuses_the_stored_answers(client, provider):
+    compared = client.post('/api/compare', json={'agent1_id': 'gpt-3.5', 'agent2_id': 'gpt-4', 'question': QUESTION})
+    comparison_id = compared.get_json()['comparison_id']
+    provider['calls'].clear()
+
+    status, body = assess(client, comparison_id=comparison_id, mode='llm')
+    assert status == 200
+    prompts = dict(provider['calls'])
+    # Each agent grades the other's stored answer
+    assert 'gpt-3.5-turbo answer' in prompts['gpt-4'] and 'gpt-4 answer' in prompts['gpt-3.5-turbo']
+    assert QUESTION in prompts['gpt-4']
+
+
+def test_unknown_comparison_id_is_a_404(client, provider):
+    status, body = assess(client, comparison_id='no-such-comparison')
+    assert status == 404 and 'not found or expired' in body['error']
+    assert provider['calls'] == []
+
+
+def test_comparison_missing_an_answer_cannot_be_assessed(client, provider):
+    provider['failing'].add('gpt-4')
+    compared = client.post('/api/compare', json={'agent1_id': 'gpt-3.5', 'agent2_id': 'gpt-4', 'question': QUESTION})
+    status, body = assess(client, comparison_id=compared.get_json()['comparison_id'])
+    assert status == 400 and 'no response from agent2' in body['error']
@@ -0,0 +1,61 @@
+import time
+
+import pytest
+
+from bench.mock_providers import LatencyModel
+from src.services.ai_service import AIService
+
+CALLS = {
+    'openai': {'provider': 'openai', 'model': 'gpt-4', 'prompt': 'one'},
+    'anthropic': {'provider': 'anthropic', 'model': 'claude-3-haiku-20240307', 'prompt': 'two'},
+    'together': {'provider': 'together', 'model': 'mistralai/Mixtral-8x7B-Instruct-v0.1', 'prompt': 'three'}
+}
+
+
+@pytest.fixture
+def service(app, mock_providers):
+    service = AIService(async_backend=True)
+    yield service
+    service.close()
+
+
+def test_calls_run_as_coroutines_against_every_provider(service, mock_providers):
+    calls = dict(CALLS, **{f'{key}_again': dict(call, prompt=call['prompt'] * 2) for key, call in CALLS.items()})
+    started = time.monotonic()
+    results = service.run_concurrent(calls)
+    # Six calls at 0.2 s each take 1.2 s back to back
+    assert time.monotonic() - started < 0.8
+    assert all(result['error'] is None and len(result['response'].split()) == 5 for result in results.values())
+    assert results['anthropic']['usage']['output_tokens'] == 5
+    assert {provider: counts['ok'] for provider, counts in mock_providers.config.snapshot().items()} == {
+        'openai': 2, 'anthropic': 2, 'together': 2}
+
+
+def test_dependent_calls_and_timeouts(service, mock_providers):
+    mock_providers.config.latency = LatencyModel('fixed', 0.5)
+    results = service.run_concurrent({
+        'answer': dict(CALLS['openai'], timeout=0.2),
+        'review': dict(CALLS['anthropic'], depends_on='answer', prompt=lambda answer: answer)
+    })
+    assert results['answer']['timed_out'] and 'timed out' in results['answer']['error']
+    assert results['review']['error'] == 'Skipped because answer failed'
+
+
+def test_async_completion_is_cached(service, mock_providers, monkeypatch):
+    monkeypatch.setenv('AI_CACHE_ENABLED', 'true')
+    cached = AIService(async_backend=True)
+    try:
+        first = cached.async_service.run(cached.get_completion_with_usage_async('openai', 'gpt-4', 'hi'))
+        second = cached.async_service.run(cached.get_completion_with_usage_async('openai', 'gpt-4', 'hi'))
+        assert first[0] == second[0]
+        assert mock_providers.config.snapshot()['openai']['ok'] == 1
+    finally:
+        cached.close()
+
+
+def test_provider_errors_surface_per_call(service, mock_providers):
+    mock_providers.config.error_rate = 1.0
+    service.retry_policy.max_retries = 0
+    results = service.run_concurrent({'openai': CALLS['openai']})
+    assert results['openai']['response'] is None
+    assert 'Internal server error (mock)' in results['openai']['error']
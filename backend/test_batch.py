@@ -0,0 +1,79 @@
+import json
+import time
+
+import pytest
+
+from src.routes.api import get_batch_store
+from src.services.batch_store import BatchStore
+
+QUESTIONS = ['What is a byte?', 'What is a bit?', 'What is a nibble?']
+AGENTS = ['gpt-3.5', 'gpt-4']
+
+
+def run(client, **data):
+    response = client.post('/api/batch', json=data)
+    assert response.status_code == 200, response.get_json()
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def results(records):
+    return {(record['question_index'], record['agent_id']): record for record in records if record['type'] == 'result'}
+
+
+def test_resume_replays_successes_and_reruns_failures(client, provider):
+    provider['failing'] = {'gpt-4'}
+    first = run(client, questions=QUESTIONS, agent_ids=AGENTS)
+    batch_id = first[0]['batch_id']
+    assert first[0]['pending'] == 6 and first[0]['resumed'] == 0
+    assert sum(1 for record in results(first).values() if record['error']) == 3
+    assert first[-1]['type'] == 'summary' and first[-1]['failed'] == 3
+
+    provider['failing'] = set()
+    provider['calls'].clear()
+    second = run(client, batch_id=batch_id)
+    assert second[0]['resumed'] == 3 and second[0]['pending'] == 3
+    # Only the failed cells reach the provider again
+    assert sorted(model for model, _ in provider['calls']) == ['gpt-4'] * 3
+    cells = results(second)
+    assert len(cells) == 6 and not any(record['error'] for record in cells.values())
+    assert all(record['resumed'] == (agent_id == 'gpt-3.5') for (_, agent_id), record in cells.items())
+    assert second[-1]['completed'] == 6 and second[-1]['failed'] == 0
+
+    provider['calls'].clear()
+    third = run(client, batch_id=batch_id)
+    assert third[0]['pending'] == 0 and provider['calls'] == []
+
+
+def test_unknown_batch_is_not_found(client, provider):
+    assert client.post('/api/batch', json={'batch_id': 'missing'}).status_code == 404
+
+
+@pytest.mark.parametrize('agent_id', ['no-such-agent', 'llama-2-7b'])
+def test_rejected_agent_leaves_no_batch_behind(client, provider, agent_id):
+    response = client.post('/api/batch', json={'questions': QUESTIONS, 'agent_ids': ['gpt-3.5', agent_id]})
+    assert response.status_code == 400 and agent_id in response.get_json()['error']
+    with client.application.app_context():
+        store = get_batch_store()
+        assert store._db.execute('SELECT COUNT(*) FROM batches').fetchone()[0] == 0
+    assert provider['calls'] == []
+
+
+def test_failed_result_callback_still_reports_the_cell(client, provider, monkeypatch):
+    def save_result(self, *args, **kwargs):
+        raise RuntimeError('disk full')
+    monkeypatch.setattr(BatchStore, 'save_result', save_result)
+    records = run(client, questions=QUESTIONS[:2], agent_ids=AGENTS, timeout=10)
+    cells = results(records)
+    assert len(cells) == 4
+    assert all('Result not saved: disk full' in record['error'] for record in cells.values())
+    assert records[-1]['type'] == 'summary'
+
+
+def test_stream_ends_at_the_deadline(client, provider):
+    provider['delay'] = 2.0
+    started = time.monotonic()
+    records = run(client, questions=QUESTIONS[:1], agent_ids=AGENTS, timeout=0.3)
+    assert time.monotonic() - started < 1.5
+    cells = results(records)
+    assert len(cells) == 2 and all(record['timed_out'] for record in cells.values())
+    assert records[-1]['deadline']['incomplete'] == 2
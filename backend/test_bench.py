@@ -0,0 +1,76 @@
+import json
+
+import pytest
+import requests
+
+from bench.load_test import compare_to_baseline, percentile
+from bench.mock_providers import LatencyModel, MockPromptCache
+
+OPENAI_BODY = {'model': 'gpt-4', 'messages': [{'role': 'user', 'content': 'How many bits are in a byte?'}]}
+
+
+def post(mock_providers, provider, body, **kwargs):
+    path = '/chat/completions' if provider != 'anthropic' else '/messages'
+    return requests.post(f'{mock_providers.url}/{provider}/v1{path}', json=body,
+                         headers={'Authorization': 'Bearer mock-key'}, timeout=5, **kwargs)
+
+
+def test_completions_use_each_providers_format(mock_providers):
+    openai = post(mock_providers, 'openai', OPENAI_BODY).json()
+    assert len(openai['choices'][0]['message']['content'].split()) == 5
+    assert openai['usage']['completion_tokens'] == 5
+    anthropic = post(mock_providers, 'anthropic', dict(OPENAI_BODY, model='claude-3-haiku-20240307')).json()
+    assert anthropic['content'][0]['type'] == 'text' and anthropic['usage']['output_tokens'] == 5
+    assert mock_providers.config.snapshot()['openai']['ok'] == 1
+
+
+def test_rate_limits_and_errors_are_simulated(mock_providers):
+    mock_providers.config.rate_limit_rate = 1.0
+    mock_providers.config.retry_after = 2
+    response = post(mock_providers, 'together', OPENAI_BODY)
+    assert response.status_code == 429 and response.headers['Retry-After'] == '2'
+    mock_providers.config.rate_limit_rate, mock_providers.config.error_rate = 0.0, 1.0
+    assert post(mock_providers, 'together', OPENAI_BODY).status_code == 500
+    assert requests.post(f'{mock_providers.url}/openai/v1/chat/completions', json=OPENAI_BODY).status_code == 401
+    stats = requests.get(f'{mock_providers.url}/stats').json()
+    assert stats['together'] == {'rate_limited': 1, 'error': 1} and stats['openai'] == {'unauthorized': 1}
+
+
+def test_streams_end_with_usage_and_done(mock_providers):
+    body = dict(OPENAI_BODY, stream=True, stream_options={'include_usage': True})
+    with post(mock_providers, 'openai', body, stream=True) as response:
+        data = [line[6:] for line in response.iter_lines(decode_unicode=True) if line.startswith('data: ')]
+    assert data[-1] == '[DONE]'
+    chunks = [json.loads(item) for item in data[:-1]]
+    assert len([chunk for chunk in chunks if chunk['choices'] and chunk['choices'][0]['delta']]) == 5
+    assert chunks[-1]['usage']['completion_tokens'] == 5
+
+
+def test_prompt_cache_reads_back_marked_prefixes():
+    cache = MockPromptCache(min_tokens=10)
+    content = [{'type': 'text', 'text': 'x' * 80, 'cache_control': {'type': 'ephemeral'}},
+               {'type': 'text', 'text': 'question one'}]
+    assert cache.anthropic('claude', content) == (0, 20)
+    assert cache.anthropic('claude', content[:1] + [{'type': 'text', 'text': 'question two'}]) == (20, 0)
+    assert cache.anthropic('other-model', content) == (0, 20)
+
+
+def test_latency_models():
+    assert LatencyModel('fixed', 0.3).sample() == 0.3
+    assert all(0.1 <= LatencyModel('uniform', 0.2, 0.1).sample() <= 0.3 for _ in range(50))
+    with pytest.raises(ValueError):
+        LatencyModel('gaussian')
+
+
+def test_percentiles_use_nearest_rank():
+    values = sorted(float(value) for value in range(1, 101))
+    assert (percentile(values, 0.5), percentile(values, 0.95), percentile(values, 0.99)) == (50.0, 95.0, 99.0)
+    assert percentile([], 0.5) == 0.0
+
+
+def test_regressions_beyond_the_allowance_are_reported():
+    baseline = [{'endpoint': 'compare', 'concurrency': 8, 'p95': 1.0, 'rps': 100}]
+    assert compare_to_baseline([{'endpoint': 'compare', 'concurrency': 8, 'p95': 1.1, 'rps': 90}], baseline, 0.2) == []
+    regressions = compare_to_baseline([{'endpoint': 'compare', 'concurrency': 8, 'p95': 1.5, 'rps': 70}], baseline, 0.2)
+    assert regressions == ['compare @ 8: p95 1.0s -> 1.5s', 'compare @ 8: rps 100 -> 70']
+    assert compare_to_baseline([{'endpoint': 'assess', 'concurrency': 8, 'p95': 9, 'rps': 1}], baseline, 0.2) == []
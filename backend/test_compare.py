@@ -0,0 +1,56 @@
+import time
+
+from src.services.ai_service import AIService
+
+QUESTION = 'How many bits are in a byte?'
+
+
+def compare(client, **data):
+    response = client.post('/api/compare', json=dict({'agent1_id': 'gpt-3.5', 'agent2_id': 'gpt-4',
+                                                      'question': QUESTION}, **data))
+    return response.status_code, response.get_json()
+
+
+def test_agents_are_called_concurrently(client, provider):
+    provider['delay'] = 0.3
+    started = time.monotonic()
+    status, body = compare(client)
+    elapsed = time.monotonic() - started
+    assert status == 200
+    assert body['agent1']['response'] == 'gpt-3.5-turbo answer' and body['agent2']['response'] == 'gpt-4 answer'
+    # Back to back the calls would take 0.6 s
+    assert elapsed < 0.55 and body['timing']['total'] < 0.55
+
+
+def test_one_failing_agent_does_not_fail_the_comparison(client, provider):
+    provider['failing'].add('gpt-4')
+    status, body = compare(client)
+    assert status == 200
+    assert body['agent1']['response'] == 'gpt-3.5-turbo answer' and body['agent1']['error'] is None
+    assert body['agent2']['response'] is None and 'rejected' in body['agent2']['error']
+
+
+def test_both_agents_failing_is_an_error(client, provider):
+    provider['failing'].update({'gpt-3.5-turbo', 'gpt-4'})
+    status, body = compare(client)
+    assert status == 500
+    assert 'GPT-3.5 Turbo' in body['error'] and 'GPT-4' in body['error']
+
+
+def test_request_deadline_returns_the_answers_that_made_it(client, provider, monkeypatch):
+    call_provider = AIService._call_provider
+
+    def slow_gpt4(self, provider_name, model, prompt, timeout):
+        if model == 'gpt-4':
+            time.sleep(0.5)
+        return call_provider(self, provider_name, model, prompt, timeout)
+    monkeypatch.setattr(AIService, '_call_provider', slow_gpt4)
+
+    response = client.post('/api/compare', json={'agent1_id': 'gpt-3.5', 'agent2_id': 'gpt-4', 'question': QUESTION},
+                           headers={'X-Request-Timeout': '0.2'})
+    body = response.get_json()
+    assert response.status_code == 200
+    assert body['agent1']['response'] == 'gpt-3.5-turbo answer'
+    assert body['agent2']['timed_out'] is True
+    assert body['deadline']['budget'] == 0.2
+    assert body['deadline']['incomplete'] == ['agent2'] and body['deadline']['partial'] is True
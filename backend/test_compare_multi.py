@@ -0,0 +1,87 @@
+import pytest
+
+from src.models.history import Assessment, Comparison
+from src.models.user import db
+from src.routes.history import history_bp
+from src.services.history_writer import HistoryWriter
+
+AGENTS = ['gpt-3.5', 'gpt-4', 'claude-instant']
+MODELS = {'gpt-3.5': 'gpt-3.5-turbo', 'gpt-4': 'gpt-4', 'claude-instant': 'claude-3-haiku-20240307'}
+JUDGE_MODEL = 'mistralai/Mistral-7B-Instruct-v0.1'
+QUESTION = 'How many bits are in a byte?'
+
+
+@pytest.fixture
+def app(app, tmp_path):
+    """The shared API app, plus a history database and the history API"""
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'history.db'}"
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+    app.register_blueprint(history_bp, url_prefix='/api')
+    writer = HistoryWriter().init_app(app)
+    yield app
+    writer.close()
+
+
+def compare(app, **data):
+    response = app.test_client().post('/api/compare', json=dict(agent_ids=AGENTS, question=QUESTION, **data))
+    return response.status_code, response.get_json()
+
+
+def pairs(body):
+    return sorted((entry['assessor_id'], entry['assessed_id']) for entry in body['assessments'])
+
+
+def test_all_pairs_has_every_agent_assess_every_other(app, provider):
+    status, body = compare(app, include_assessment=True)
+    assert status == 200
+    assert [agent['response'] for agent in body['agents']] == [f'{MODELS[agent]} answer' for agent in AGENTS]
+    assert pairs(body) == sorted((a, b) for a in AGENTS for b in AGENTS if a != b)
+    assert len(provider['calls']) == 3 + 6
+
+
+def test_round_robin_assesses_each_answer_once(app, provider):
+    status, body = compare(app, include_assessment=True, assessment_mode='round_robin')
+    assert status == 200
+    assert pairs(body) == sorted([('gpt-4', 'gpt-3.5'), ('claude-instant', 'gpt-4'), ('gpt-3.5', 'claude-instant')])
+    assert len(provider['calls']) == 3 + 3
+
+
+def test_outside_judge_assesses_every_answer(app, provider):
+    status, body = compare(app, include_assessment=True, assessment_mode='judge', judge_id='mistral-7b')
+    assert status == 200
+    assert pairs(body) == [('mistral-7b', agent) for agent in sorted(AGENTS)]
+    # The judge is called only to assess, never to answer
+    assert [model for model, _ in provider['calls']].count(JUDGE_MODEL) == 3 and len(provider['calls']) == 6
+
+
+@pytest.mark.parametrize('judge_id', [['gpt-4'], {'id': 'gpt-4'}, 4])
+def test_non_string_judge_is_rejected(app, provider, judge_id):
+    status, body = compare(app, include_assessment=True, assessment_mode='judge', judge_id=judge_id)
+    assert status == 400 and 'judge_id' in body['error']
+    assert provider['calls'] == []
+
+
+def test_n_way_runs_are_written_to_history(app, provider):
+    status, body = compare(app, include_assessment=True, assessment_mode='round_robin')
+    assert status == 200
+    assessed = app.test_client().post('/api/assess', json={
+        'comparison_id': body['comparison_id'], 'assessment_mode': 'all_pairs'
+    })
+    assert assessed.status_code == 200
+    app.extensions['history_writer'].close()
+
+    with app.app_context():
+        comparison = Comparison.query.filter_by(comparison_id=body['comparison_id']).one()
+        assert comparison.agent_ids == AGENTS
+        assert comparison.responses['claude-instant']['response'] == 'claude-3-haiku-20240307 answer'
+        assert (comparison.agent1_id, comparison.agent2_id) == ('gpt-3.5', 'gpt-4')
+        assessments = Assessment.query.filter_by(comparison_id=body['comparison_id']).all()
+        assert sorted(len(row.assessments) for row in assessments) == [3, 6]
+
+    # The third agent is found by the agent filter even though it has no pair column
+    listed = app.test_client().get('/api/history/comparisons', query_string={'agent_id': 'claude-instant'}).get_json()
+    assert [item['comparison_id'] for item in listed['items']] == [body['comparison_id']]
+    listed = app.test_client().get('/api/history/comparisons', query_string={'agent_id': 'claude'}).get_json()
+    assert listed['items'] == []
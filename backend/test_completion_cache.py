@@ -0,0 +1,70 @@
+from src.services import completion_cache
+from src.services.completion_cache import CompletionCache, LRUTTLCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUTTLCache(maxsize=2, ttl=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+    cache.set('c', 3)
+    assert cache.get('b') is None
+    assert (cache.get('a'), cache.get('c'), len(cache)) == (1, 3, 2)
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(completion_cache.time, 'time', clock)
+    cache = LRUTTLCache(ttl=10)
+    cache.set('a', 1)
+    cache.set('b', 2, ttl=30)
+    clock.now += 11
+    assert cache.get('a') is None and cache.get('b') == 2
+    assert len(cache) == 1
+
+
+def test_key_covers_every_input():
+    key = CompletionCache.make_key('openai', 'gpt-4', 'prompt', {'temperature': 0.7, 'max_tokens': 500})
+    assert key == CompletionCache.make_key('openai', 'gpt-4', 'prompt', {'max_tokens': 500, 'temperature': 0.7})
+    assert key != CompletionCache.make_key('openai', 'gpt-4', 'prompt', {'temperature': 0.2, 'max_tokens': 500})
+    assert key != CompletionCache.make_key('anthropic', 'gpt-4', 'prompt', {'temperature': 0.7, 'max_tokens': 500})
+
+
+def test_disk_tier_survives_restart_and_promotes_hits(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    cache = CompletionCache(db_path=path)
+    cache.set('key', 'answer')
+    cache.close()
+
+    restarted = CompletionCache(db_path=path)
+    assert len(restarted.memory) == 0
+    assert restarted.get('key') == 'answer' and restarted.get('missing') is None
+    assert len(restarted.memory) == 1
+    assert restarted.get('key') == 'answer'
+    stats = restarted.stats()
+    assert (stats['hits'], stats['misses'], stats['disk_hits'], stats['persistent']) == (2, 1, 1, True)
+    restarted.close()
+
+
+def test_expired_disk_entries_are_ignored_and_purged(tmp_path, monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(completion_cache.time, 'time', clock)
+    path = str(tmp_path / 'cache.db')
+    cache = CompletionCache(ttl=10, db_path=path)
+    cache.set('key', 'answer')
+    cache.memory.clear()
+    clock.now += 11
+    assert cache.get('key') is None
+    cache.close()
+
+    restarted = CompletionCache(ttl=10, db_path=path)
+    assert restarted._db.execute('SELECT COUNT(*) FROM completions').fetchone()[0] == 0
+    restarted.close()
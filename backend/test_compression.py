@@ -0,0 +1,67 @@
+import gzip
+import json
+
+import pytest
+from flask import Flask, Response, jsonify
+
+from src.services.compression import ResponseCompressor
+
+BIG = {'agents': [{'id': f'agent-{index}', 'name': 'An agent'} for index in range(100)]}
+
+
+@pytest.fixture
+def compressor():
+    return ResponseCompressor(min_size=512)
+
+
+@pytest.fixture
+def client(compressor):
+    app = Flask(__name__)
+    app.after_request(compressor)
+    app.add_url_rule('/big', 'big', lambda: jsonify(BIG), methods=['GET', 'POST'])
+    app.add_url_rule('/small', 'small', lambda: jsonify(ok=True))
+    app.add_url_rule('/stream', 'stream', lambda: Response((chunk for chunk in ['a'] * 600), mimetype='text/plain'))
+
+    @app.route('/static-data')
+    def static_data():
+        response = Response(json.dumps(BIG), mimetype='application/json')
+        response.set_etag('agents-v1')
+        return response
+    return app.test_client()
+
+
+def test_large_json_is_gzipped_for_clients_that_accept_it(client):
+    response = client.get('/big', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip' and 'Accept-Encoding' in response.headers['Vary']
+    assert json.loads(gzip.decompress(response.get_data())) == BIG
+    assert response.headers['ETag'].endswith('-gzip"')
+
+    plain = client.get('/big')
+    assert 'Content-Encoding' not in plain.headers and plain.get_json() == BIG
+    assert plain.headers['ETag'] != response.headers['ETag']
+
+
+def test_small_and_streamed_bodies_are_left_alone(client):
+    assert 'Content-Encoding' not in client.get('/small', headers={'Accept-Encoding': 'gzip'}).headers
+    response = client.get('/stream', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in response.headers and 'ETag' not in response.headers
+
+
+def test_unchanged_bodies_are_answered_with_304(client):
+    for encoding in ('gzip', 'identity'):
+        etag = client.get('/big', headers={'Accept-Encoding': encoding}).headers['ETag']
+        response = client.get('/big', headers={'Accept-Encoding': encoding, 'If-None-Match': etag})
+        assert response.status_code == 304 and response.get_data() == b''
+
+
+def test_post_responses_get_no_etag(client):
+    response = client.post('/big', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip' and 'ETag' not in response.headers
+
+
+def test_handler_etags_key_the_compressed_body_cache(client, compressor):
+    first = client.get('/static-data', headers={'Accept-Encoding': 'gzip'})
+    assert first.headers['ETag'] == '"agents-v1-gzip"'
+    assert compressor.compressed.get('agents-v1') == first.get_data()
+    assert client.get('/static-data', headers={'Accept-Encoding': 'gzip',
+                                                'If-None-Match': '"agents-v1-gzip"'}).status_code == 304
@@ -0,0 +1,67 @@
+import dataclasses
+import decimal
+import json
+import uuid
+from datetime import date, datetime, timezone
+
+import pytest
+from flask import Flask, jsonify
+from markupsafe import Markup
+
+from src.services import fast_json
+from src.services.fast_json import FastJSONProvider
+
+
+@dataclasses.dataclass
+class Point:
+    x: int
+    y: int
+
+
+VALUE = {
+    'when': datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+    'day': date(2024, 1, 2),
+    'price': decimal.Decimal('1.10'),
+    'id': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+    'point': Point(1, 2),
+    'html': Markup('<b>hi</b>'),
+    'big': 2 ** 70
+}
+EXPECTED = {
+    'when': 'Tue, 02 Jan 2024 03:04:05 GMT',
+    'day': 'Tue, 02 Jan 2024 00:00:00 GMT',
+    'price': '1.10',
+    'id': '12345678-1234-5678-1234-567812345678',
+    'point': {'x': 1, 'y': 2},
+    'html': '<b>hi</b>',
+    'big': 2 ** 70
+}
+
+
+@pytest.fixture(params=['orjson', 'stdlib'])
+def encoder(request, monkeypatch):
+    if request.param == 'orjson':
+        pytest.importorskip('orjson')
+    else:
+        monkeypatch.setattr(fast_json, 'orjson', None)
+    return request.param
+
+
+def test_dumps_encodes_the_types_responses_carry(encoder):
+    assert json.loads(fast_json.dumps(VALUE)) == EXPECTED
+
+
+def test_unknown_types_still_fail(encoder):
+    with pytest.raises(TypeError):
+        fast_json.dumps({'value': object()})
+
+
+def test_jsonify_matches_flasks_encoding_and_keeps_key_order(encoder):
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+    with app.app_context():
+        body = jsonify(VALUE).get_data(as_text=True)
+        assert json.loads(body) == EXPECTED
+        assert list(json.loads(jsonify({'b': 1, 'a': 2}).get_data())) == ['b', 'a']
+        assert json.loads(jsonify(1, 2).get_data()) == [1, 2]
+        assert json.loads(jsonify(a=1).get_data()) == {'a': 1}
@@ -0,0 +1,118 @@
+import pytest
+import requests
+
+from src.services.ai_service import AIService
+from src.services.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from src.services.errors import ProviderError
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setenv('OPENAI_API_KEY', 'test-key')
+    monkeypatch.setenv('ANTHROPIC_API_KEY', 'test-key')
+    monkeypatch.delenv('TOGETHER_API_KEY', raising=False)
+    monkeypatch.setenv('CIRCUIT_FAILURE_THRESHOLD', '2')
+    monkeypatch.setenv('CIRCUIT_RECOVERY_TIMEOUT', '0')
+    monkeypatch.setenv('PROVIDER_PROBE_INTERVAL', '0')
+    service = AIService()
+    yield service
+    service.close()
+
+
+def probe_failing_with(service, monkeypatch, error):
+    def call_provider(provider, model, prompt, timeout):
+        raise error
+    monkeypatch.setattr(service, '_call_provider', call_provider)
+
+
+def test_breaker_opens_after_threshold_and_recovers_through_trial():
+    breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=0)
+    breaker.record_failure('boom')
+    assert breaker.state == CLOSED
+    breaker.record_failure('boom')
+    assert breaker.state == OPEN
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    # Only one trial call at a time while half-open
+    breaker.recovery_timeout = 60
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED and breaker.failures == 0
+
+
+def test_failed_trial_reopens_breaker():
+    breaker = CircuitBreaker(failure_threshold=5, recovery_timeout=0)
+    for _ in range(5):
+        breaker.record_failure('boom')
+    assert breaker.allow() and breaker.state == HALF_OPEN
+    breaker.record_failure('still down')
+    assert breaker.state == OPEN and breaker.times_opened == 2
+
+
+def test_probe_uses_model_from_registry(service, monkeypatch):
+    calls = []
+    monkeypatch.setattr(service, '_call_provider',
+                        lambda provider, model, prompt, timeout: calls.append((provider, model)) or ('ok', {}))
+    result = service.prober.check('anthropic')
+    enabled = [agent['model'] for agent in service.registry.by_provider('anthropic') if agent['enabled']]
+    assert result['ok']
+    assert calls == [('anthropic', enabled[0])]
+
+
+@pytest.mark.parametrize('status_code', [400, 401, 404])
+def test_client_error_probe_does_not_count_as_failure(service, monkeypatch, status_code):
+    probe_failing_with(service, monkeypatch, ProviderError('rejected', status_code))
+    for _ in range(3):
+        result = service.prober.check('openai')
+    assert not result['ok']
+    assert service.breakers.get('openai').state == CLOSED
+    assert service.breakers.get('openai').failures == 0
+
+
+@pytest.mark.parametrize('error', [
+    ProviderError('overloaded', 503),
+    ProviderError('slow down', 429),
+    requests.exceptions.ConnectionError('refused'),
+    requests.exceptions.Timeout('timed out')
+])
+def test_provider_failure_probes_open_breaker(service, monkeypatch, error):
+    probe_failing_with(service, monkeypatch, error)
+    service.prober.check('openai')
+    service.prober.check('openai')
+    assert service.breakers.get('openai').state == OPEN
+
+
+def test_rejected_probe_closes_half_open_breaker(service, monkeypatch):
+    breaker = service.breakers.get('openai')
+    breaker.record_failure('boom')
+    breaker.record_failure('boom')
+    assert breaker.allow() and breaker.state == HALF_OPEN
+    probe_failing_with(service, monkeypatch, ProviderError('model retired', 404))
+    service.prober.check('openai')
+    assert breaker.state == CLOSED
+
+
+def test_providers_without_key_or_enabled_agent_are_not_probed(service, monkeypatch):
+    assert set(service.prober.providers()) == {'openai', 'anthropic'}
+    monkeypatch.setattr(service.registry, 'by_provider', lambda provider: [])
+    assert service.prober.providers() == []
+
+
+def test_probing_is_off_by_default(monkeypatch):
+    monkeypatch.setenv('OPENAI_API_KEY', 'test-key')
+    monkeypatch.delenv('PROVIDER_PROBE_INTERVAL', raising=False)
+    service = AIService()
+    try:
+        assert service.prober.interval == 0 and service.prober._thread is None
+    finally:
+        service.close()
+
+
+def test_probe_refused_by_the_rate_limiter_is_not_an_outcome(service, monkeypatch):
+    calls = []
+    monkeypatch.setattr(service, '_call_provider', lambda *args: calls.append(args) or ('ok', {}))
+    service.rate_limiter.pause('openai', 60)
+    for _ in range(3):
+        result = service.prober.check('openai')
+        assert not result['ok'] and 'rate limit' in result['message']
+    assert calls == [] and service.breakers.get('openai').failures == 0
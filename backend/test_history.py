@@ -0,0 +1,76 @@
+import pytest
+from flask import Flask
+
+from src.models.history import Comparison
+from src.models.user import db
+from src.routes.history import history_bp
+from src.services.history_writer import HistoryWriter
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'history.db'}"
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+    app.register_blueprint(history_bp, url_prefix='/api')
+    writer = HistoryWriter().init_app(app)
+    yield app
+    writer.close()
+
+
+def record(app, rows):
+    writer = app.extensions['history_writer']
+    for index, (created_at, agent1_id) in enumerate(rows):
+        writer.record_comparison(
+            comparison_id=f'c{index}', created_at=created_at, question=f'Question {index}',
+            agent1_id=agent1_id, agent2_id='gpt-4', agent1_response='a', agent2_response='b'
+        )
+    writer.close()
+
+
+def all_pages(client, **params):
+    pages, cursor = [], None
+    while True:
+        query = dict(params, **({'cursor': cursor} if cursor else {}))
+        body = client.get('/api/history/comparisons', query_string=query).get_json()
+        pages.append([item['comparison_id'] for item in body['items']])
+        cursor = body['next_cursor']
+        if cursor is None:
+            return pages
+
+
+def test_cursor_pages_cover_every_row_once_newest_first(app):
+    # Repeated timestamps make the id the tie-breaker
+    times = [100.0, 100.0, 100.5, 101.25, 101.25, 101.25, 102.0, 1700000000.123456]
+    record(app, [(created_at, 'gpt-3.5') for created_at in times])
+    pages = all_pages(app.test_client(), limit=3)
+    assert [len(page) for page in pages] == [3, 3, 2]
+    assert [item for page in pages for item in page] == [f'c{index}' for index in (7, 6, 5, 4, 3, 2, 1, 0)]
+
+
+def test_cursor_keeps_filters(app):
+    record(app, [(float(index), 'gpt-3.5' if index % 2 else 'claude-instant') for index in range(7)])
+    pages = all_pages(app.test_client(), limit=2, agent_id='gpt-3.5')
+    assert pages == [['c5', 'c3'], ['c1']]
+
+
+def test_last_page_has_no_cursor(app):
+    record(app, [(1.0, 'gpt-3.5'), (2.0, 'gpt-3.5')])
+    body = app.test_client().get('/api/history/comparisons?limit=2').get_json()
+    assert len(body['items']) == 2 and body['next_cursor'] is None
+
+
+@pytest.mark.parametrize('cursor', ['not-a-cursor', 'Zm9vOmJhcg'])
+def test_invalid_cursor_is_rejected(app, cursor):
+    record(app, [(1.0, 'gpt-3.5')])
+    response = app.test_client().get('/api/history/comparisons', query_string={'cursor': cursor})
+    assert response.status_code == 400
+
+
+def test_rows_are_stored(app):
+    record(app, [(1.0, 'gpt-3.5')])
+    with app.app_context():
+        assert Comparison.query.count() == 1
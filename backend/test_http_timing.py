@@ -0,0 +1,69 @@
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+import requests
+
+from src.services import async_ai_service
+from src.services.async_ai_service import connect_trace
+from src.services.http_timing import TimedHTTPAdapter, connect_timer
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Length', '2')
+        # Every request has to open a fresh connection
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.wfile.write(b'ok')
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{server.server_address[1]}/'
+    server.shutdown()
+
+
+def test_trace_sums_phases_over_every_connection(monkeypatch):
+    clock = iter([1.0, 1.5, 2.25, 10.0, 10.5])
+    monkeypatch.setattr(async_ai_service.time, 'monotonic', lambda: next(clock))
+    timing = {}
+    trace = connect_trace(timing)
+
+    for event in ('connection.connect_tcp.started', 'connection.connect_tcp.complete',
+                  'connection.start_tls.complete', 'connection.connect_tcp.started',
+                  'connection.connect_tcp.failed'):
+        # The hook never awaits, so it runs to completion without an event loop (which reads the clock too)
+        with pytest.raises(StopIteration):
+            trace(event, {}).send(None)
+    # 0.5 s TCP + 0.75 s TLS on the first connection, 0.5 s on the failed second one
+    assert timing['connect'] == pytest.approx(1.75) and timing['connections'] == 2
+
+
+def test_async_trace_counts_each_new_connection(server):
+    timing = {}
+
+    async def fetch_twice():
+        async with httpx.AsyncClient() as client:
+            for _ in range(2):
+                response = await client.get(server, extensions={'trace': connect_trace(timing)})
+                assert response.status_code == 200
+    asyncio.run(fetch_twice())
+    assert timing['connections'] == 2 and timing['connect'] > 0
+
+
+def test_sync_connect_timer_counts_new_connections_only(server):
+    session = requests.Session()
+    session.mount('http://', TimedHTTPAdapter())
+    connect_timer.reset()
+    session.get(server)
+    session.get(server)
+    assert connect_timer.connections == 2 and connect_timer.seconds > 0
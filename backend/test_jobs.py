@@ -0,0 +1,124 @@
+import json
+import queue
+import threading
+import time
+
+import pytest
+from flask import Flask
+
+from src.services.jobs import FAILED, QUEUED, RUNNING, SUCCEEDED, JobManager, MemoryJobQueue, SQLiteJobQueue
+
+
+def new_job(job_id, created_at=None, **payload):
+    return {'job_id': job_id, 'kind': 'echo', 'payload': payload, 'status': QUEUED, 'status_code': None,
+            'result': None, 'created_at': created_at or time.time(), 'started_at': None, 'finished_at': None}
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def job_queue(request, tmp_path):
+    if request.param == 'memory':
+        return MemoryJobQueue(maxsize=2)
+    return SQLiteJobQueue(str(tmp_path / 'jobs.db'), maxsize=2)
+
+
+def test_jobs_are_claimed_oldest_first_and_finished(job_queue):
+    job_queue.put(new_job('a', created_at=1))
+    job_queue.put(new_job('b', created_at=2))
+    first = job_queue.claim()
+    assert first['job_id'] == 'a' and first['status'] == RUNNING and first['started_at'] is not None
+    job_queue.finish('a', 200, {'answer': 42})
+    finished = job_queue.get('a')
+    assert finished['status'] == SUCCEEDED and finished['result'] == {'answer': 42}
+    assert job_queue.depth() == 1
+    assert job_queue.claim()['job_id'] == 'b'
+    assert job_queue.claim() is None and job_queue.depth() == 0
+
+
+def test_full_queue_refuses_new_jobs(job_queue):
+    job_queue.put(new_job('a'))
+    job_queue.put(new_job('b'))
+    with pytest.raises(queue.Full):
+        job_queue.put(new_job('c'))
+
+
+def test_error_statuses_mark_the_job_failed(job_queue):
+    job_queue.put(new_job('a'))
+    job_queue.claim()
+    job_queue.finish('a', 504, {'error': 'timed out'})
+    assert job_queue.get('a')['status'] == FAILED and job_queue.get('a')['status_code'] == 504
+
+
+def test_sqlite_queue_survives_a_restart_and_requeues_stale_jobs(tmp_path):
+    path = str(tmp_path / 'jobs.db')
+    before = SQLiteJobQueue(path)
+    before.put(new_job('waiting', created_at=2, question='q'))
+    before.put(new_job('running', created_at=1))
+    before.claim()
+
+    after = SQLiteJobQueue(path)
+    assert after.get('waiting')['payload'] == {'question': 'q'} and after.depth() == 1
+    assert after.requeue_stale(older_than=3600) == 0
+    assert after.requeue_stale(older_than=0) == 1
+    assert after.get('running')['status'] == QUEUED and after.depth() == 2
+
+
+def test_finished_sqlite_jobs_expire_after_the_ttl(tmp_path):
+    job_queue = SQLiteJobQueue(str(tmp_path / 'jobs.db'), ttl=0)
+    job_queue.put(new_job('a'))
+    job_queue.claim()
+    job_queue.finish('a', 200, {})
+    job_queue.put(new_job('b'))
+    assert job_queue.get('a') is None and job_queue.get('b') is not None
+
+
+def test_manager_runs_handlers_on_workers(tmp_path):
+    release = threading.Event()
+
+    def echo(payload):
+        release.wait(5)
+        return {'echo': payload['value']}, 200
+
+    def crash(payload):
+        raise RuntimeError('boom')
+
+    manager = JobManager(SQLiteJobQueue(str(tmp_path / 'jobs.db')), {'echo': echo, 'crash': crash},
+                         workers=2, poll_interval=0.05).init_app(Flask(__name__))
+    try:
+        job = manager.submit('echo', {'value': 1})
+        assert manager.wait(job['job_id'], QUEUED, timeout=5)['status'] == RUNNING
+        release.set()
+        done = manager.wait(job['job_id'], RUNNING, timeout=5)
+        assert done['status'] == SUCCEEDED and done['result'] == {'echo': 1}
+
+        crashed = manager.submit('crash', {})
+        result = manager.wait(crashed['job_id'], QUEUED, timeout=5)
+        if result['status'] == RUNNING:
+            result = manager.wait(crashed['job_id'], RUNNING, timeout=5)
+        assert result['status'] == FAILED and result['result'] == {'error': 'Job error: boom'}
+        with pytest.raises(ValueError):
+            manager.submit('unknown', {})
+    finally:
+        manager.close()
+
+
+def test_compare_in_job_mode_is_polled_to_its_result(client, provider):
+    response = client.post('/api/compare', json={'agent1_id': 'gpt-3.5', 'agent2_id': 'gpt-4',
+                                                 'question': 'How many bits are in a byte?', 'job': True})
+    assert response.status_code == 202
+    body = response.get_json()
+    assert response.headers['Location'] == body['status_url'] == f"/api/jobs/{body['job_id']}"
+
+    events = client.get(body['events_url']).get_data(as_text=True)
+    result = json.loads(events.split('event: result\ndata: ')[1])
+    assert result['status'] == SUCCEEDED and result['result']['agent2']['response'] == 'gpt-4 answer'
+
+    polled = client.get(body['status_url'])
+    assert polled.get_json()['result'] == result['result'] and 'Retry-After' not in polled.headers
+    assert client.get('/api/jobs/no-such-job').status_code == 404
+
+
+def test_prefer_respond_async_starts_a_job(client, provider):
+    response = client.post('/api/assess', headers={'Prefer': 'respond-async'}, json={
+        'agent1_id': 'gpt-3.5', 'agent2_id': 'gpt-4', 'question': 'Q?', 'mode': 'local',
+        'agent1_response': 'Eight bits.', 'agent2_response': 'A byte is eight bits.'})
+    assert response.status_code == 202
@@ -0,0 +1,78 @@
+import pytest
+import requests
+
+from src.services.errors import CircuitOpenError, ProviderError
+from src.services.metrics import AIMetrics, MetricsRegistry, error_type
+from src.services.pricing import estimate_cost, reported_tokens
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry()
+    histogram = registry.histogram('latency_seconds', 'Latency', ('provider',), buckets=(0.1, 1))
+    for value in (0.05, 0.5, 0.7, 3):
+        histogram.observe(('openai',), value)
+    lines = registry.render().splitlines()
+    assert lines[:2] == ['# HELP latency_seconds Latency', '# TYPE latency_seconds histogram']
+    assert lines[2:] == [
+        'latency_seconds_bucket{provider="openai",le="0.1"} 1',
+        'latency_seconds_bucket{provider="openai",le="1"} 3',
+        'latency_seconds_bucket{provider="openai",le="+Inf"} 4',
+        'latency_seconds_sum{provider="openai"} 4.25',
+        'latency_seconds_count{provider="openai"} 4'
+    ]
+
+
+def test_label_values_are_escaped():
+    registry = MetricsRegistry()
+    registry.counter('calls_total', 'Calls', ('model',)).inc(('a "quoted"\nmodel',))
+    assert 'calls_total{model="a \\"quoted\\"\\nmodel"} 1' in registry.render()
+
+
+@pytest.mark.parametrize('error, label', [
+    (ProviderError('slow down', 429), 'rate_limited'),
+    (ProviderError('down', 503), 'server_error'),
+    (ProviderError('bad request', 400), 'client_error'),
+    (CircuitOpenError('openai is failing', 10), 'circuit_open'),
+    (requests.exceptions.ReadTimeout(), 'timeout'),
+    (requests.exceptions.ConnectionError(), 'connection'),
+    (ValueError(), 'other')
+])
+def test_errors_get_low_cardinality_labels(error, label):
+    assert error_type(error) == label
+
+
+def test_cost_follows_list_prices_and_cache_discounts():
+    assert estimate_cost('gpt-4', 1000, 500) == pytest.approx(0.06)
+    assert estimate_cost('unknown-model', 1000, 500) is None
+    # Anthropic bills cache reads at a tenth of the input price
+    assert estimate_cost('claude-3-haiku-20240307', 1000, 0, cached_input_tokens=1000,
+                         provider='anthropic') == pytest.approx(0.000025)
+    assert reported_tokens('anthropic', {'input_tokens': 10, 'cache_read_input_tokens': 90, 'output_tokens': 5}) == {
+        'input_tokens': 100, 'output_tokens': 5, 'cached_input_tokens': 90, 'cache_write_tokens': 0}
+
+
+def test_record_call_counts_outcomes_tokens_and_cost():
+    metrics = AIMetrics()
+    usage = {'input_tokens': 100, 'output_tokens': 20, 'cost': 0.5}
+    metrics.record_call('openai', 'gpt-4', 1.5, connect=0.2, connections=1, usage=usage)
+    metrics.record_call('openai', 'gpt-4', 0.3, error=ProviderError('down', 503))
+    assert metrics.calls.value(('openai', 'gpt-4', 'success')) == 1
+    assert metrics.errors.value(('openai', 'gpt-4', 'server_error')) == 1
+    assert metrics.tokens.value(('openai', 'gpt-4', 'output')) == 20
+    assert metrics.cost.value(('openai', 'gpt-4')) == 0.5
+    assert metrics.connections.value(('openai',)) == 1
+
+
+def test_metrics_endpoint_reports_real_calls(client, mock_providers):
+    response = client.post('/api/compare', json={'agent1_id': 'gpt-3.5', 'agent2_id': 'claude-instant',
+                                                  'question': 'How many bits are in a byte?'})
+    usage = response.get_json()['usage']
+    assert usage['total']['output_tokens'] == 10 and usage['total']['cost'] > 0
+
+    response = client.get('/api/metrics')
+    assert response.status_code == 200 and response.mimetype == 'text/plain'
+    text = response.get_data(as_text=True)
+    assert 'ai_calls_total{provider="openai",model="gpt-3.5-turbo",outcome="success"} 1' in text
+    assert 'ai_tokens_total{provider="anthropic",model="claude-3-haiku-20240307",direction="output"} 5' in text
+    assert 'ai_connections_opened_total{provider="openai"} 1' in text
+    assert 'ai_call_duration_seconds_count{provider="openai",model="gpt-3.5-turbo",phase="total"} 1' in text
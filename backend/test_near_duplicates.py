@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+
+from src.services.near_duplicates import NearDuplicateIndex, comparison_scope, lsh_bands, normalize_question
+
+SCOPE = comparison_scope('gpt-3.5', 'gpt-4', None)
+QUESTION = 'How do I reverse a linked list in Python without recursion?'
+
+
+@pytest.fixture
+def index():
+    return NearDuplicateIndex(threshold=0.8, bands=16, shingle_size=4, max_entries=100)
+
+
+def shingle_jaccard(index, a, b):
+    sa, sb = set(index.shingles(normalize_question(a))), set(index.shingles(normalize_question(b)))
+    return len(sa & sb) / len(sa | sb)
+
+
+def test_normalize_question_drops_case_punctuation_and_filler():
+    assert normalize_question('How do I reverse a list?!') == 'reverse list'
+    assert normalize_question('  What   IS   the  GIL? ') == 'gil'
+    # Nothing but filler words keeps them rather than returning an empty string
+    assert normalize_question('How do I?') == 'how do i'
+
+
+def test_scope_ignores_best_practice_order_and_duplicates():
+    assert comparison_scope('a', 'b', ['x ', 'y', 'x']) == comparison_scope('a', 'b', ['y', 'x'])
+    assert comparison_scope('a', 'b', None) != comparison_scope('b', 'a', None)
+
+
+def test_signature_is_deterministic_and_handles_short_text(index):
+    assert np.array_equal(index.signature(QUESTION), NearDuplicateIndex(bands=16).signature(QUESTION))
+    assert index.signature('hi').shape == (128,)
+    assert index.signature('').shape == (128,)
+
+
+@pytest.mark.parametrize('a, b', [
+    (QUESTION, 'how do I reverse a linked list in python without recursion'),
+    (QUESTION, 'How can I reverse a linked list in Python, without using recursion?'),
+    ('Explain the difference between TCP and UDP', 'Explain the difference between TCP & UDP.')
+])
+def test_minhash_similarity_tracks_shingle_jaccard(index, a, b):
+    estimate = float((index.signature(a) == index.signature(b)).mean())
+    # 128 permutations give a standard error of at most ~0.045
+    assert abs(estimate - shingle_jaccard(index, a, b)) < 0.2
+
+
+def test_rephrased_question_matches_and_unrelated_does_not(index):
+    index.add(SCOPE, 'c1', QUESTION)
+    index.add(SCOPE, 'c2', 'What is the capital of Australia?')
+    match = index.query(SCOPE, 'how do I reverse a linked list in Python without recursion??')
+    assert match['comparison_id'] == 'c1' and match['similarity'] >= 0.8
+    assert index.query(SCOPE, 'How do I sort a dictionary by value in Python?') is None
+
+
+def test_matches_stay_within_their_scope(index):
+    index.add(SCOPE, 'c1', QUESTION)
+    assert index.query(comparison_scope('gpt-3.5', 'claude-instant', None), QUESTION) is None
+    assert index.query(comparison_scope('gpt-3.5', 'gpt-4', ['Cite sources']), QUESTION) is None
+
+
+def test_discard_and_eviction_remove_buckets(index):
+    index.add(SCOPE, 'c1', QUESTION)
+    index.discard('c1')
+    assert index.query(SCOPE, QUESTION) is None and len(index) == 0 and not index._buckets
+
+    small = NearDuplicateIndex(bands=16, max_entries=2)
+    for number in range(3):
+        small.add(SCOPE, f'c{number}', f'Question number {number} about {"abcdefgh"[number] * 10}')
+    assert len(small) == 2
+    assert small.query(SCOPE, f'Question number 0 about {"a" * 10}') is None
+    assert small.query(SCOPE, f'Question number 2 about {"c" * 10}')['comparison_id'] == 'c2'
+
+
+@pytest.mark.parametrize('threshold', [0.0, 0.4])
+def test_lower_threshold_finds_reworded_questions(monkeypatch, threshold):
+    monkeypatch.delenv('NEAR_DUP_BANDS', raising=False)
+    index = NearDuplicateIndex(threshold=threshold)
+    index.add(SCOPE, 'c1', 'How do I do binary search?')
+    # Shingle Jaccard of about 0.5, far below what 16 bands of 8 rows would surface
+    match = index.query(SCOPE, 'how to implement binary search?')
+    assert match is not None and match['comparison_id'] == 'c1'
+
+
+def test_bands_follow_the_threshold(monkeypatch):
+    monkeypatch.delenv('NEAR_DUP_BANDS', raising=False)
+    assert [lsh_bands(threshold, 128) for threshold in (0.0, 0.4, 0.5, 0.8, 0.9)] == [128, 64, 32, 16, 8]
+    assert NearDuplicateIndex(threshold=0.8).bands == 16
+    monkeypatch.setenv('NEAR_DUP_BANDS', '4')
+    assert NearDuplicateIndex(threshold=0.8).bands == 4
+
+
+def test_bands_must_divide_permutations():
+    with pytest.raises(ValueError):
+        NearDuplicateIndex(bands=7)
@@ -0,0 +1,63 @@
+import pytest
+
+from src.services.ai_service import AIService
+from src.services.completion_cache import CompletionCache
+from src.services.prompts import (
+    Prompt, anthropic_content, build_assessment_prompt, build_compare_prompt, build_history_prompt
+)
+
+QUESTION = 'How do connection pools cut latency?'
+LONG_ANSWER = 'Connection pools keep TCP and TLS sessions open between requests. ' * 80
+
+
+def test_prompts_are_plain_strings_with_a_block_layout():
+    prompt = Prompt.layout('stable ', 'variable')
+    assert prompt == 'stable variable' and isinstance(prompt, str)
+    assert prompt.blocks == (('stable ', True), ('variable', False))
+    assert CompletionCache.make_key('openai', 'gpt-4', prompt, {}) == CompletionCache.make_key(
+        'openai', 'gpt-4', 'stable variable', {})
+
+
+def test_anthropic_content_marks_each_stable_prefix(monkeypatch):
+    monkeypatch.delenv('PROMPT_CACHE_ENABLED', raising=False)
+    assert anthropic_content(Prompt.layout('stable', 'variable')) == [
+        {'type': 'text', 'text': 'stable', 'cache_control': {'type': 'ephemeral'}},
+        {'type': 'text', 'text': 'variable'}
+    ]
+    assert anthropic_content('plain text') == 'plain text'
+    assert anthropic_content(build_compare_prompt(QUESTION)) == QUESTION
+    monkeypatch.setenv('PROMPT_CACHE_ENABLED', 'false')
+    assert anthropic_content(Prompt.layout('stable', 'variable')) == 'stablevariable'
+
+
+def test_variable_parts_come_last():
+    first = build_assessment_prompt(QUESTION, LONG_ANSWER, 'Check accuracy.')
+    second = build_assessment_prompt(QUESTION, LONG_ANSWER, 'Check style.')
+    assert first.blocks[0] == second.blocks[0] and first.blocks[0][1] is True
+
+    context = {'original_question': 'Q1', 'original_responses': {'agent1': 'mine', 'agent2': 'theirs'}}
+    follow_up = build_compare_prompt('Q2', ['Be brief.'], context, own_key='agent2')
+    assert follow_up.blocks[0][0].startswith('Previous question: Q1\nYour previous response: theirs')
+    assert follow_up.endswith('Follow-up question: Q2\n\nAlso: Be brief.')
+
+
+def test_history_breakpoint_follows_the_last_turn():
+    prompt = build_history_prompt(['turn one\n', 'turn two\n'], QUESTION)
+    assert [breakpoint for _, breakpoint in prompt.blocks] == [False, True, False]
+    assert prompt.endswith(f'Current question: {QUESTION}')
+
+
+@pytest.mark.parametrize('provider, model', [('anthropic', 'claude-3-haiku-20240307'), ('openai', 'gpt-4')])
+def test_repeated_prefixes_are_read_from_the_provider_cache(app, mock_providers, provider, model):
+    service = AIService()
+    try:
+        _, first = service.get_completion_with_usage(
+            provider, model, build_assessment_prompt(QUESTION, LONG_ANSWER, 'Check accuracy.'))
+        _, second = service.get_completion_with_usage(
+            provider, model, build_assessment_prompt(QUESTION, LONG_ANSWER, 'Check style.'))
+    finally:
+        service.close()
+    assert first['cached_input_tokens'] == 0
+    assert second['cached_input_tokens'] >= 1024
+    # Cache reads are billed below the input price
+    assert second['cost'] < first['cost']
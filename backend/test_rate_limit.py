@@ -0,0 +1,80 @@
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+
+from src.services import rate_limit
+from src.services.rate_limit import ProviderRateLimiter, RetryBudget, RetryPolicy, TokenBucket, parse_retry_after
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Frozen monotonic clock, moved forward by assigning ``clock.now``"""
+    class Clock:
+        now = 1000.0
+    monkeypatch.setattr(rate_limit.time, 'monotonic', lambda: Clock.now)
+    return Clock
+
+
+def test_bucket_goes_into_debt_and_reports_wait(clock):
+    bucket = TokenBucket(capacity=10, rate=2)
+    assert bucket.reserve(10) == 0.0
+    # Each further reservation queues behind the previous one
+    assert bucket.reserve(4) == pytest.approx(2.0)
+    assert bucket.reserve(2) == pytest.approx(3.0)
+    clock.now += 3
+    assert bucket.reserve(0) == 0.0
+
+
+def test_bucket_refill_is_capped_and_refund_restores(clock):
+    bucket = TokenBucket(capacity=5, rate=1)
+    bucket.reserve(5)
+    clock.now += 100
+    assert bucket.reserve(5) == 0.0 and bucket.reserve(1) == pytest.approx(1.0)
+    bucket.refund(1)
+    assert bucket.reserve(0) == 0.0
+
+
+def test_limiter_applies_rpm_tpm_and_pause(clock):
+    limiter = ProviderRateLimiter(limits={'openai': {'rpm': 60, 'tpm': 600}})
+    assert limiter.reserve('openai', 600) == 0.0
+    # The token bucket is empty: 600 more tokens take a minute at 10 tokens/s
+    assert limiter.reserve('openai', 600) == pytest.approx(60.0)
+    limiter.release('openai', 600)
+    # A call larger than the whole budget is capped rather than waiting forever
+    assert limiter.reserve('openai', 10 ** 6) == pytest.approx(60.0)
+    assert limiter.reserve('together', 10 ** 6) == 0.0
+    limiter.pause('together', 7)
+    assert limiter.reserve('together', 1) == pytest.approx(7.0)
+
+
+def test_retry_budget_caps_retries_to_traffic(clock):
+    budget = RetryBudget(ratio=0.5, min_per_second=0, max_tokens=2)
+    assert budget.try_retry()
+    assert not budget.try_retry()
+    budget.record_request()
+    budget.record_request()
+    assert budget.try_retry()
+    assert budget.stats()['retries'] == 2 and budget.stats()['denied'] == 1
+
+
+def test_retry_policy_honours_retry_after_and_caps_backoff():
+    policy = RetryPolicy(max_retries=3, base_delay=1, max_delay=4)
+    assert policy.delay(1, retry_after=12.5) == 12.5
+    assert all(0 <= policy.delay(attempt) <= 4 for attempt in range(1, 10))
+
+
+@pytest.mark.parametrize('headers, expected', [
+    ({'retry-after-ms': '1500'}, 1.5),
+    ({'retry-after-ms': 'junk', 'retry-after': '3'}, 3.0),
+    ({'retry-after': '-5'}, 0.0),
+    ({'retry-after': 'soon'}, None),
+    ({}, None)
+])
+def test_parse_retry_after(headers, expected):
+    assert parse_retry_after(headers) == expected
+
+
+def test_parse_retry_after_http_date():
+    when = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=30), usegmt=True)
+    assert 25 <= parse_retry_after({'retry-after': when}) <= 30
@@ -0,0 +1,77 @@
+from src.services.sessions import DIGEST_RESPONSE_TOKENS, ConversationSession, SessionStore
+from src.services.tokens import estimate_tokens
+
+
+def words(count, prefix='word'):
+    return ' '.join(f'{prefix}{index}' for index in range(count))
+
+
+def history_tokens(session):
+    return sum(turn['tokens'] for turn in session.turns)
+
+
+def test_history_under_budget_is_kept_in_full():
+    session = ConversationSession('s', 'gpt-3.5', 'gpt-4', budget=10000)
+    for index in range(3):
+        session.add_turn(f'Question {index}?', words(50), words(50))
+    assert len(session.turns) == 3 and session.omitted == 0
+    assert not any(turn['compacted'] for turn in session.turns)
+
+
+def test_oldest_turns_are_digested_first_and_newest_kept():
+    long_answer = words(400)
+    full = ConversationSession('s', 'a', 'b', budget=10 ** 6)
+    full.add_turn('Q?', long_answer, long_answer)
+    budget = full.turns[0]['tokens'] * 2
+    session = ConversationSession('s', 'a', 'b', budget=budget)
+    for index in range(3):
+        session.add_turn(f'Question {index}?', long_answer, long_answer)
+    assert history_tokens(session) <= budget
+    assert [turn['compacted'] for turn in session.turns] == [True, True, False]
+    assert estimate_tokens(session.turns[0]['agent1_response']) <= DIGEST_RESPONSE_TOKENS + 1
+
+
+def test_digests_that_do_not_fit_are_dropped_and_counted():
+    session = ConversationSession('s', 'a', 'b', budget=400)
+    for index in range(20):
+        session.add_turn(f'Question {index}?', words(300), words(300))
+        assert history_tokens(session) <= 400
+    assert session.turn_count == 20
+    assert session.omitted + len(session.turns) == 20
+    assert session.turns[-1]['question'] == 'Question 19?'
+
+
+def test_single_turn_over_budget_is_truncated_not_dropped():
+    session = ConversationSession('s', 'a', 'b', budget=300)
+    session.add_turn('Huge?', words(2000), words(2000))
+    assert len(session.turns) == 1 and session.omitted == 0
+    assert session.turns[0]['compacted'] and history_tokens(session) <= 300
+
+
+def test_history_prompt_is_from_each_agents_point_of_view():
+    session = ConversationSession('s', 'a', 'b', budget=10000)
+    session.add_turn('First?', 'answer from a', 'answer from b')
+    prompt_a = session.history_prompt('agent1', 'Second?')
+    prompt_b = session.history_prompt('agent2', 'Second?')
+    assert 'Your previous response: answer from a' in prompt_a
+    assert "Other agent's response: answer from b" in prompt_a
+    assert 'Your previous response: answer from b' in prompt_b
+    assert prompt_a.endswith('Current question: Second?')
+
+
+def test_omitted_turns_are_mentioned_in_the_prompt():
+    session = ConversationSession('s', 'a', 'b', budget=300)
+    for index in range(5):
+        session.add_turn(f'Question {index}?', words(300), words(300))
+    assert f'({session.omitted} earlier exchanges omitted)' in session.history_prompt('agent1', 'Next?')
+
+
+def test_store_seeds_sessions_from_client_history():
+    store = SessionStore(maxsize=2, ttl=60)
+    session = store.create('a', 'b', budget=1000, history=[
+        {'question': 'Earlier?', 'agent1_response': 'yes', 'agent2_response': 'no'}
+    ])
+    assert store.get(session.id) is session
+    assert session.turn_count == 1 and 'Q1: Earlier?' in session.history_prompt('agent1', 'Now?')
+    store.delete(session.id)
+    assert store.get(session.id) is None
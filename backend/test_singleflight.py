@@ -0,0 +1,140 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from src.services.errors import CallTimeout
+from src.services.metrics import AIMetrics
+from src.services.singleflight import SingleFlight
+
+
+def test_concurrent_callers_share_one_call_and_are_counted():
+    metrics = AIMetrics()
+    flight = SingleFlight(metrics)
+    release = threading.Event()
+    calls = []
+
+    def fetch(remaining):
+        calls.append(1)
+        release.wait(5)
+        return 'answer'
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do('key', fetch, timeout=5))) for _ in range(4)]
+    threads[0].start()
+    while not flight.stats()['in_flight']:
+        pass
+    for thread in threads[1:]:
+        thread.start()
+    while flight.stats()['coalesced'] < 3:
+        pass
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert results == ['answer'] * 4 and len(calls) == 1
+    rendered = metrics.render()
+    assert 'ai_singleflight_requests_total{role="leader"} 1' in rendered
+    assert 'ai_singleflight_requests_total{role="follower"} 3' in rendered
+
+
+def test_async_callers_are_counted():
+    metrics = AIMetrics()
+    flight = SingleFlight(metrics)
+
+    async def fetch(remaining):
+        await asyncio.sleep(0.05)
+        return 'answer'
+
+    async def main():
+        return await asyncio.gather(*(flight.do_async('key', fetch) for _ in range(3)))
+
+    assert asyncio.run(main()) == ['answer'] * 3
+    rendered = metrics.render()
+    assert 'ai_singleflight_requests_total{role="leader"} 1' in rendered
+    assert 'ai_singleflight_requests_total{role="follower"} 2' in rendered
+
+
+def test_async_follower_gives_up_at_its_own_timeout():
+    flight = SingleFlight()
+
+    async def fetch(remaining):
+        await asyncio.sleep(0.3)
+        return 'answer'
+
+    async def main():
+        leader = asyncio.ensure_future(flight.do_async('key', fetch, timeout=5))
+        await asyncio.sleep(0)
+        with pytest.raises(CallTimeout, match='timed out after 0.05 seconds'):
+            await flight.do_async('key', fetch, timeout=0.05)
+        # The shared task survives the follower giving up
+        return await leader
+
+    assert asyncio.run(main()) == 'answer'
+
+
+def test_follower_with_budget_left_retries_after_leader_timeout():
+    flight = SingleFlight()
+    budgets = []
+
+    def fetch(remaining):
+        budgets.append(remaining)
+        if len(budgets) == 1:
+            time.sleep(0.2)
+            raise CallTimeout(remaining)
+        return 'answer'
+
+    leader_errors = []
+
+    def lead():
+        try:
+            flight.do('key', fetch, timeout=0.2)
+        except CallTimeout as e:
+            leader_errors.append(e)
+
+    leader = threading.Thread(target=lead)
+    leader.start()
+    while not flight.stats()['in_flight']:
+        pass
+    # The follower inherits the leader's result, not its shorter timeout
+    assert flight.do('key', fetch, timeout=5) == 'answer'
+    leader.join()
+    assert len(leader_errors) == 1 and budgets[0] == 0.2
+    assert 4 < budgets[1] < 5
+
+
+def test_follower_out_of_budget_gets_a_typed_timeout():
+    flight = SingleFlight()
+    release = threading.Event()
+    leader = threading.Thread(target=lambda: flight.do('key', lambda remaining: release.wait(5), timeout=5))
+    leader.start()
+    while not flight.stats()['in_flight']:
+        pass
+    with pytest.raises(CallTimeout) as error:
+        flight.do('key', lambda remaining: 'unused', timeout=0.05)
+    assert error.value.timeout == 0.05
+    release.set()
+    leader.join()
+
+
+def test_async_follower_retries_after_leader_timeout():
+    flight = SingleFlight()
+    calls = []
+
+    async def fetch(remaining):
+        calls.append(remaining)
+        if len(calls) == 1:
+            await asyncio.sleep(0.1)
+            raise CallTimeout(remaining)
+        return 'answer'
+
+    async def main():
+        leader = asyncio.ensure_future(flight.do_async('key', fetch, timeout=0.1))
+        await asyncio.sleep(0)
+        follower = await flight.do_async('key', fetch, timeout=5)
+        with pytest.raises(CallTimeout):
+            await leader
+        return follower
+
+    assert asyncio.run(main()) == 'answer' and len(calls) == 2
@@ -0,0 +1,60 @@
+import gzip
+
+import pytest
+from werkzeug.http import parse_accept_header
+
+from src.services.static_assets import IMMUTABLE, REVALIDATE, StaticManifest
+
+SCRIPT = b'console.log("compare");\n' * 200
+
+
+def accept(header):
+    return parse_accept_header(header)
+
+
+@pytest.fixture
+def folder(tmp_path):
+    (tmp_path / 'assets').mkdir()
+    (tmp_path / 'index.html').write_bytes(b'<html>' + b' ' * 2000 + b'</html>')
+    (tmp_path / 'assets' / 'index-BxK3a9Qz.js').write_bytes(SCRIPT)
+    (tmp_path / 'assets' / 'index-BxK3a9Qz.js.gz').write_bytes(b'prebuilt')
+    (tmp_path / 'favicon.ico').write_bytes(b'\x00' * 100)
+    (tmp_path / 'video.mp4').write_bytes(b'\x00' * 4096)
+    return tmp_path
+
+
+def test_files_are_indexed_with_cache_policies(folder):
+    manifest = StaticManifest(str(folder), max_file_bytes=1024 * 1024, asset_max_age=600)
+    assert set(manifest.assets) == {'index.html', 'assets/index-BxK3a9Qz.js', 'favicon.ico', 'video.mp4'}
+    assert manifest.index is manifest.get('index.html')
+    assert manifest.get('assets/index-BxK3a9Qz.js').cache_control == IMMUTABLE
+    assert manifest.index.cache_control == REVALIDATE
+    assert manifest.get('favicon.ico').cache_control == 'public, max-age=600'
+    assert manifest.get('assets/index-BxK3a9Qz.js').mimetype == 'text/javascript; charset=utf-8'
+
+
+def test_large_files_are_left_on_disk(folder):
+    manifest = StaticManifest(str(folder), max_file_bytes=1024)
+    assert manifest.large_files == {'index.html', 'assets/index-BxK3a9Qz.js', 'video.mp4'}
+    assert manifest.get('video.mp4') is None
+
+
+def test_precompressed_variants_are_preferred_over_building_them(folder):
+    script = StaticManifest(str(folder)).get('assets/index-BxK3a9Qz.js')
+    assert script.variants['gzip'][0] == b'prebuilt'
+    body, etag, encoding = script.select(accept('gzip, deflate'))
+    assert (body, encoding) == (b'prebuilt', 'gzip') and etag == f'{script.etag}-gzip'
+    assert script.select(accept('identity')) == (SCRIPT, script.etag, None)
+
+
+def test_text_files_get_gzip_built_in_memory(folder):
+    index = StaticManifest(str(folder)).index
+    body, _, encoding = index.select(accept('gzip'))
+    assert encoding == 'gzip' and gzip.decompress(body) == index.body
+    # Binary formats are not compressed
+    assert StaticManifest(str(folder)).get('favicon.ico').variants == {}
+
+
+def test_missing_folder_yields_an_empty_manifest(tmp_path):
+    manifest = StaticManifest(str(tmp_path / 'missing'))
+    assert manifest.assets == {} and manifest.index is None
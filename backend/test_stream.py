@@ -0,0 +1,80 @@
+import json
+
+import pytest
+
+from bench.mock_providers import LatencyModel
+from src.routes.api import get_ai_service
+
+RESPONSES = {
+    'question': 'How many bits are in a byte?',
+    'agent1_response': 'A byte has 8 bits.',
+    'agent2_response': 'There are 8 bits in a byte.'
+}
+
+
+@pytest.mark.parametrize('path', ['/api/compare', '/api/compare/stream', '/api/assess', '/api/assess/stream', '/api/batch'])
+@pytest.mark.parametrize('body, content_type', [
+    (None, None),
+    ('not json', 'application/json'),
+    ('["a list"]', 'application/json'),
+    ('{"question": "form posted"}', 'text/plain')
+])
+def test_missing_or_non_object_body_is_a_400(client, path, body, content_type):
+    response = client.post(path, data=body, content_type=content_type)
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Request body must be a JSON object'
+
+
+@pytest.mark.parametrize('path', ['/api/assess', '/api/assess/stream'])
+@pytest.mark.parametrize('agent_id, message', [('no-such-agent', 'not found'), ('llama-2-7b', 'not enabled')])
+def test_assess_rejects_unavailable_agents(client, path, agent_id, message):
+    response = client.post(path, json=dict(RESPONSES, agent1_id='gpt-3.5', agent2_id=agent_id))
+    assert response.status_code == 400
+    assert message in response.get_json()['error']
+
+
+def test_assess_stream_refuses_an_agent_whose_circuit_is_open(client):
+    with client.application.app_context():
+        breaker = get_ai_service().breakers.get('openai')
+        for _ in range(breaker.failure_threshold):
+            breaker.record_failure('down')
+    response = client.post('/api/assess/stream', json=dict(RESPONSES, agent1_id='gpt-3.5', agent2_id='claude-instant'))
+    assert response.status_code == 400
+    assert 'temporarily unavailable' in response.get_json()['error']
+
+
+def sse_events(response):
+    """(event, data) pairs of a Server-Sent Events body"""
+    events = []
+    for block in response.get_data(as_text=True).strip().split('\n\n'):
+        lines = dict(line.split(': ', 1) for line in block.split('\n'))
+        events.append((lines['event'], json.loads(lines['data'])))
+    return events
+
+
+def test_compare_stream_sends_tagged_tokens_from_both_agents(client, mock_providers):
+    response = client.post('/api/compare/stream', json={
+        'agent1_id': 'gpt-3.5', 'agent2_id': 'claude-instant', 'question': RESPONSES['question']})
+    assert response.status_code == 200 and response.mimetype == 'text/event-stream'
+    assert response.headers['Cache-Control'] == 'no-cache'
+    events = sse_events(response)
+    kinds = [kind for kind, _ in events]
+    assert kinds[0] == 'start' and kinds[-1] == 'done'
+    for agent in ('agent1', 'agent2'):
+        tokens = [data['text'] for kind, data in events if kind == 'token' and data['agent'] == agent]
+        assert len(''.join(tokens).split()) == 5
+    assert kinds.count('agent_done') == 2
+    done = events[-1][1]
+    assert done['timing']['agent1']['ttft'] <= done['timing']['agent1']['total']
+    assert done['deadline']['partial'] is False
+
+
+def test_stream_past_the_deadline_ends_with_a_timed_out_error(client, mock_providers):
+    mock_providers.config.latency = LatencyModel('fixed', 0.6)
+    response = client.post('/api/compare/stream', json={
+        'agent1_id': 'gpt-3.5', 'agent2_id': 'claude-instant', 'question': RESPONSES['question']},
+        headers={'X-Request-Timeout': '0.2'})
+    events = sse_events(response)
+    errors = [data for kind, data in events if kind == 'agent_error']
+    assert len(errors) == 2 and all(error['timed_out'] for error in errors)
+    assert sorted(events[-1][1]['deadline']['incomplete']) == ['agent1', 'agent2']
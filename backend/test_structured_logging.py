@@ -0,0 +1,44 @@
+import json
+import logging
+import queue
+
+from src.services.structured_logging import (
+    DroppingQueueHandler, JsonFormatter, SamplingFilter, TextFormatter, log_fields
+)
+
+
+def record(level=logging.INFO, msg='Compare finished', args=None, **fields):
+    entry = logging.LogRecord('src.routes.api', level, __file__, 1, msg, args, None)
+    entry.__dict__.update(log_fields(**fields))
+    return entry
+
+
+def test_json_lines_carry_the_structured_fields():
+    line = JsonFormatter().format(record(comparison_id='abc', elapsed=1.25))
+    entry = json.loads(line)
+    assert entry['level'] == 'INFO' and entry['logger'] == 'src.routes.api' and entry['msg'] == 'Compare finished'
+    assert entry['comparison_id'] == 'abc' and entry['elapsed'] == 1.25
+    assert '\n' not in line
+
+
+def test_text_lines_list_fields_as_key_value_pairs():
+    assert TextFormatter().format(record(agent='gpt-4', timed_out=True)).endswith(
+        'INFO    src.routes.api: Compare finished agent=gpt-4 timed_out=True')
+
+
+def test_sampling_never_drops_warnings():
+    sampler = SamplingFilter(0.0)
+    assert not sampler.filter(record(logging.INFO))
+    assert sampler.filter(record(logging.WARNING)) and sampler.filter(record(logging.ERROR))
+    assert SamplingFilter(1.0).filter(record(logging.DEBUG))
+
+
+def test_full_queue_drops_records_instead_of_blocking():
+    log_queue = queue.Queue(maxsize=2)
+    handler = DroppingQueueHandler(log_queue)
+    for index in range(5):
+        handler.handle(record(msg='call %d', args=(index,)))
+    assert handler.dropped == 3 and log_queue.qsize() == 2
+    # Arguments are merged before the record crosses threads
+    queued = log_queue.get_nowait()
+    assert (queued.msg, queued.args) == ('call 0', None)
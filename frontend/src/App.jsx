@@ -33,6 +33,7 @@ function App() {
   const [isFollowUpLoading, setIsFollowUpLoading] = useState(false);
   const [showFollowUpInput, setShowFollowUpInput] = useState(false);
   const [conversationHistory, setConversationHistory] = useState([]);
+  const [sessionId, setSessionId] = useState(null);
   const [activeFollowUpIndex, setActiveFollowUpIndex] = useState(-1); 
   const [results, setResults] = useState(null);
   const [error, setError] = useState(null);
@@ -133,6 +134,7 @@ function App() {
         setFollowUpAssessments([]);
         setSelectedAssessmentCriteria([]);
         // Add to conversation history
+        setSessionId(data.session_id || null);
         setConversationHistory([{
           question: question.trim(),
           agent1_response: data.agent1.response,
@@ -168,25 +170,34 @@ const handleAssessmentCriteriaToggle = (criteria) => {
     );
   };
 
-  const handleGetAssessment = async (questionText, agent1Response, agent2Response, isFollowUp = false, followUpIndex = null) => {
+  const handleGetAssessment = async (questionText, agent1Response, agent2Response, isFollowUp = false, followUpIndex = null, comparisonId = null) => {
     setIsAssessmentLoading(true);
     setError(null);
 
     try {
-      const response = await fetch(`${API_BASE_URL}/assess`, {
+      const requestAssessment = (comparison) => fetch(`${API_BASE_URL}/assess`, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
         },
         body: JSON.stringify({
-          agent1_id: selectedAgent1,
-          agent2_id: selectedAgent2,
-          question: questionText,
-          agent1_response: agent1Response,
-          agent2_response: agent2Response,
+          ...comparison,
           assessment_criteria: selectedAssessmentCriteria
         }),
       });
+      const fullComparison = {
+        agent1_id: selectedAgent1,
+        agent2_id: selectedAgent2,
+        question: questionText,
+        agent1_response: agent1Response,
+        agent2_response: agent2Response
+      };
+
+      // The server still has the responses of recent comparisons; only upload them if it doesn't
+      let response = await requestAssessment(comparisonId ? { comparison_id: comparisonId } : fullComparison);
+      if (response.status === 404 && comparisonId) {
+        response = await requestAssessment(fullComparison);
+      }
 
       const data = await response.json();
 
@@ -226,7 +237,8 @@ const handleAssessmentCriteriaToggle = (criteria) => {
     const controller = new AbortController();
     const timeoutId = setTimeout(() => controller.abort(), 120000);
 
-    const response = await fetch(`${API_BASE_URL}/compare`, {
+    // The server keeps the history of a session; only send it ourselves when there is none
+    const sendFollowUp = (history) => fetch(`${API_BASE_URL}/compare`, {
       method: 'POST',
       headers: {
         'Content-Type': 'application/json',
@@ -236,13 +248,22 @@ const handleAssessmentCriteriaToggle = (criteria) => {
         agent2_id: selectedAgent2,
         question: questionText.trim(),
         best_practices: selectedPractices,
-	conversation_history: conversationHistory
+        ...history
       }),
       signal: controller.signal
     });
 
+    let response = await sendFollowUp(sessionId ? { session_id: sessionId } : { conversation_history: conversationHistory });
+    if (response.status === 404 && sessionId) {
+      // Session expired on the server: start a new one from our copy of the history
+      response = await sendFollowUp({ conversation_history: conversationHistory });
+    }
+
     clearTimeout(timeoutId);
     const data = await response.json();
+    if (data.session_id) {
+      setSessionId(data.session_id);
+    }
 
     if (data.agent1 && data.agent2) {
       setFollowUps(prev => {
@@ -542,7 +563,7 @@ const startFollowUpChain = () => {
                 {/* Go Button */}
                 <div className="text-center pt-4">
                   <Button
-                    onClick={() => handleGetAssessment(question, results.agent1.response, results.agent2.response)}
+                    onClick={() => handleGetAssessment(question, results.agent1.response, results.agent2.response, false, null, results.comparison_id)}
                     disabled={isAssessmentLoading || selectedAssessmentCriteria.length === 0}
                     className="h-12 px-8 text-lg font-medium bg-purple-600 hover:bg-purple-700"
                   >
@@ -700,7 +721,8 @@ const startFollowUpChain = () => {
                               followUp.results.agent1.response, 
                               followUp.results.agent2.response, 
                               true, 
-                              index
+                              index,
+                              followUp.results.comparison_id
                             )}
                             disabled={isAssessmentLoading || selectedAssessmentCriteria.length === 0}
                             className="h-10 px-6 text-sm font-medium bg-purple-600 hover:bg-purple-700"